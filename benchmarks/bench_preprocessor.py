@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+import tempfile
+
+import click
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocessor"))
+
+from src.MLensDataPreprocessor import MLensDataPreprocessor  # noqa: E402
+from synthetic_data import write_movielens  # noqa: E402
+from timing import time_repeats  # noqa: E402
+
+
+def benchmark_size(n_movies, workdir, repeats=3, ratings_per_movie=10, kmeans_clusters=50,
+                   algorithm="full", seed=42):
+    """
+    Benchmark the preprocessing stages on synthetic MovieLens files of ``n_movies`` movies.
+
+    Returns:
+        list: One result dict per measured stage
+    """
+    write_movielens(workdir, n_movies, ratings_per_movie, seed)
+    preprocessor = MLensDataPreprocessor(kmeans_clusters=kmeans_clusters, working_dir=workdir, algorithm=algorithm)
+    movies_df = pd.read_csv(f"{workdir}/movies.csv")
+    ratings_df = pd.read_csv(f"{workdir}/ratings.csv")
+    avg_ratings = preprocessor.average_ratings(ratings_df)
+    cleaned_movies = preprocessor.clean_movie_data(movies_df, avg_ratings=avg_ratings)
+    genre_matrix, _ = preprocessor.create_genre_matrix(cleaned_movies)
+
+    results = {
+        "read_ratings": time_repeats(lambda: pd.read_csv(f"{workdir}/ratings.csv"), repeats),
+        "average_ratings": time_repeats(lambda: preprocessor.average_ratings(ratings_df), repeats),
+        "stream_average_ratings": time_repeats(
+            lambda: preprocessor.stream_average_ratings(f"{workdir}/ratings.csv"), repeats),
+        "standardize_titles": time_repeats(lambda: preprocessor.standardize_titles(movies_df["title"]), repeats),
+        "clean_movie_data": time_repeats(
+            lambda: preprocessor.clean_movie_data(movies_df, avg_ratings=avg_ratings), repeats),
+        "create_genre_matrix": time_repeats(lambda: preprocessor.create_genre_matrix(cleaned_movies), repeats),
+        "preprocess_data": time_repeats(preprocessor.preprocess_data, repeats),
+        "project_genre_matrix": time_repeats(lambda: preprocessor.project_genre_matrix(genre_matrix), repeats),
+        "cluster_movies": time_repeats(lambda: preprocessor.cluster_movies(genre_matrix), repeats),
+    }
+
+    return [{"suite": "preprocessor", "size": n_movies, "name": name, **stats} for name, stats in results.items()]
+
+
+@click.command()
+@click.option("--sizes", default="10000,100000", help="Comma separated numbers of movies")
+@click.option("--repeats", default=3, help="Runs of every stage")
+@click.option("--ratings-per-movie", default=10, help="Average number of ratings per movie")
+@click.option("--kmeans-clusters", default=50, help="Number of clusters fitted by cluster_movies")
+@click.option("--algorithm", default="full", type=click.Choice(["full", "minibatch"]), help="Clustering backend")
+@click.option("--seed", default=42, help="Random seed of the synthetic data")
+@click.option("--output", required=True, help="JSON file for the results")
+def main(sizes, repeats, ratings_per_movie, kmeans_clusters, algorithm, seed, output):
+    """Benchmark the MLensDataPreprocessor stages"""
+    results = []
+    for size in [int(size) for size in sizes.split(",")]:
+        click.echo(f"preprocessor: {size} movies", err=True)
+        with tempfile.TemporaryDirectory() as workdir:
+            results.extend(benchmark_size(size, workdir, repeats, ratings_per_movie, kmeans_clusters, algorithm, seed))
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import tempfile
+
+import click
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "clustering-engine"))
+
+from src.MovieAntiRecommender import MovieAntiRecommender  # noqa: E402
+from synthetic_data import generate_catalog, generate_queries, write_catalog  # noqa: E402
+from timing import summarize, time_calls, time_repeats  # noqa: E402
+
+
+def benchmark_size(n_movies, workdir, repeats=3, n_queries=200, n_clusters=300, seed=42):
+    """
+    Benchmark the recommender on a synthetic catalog of ``n_movies`` movies.
+
+    Caches are disabled so that every call does the full work.
+
+    Returns:
+        list: One result dict per measured operation
+    """
+    dataset_path, model_path = write_catalog(workdir, n_movies, n_clusters, seed)
+    queries = generate_queries(generate_catalog(n_movies, seed), n_queries, seed)
+    # difflib matching is by far the slowest path, keep its share of the run reasonable
+    fuzzy_queries = queries["fuzzy"][:max(n_queries // 10, 5)]
+
+    results = {}
+    index_seconds = []
+
+    def load():
+        recommender = MovieAntiRecommender(cache_size=0)
+        recommender.load_dataset(dataset_path, model_path)
+        index_seconds.append(recommender.load_timings["index_seconds"])
+        return recommender
+
+    results["load_dataset"] = time_repeats(load, repeats)
+    results["load_dataset.build_indexes"] = summarize(index_seconds)
+
+    recommender = load()
+    bundle_path = os.path.join(workdir, f"catalog_{n_movies}.bundle")
+    recommender.save_bundle(bundle_path)
+
+    def load_bundle():
+        bundled = MovieAntiRecommender(cache_size=0)
+        bundled.load_bundle(bundle_path)
+        return bundled
+
+    results["load_bundle"] = time_repeats(load_bundle, repeats)
+
+    np.random.seed(seed)
+    results["standardize_title.exact"] = time_calls(recommender.standardize_title, queries["exact"])
+    results["standardize_title.contains"] = time_calls(recommender.standardize_title, queries["contains"])
+    results["standardize_title.fuzzy"] = time_calls(recommender.standardize_title, fuzzy_queries)
+    results["recommend"] = time_calls(recommender.recommend, queries["exact"])
+    results["recommend_json"] = time_calls(recommender.recommend_json, queries["exact"])
+    results["search_suggestions"] = time_calls(recommender.search_suggestions,
+                                               [(query,) for query in queries["suggestions"]])
+
+    return [{"suite": "recommender", "size": n_movies, "name": name, **stats} for name, stats in results.items()]
+
+
+@click.command()
+@click.option("--sizes", default="10000,100000", help="Comma separated catalog sizes")
+@click.option("--repeats", default=3, help="Runs of whole-stage benchmarks")
+@click.option("--queries", default=200, help="Queries per title resolution path")
+@click.option("--clusters", default=300, help="Clusters of the synthetic model")
+@click.option("--seed", default=42, help="Random seed of the synthetic data")
+@click.option("--output", required=True, help="JSON file for the results")
+def main(sizes, repeats, queries, clusters, seed, output):
+    """Benchmark loading, title resolution, recommendations and suggestions"""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in [int(size) for size in sizes.split(",")]:
+            click.echo(f"recommender: {size} movies", err=True)
+            results.extend(benchmark_size(size, workdir, repeats, queries, clusters, seed))
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import click
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITES = {"recommender": "bench_recommender.py", "preprocessor": "bench_preprocessor.py"}
+
+
+def environment_metadata():
+    """
+    Describe the machine and code the benchmarks ran on.
+
+    Returns:
+        dict: Timestamp, git commit, Python and library versions and CPU count
+    """
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+@click.group()
+def cli():
+    """Anti-recommender benchmark suite"""
+    pass
+
+
+@cli.command()
+@click.option("--suite", "suites", multiple=True, default=list(SUITES), type=click.Choice(list(SUITES)),
+              help="Suite to run, can be repeated. Defaults to all suites")
+@click.option("--sizes", default="10000,100000", help="Comma separated catalog sizes, e.g. 10000,100000,1000000")
+@click.option("--repeats", default=3, help="Runs of whole-stage benchmarks")
+@click.option("--seed", default=42, help="Random seed of the synthetic data")
+@click.option("--output", default="benchmark_results.json", help="JSON file for the results")
+def run(suites, sizes, repeats, seed, output):
+    """Run benchmarks on synthetic data and save machine-readable results"""
+    results = []
+    # every suite runs in its own interpreter, the services both name their package "src"
+    for suite in suites:
+        with tempfile.NamedTemporaryFile(suffix=".json") as suite_output:
+            subprocess.run([sys.executable, SUITES[suite], "--sizes", sizes, "--repeats", str(repeats),
+                            "--seed", str(seed), "--output", suite_output.name], cwd=BENCHMARKS_DIR, check=True)
+            with open(suite_output.name) as f:
+                results.extend(json.load(f))
+
+    report = {"metadata": environment_metadata() | {"sizes": sizes, "repeats": repeats, "seed": seed},
+              "results": results}
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for result in results:
+        click.echo(f"{result['suite']:<13} {result['size']:>8} {result['name']:<30} "
+                   f"median {result['median'] * 1000:10.3f} ms   p95 {result['p95'] * 1000:10.3f} ms")
+    click.echo(f"Results saved to {output}")
+
+
+@cli.command()
+@click.argument("baseline", type=click.Path(exists=True))
+@click.argument("current", type=click.Path(exists=True))
+@click.option("--metric", default="median", type=click.Choice(["min", "median", "mean", "p95", "p99"]),
+              help="Statistic compared between the runs")
+@click.option("--threshold", default=0.10, help="Relative slowdown reported as a regression, 0.10 is 10%")
+def compare(baseline, current, metric, threshold):
+    """Compare two result files and fail if CURRENT regressed against BASELINE"""
+    with open(baseline) as f:
+        baseline_results = {(r["suite"], r["size"], r["name"]): r for r in json.load(f)["results"]}
+    with open(current) as f:
+        current_results = {(r["suite"], r["size"], r["name"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for key in sorted(baseline_results.keys() & current_results.keys()):
+        before = baseline_results[key][metric]
+        after = current_results[key][metric]
+        change = after / before - 1 if before > 0 else 0.0
+        status = "REGRESSION" if change > threshold else ("improved" if change < -threshold else "")
+        if status == "REGRESSION":
+            regressions.append(key)
+        suite, size, name = key
+        click.echo(f"{suite:<13} {size:>8} {name:<30} {before * 1000:10.3f} ms -> {after * 1000:10.3f} ms "
+                   f"{change:+8.1%} {status}")
+
+    missing = sorted(baseline_results.keys() - current_results.keys())
+    for suite, size, name in missing:
+        click.echo(f"{suite:<13} {size:>8} {name:<30} missing from {current}")
+
+    if regressions:
+        click.echo(f"{len(regressions)} benchmarks regressed by more than {threshold:.0%} ({metric})")
+        sys.exit(1)
+    click.echo(f"No regressions above {threshold:.0%} ({metric})")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,418 @@
+"""
+Replayable load test of the anti-recommender web service.
+
+Replays a query log against ``/recommend`` and ``/search-suggestions`` at
+several concurrency levels and reports throughput, latency percentiles and
+error rates per endpoint. The service runs either in this process, called
+through an ASGI transport, or as a local server started with ``run.py`` in
+production mode, the way the container runs it.
+"""
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from itertools import cycle, islice
+
+import click
+import httpx
+import numpy as np
+
+CLUSTERING_ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "clustering-engine")
+sys.path.insert(0, CLUSTERING_ENGINE_DIR)
+
+from benchmark_cli import environment_metadata  # noqa: E402
+from synthetic_data import write_catalog  # noqa: E402
+from timing import summarize  # noqa: E402
+
+RECOMMEND = "/recommend"
+SUGGESTIONS = "/search-suggestions"
+
+# request lines logged by main.py, so a service log can be replayed as is
+RECOMMEND_LOG_LINE = re.compile(r"Received recommendation request for movie: (?P<movie_title>.*), year: (?P<year>\w+)$")
+SUGGESTIONS_LOG_LINE = re.compile(r"Received search suggestions request for query: (?P<query>.*)$")
+
+
+def parse_log_line(line):
+    """
+    Parse one query log line.
+
+    Lines are either JSON objects as written by ``generate`` or request lines
+    of the service log, other lines are skipped.
+
+    Returns:
+        dict: The query, with an "endpoint" key, or None
+    """
+    line = line.rstrip("\n")
+    if line.startswith("{"):
+        return json.loads(line)
+    match = RECOMMEND_LOG_LINE.search(line)
+    if match:
+        year = match.group("year")
+        return {"endpoint": RECOMMEND, "movie_title": match.group("movie_title"),
+                "year": None if year == "None" else int(year)}
+    match = SUGGESTIONS_LOG_LINE.search(line)
+    if match:
+        return {"endpoint": SUGGESTIONS, "query": match.group("query")}
+    return None
+
+
+def read_query_log(path):
+    """
+    Returns:
+        list: Queries of a query log, in order
+    """
+    with open(path) as f:
+        queries = [query for query in map(parse_log_line, f) if query is not None]
+    if not queries:
+        raise click.ClickException(f"No queries found in {path}")
+    return queries
+
+
+def load_catalog_titles(data_path=None, model_path=None, bundle_path=None):
+    """
+    Read the standardized titles and years of the served catalog.
+
+    Returns:
+        tuple: List of titles and list of years
+    """
+    from src.MovieAntiRecommender import MovieAntiRecommender
+
+    recommender = MovieAntiRecommender(cache_size=0)
+    if bundle_path:
+        recommender.load_bundle(bundle_path)
+    else:
+        recommender.load_dataset(data_path, model_path)
+    catalog = recommender.catalog
+    return catalog.standardized_titles.tolist(), catalog.years.tolist()
+
+
+def zipf_queries(titles, years, n_queries, zipf_exponent=1.0, suggestion_share=0.5, year_share=0.5, seed=42):
+    """
+    Draw a synthetic query mix from the catalog.
+
+    Movies get a random popularity rank and are queried with probability
+    proportional to ``1 / rank ** zipf_exponent``, so a few titles take most
+    of the traffic like in real logs. Suggestion queries are prefixes of the
+    drawn titles, as typed in the search box.
+
+    Args:
+        titles (list): Standardized titles of the catalog
+        years (list): Release years of the catalog
+        n_queries (int): Number of queries
+        zipf_exponent (float, optional): Skew of the title popularity. Defaults to 1.0.
+        suggestion_share (float, optional): Share of suggestion queries. Defaults to 0.5.
+        year_share (float, optional): Share of recommendation queries giving the
+            year. Defaults to 0.5.
+        seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        list: Queries, with an "endpoint" key
+    """
+    rng = np.random.default_rng(seed)
+    popularity = rng.permutation(len(titles))
+    weights = 1.0 / np.arange(1, len(titles) + 1) ** zipf_exponent
+    rows = popularity[rng.choice(len(titles), size=n_queries, p=weights / weights.sum())]
+    is_suggestion = rng.random(n_queries) < suggestion_share
+    with_year = rng.random(n_queries) < year_share
+    cut = rng.random(n_queries)
+
+    queries = []
+    for row, suggestion, year, fraction in zip(rows.tolist(), is_suggestion, with_year, cut):
+        title = titles[row]
+        if suggestion:
+            length = min(len(title), 3 + int(fraction * max(len(title) - 2, 1)))
+            queries.append({"endpoint": SUGGESTIONS, "query": title[:length]})
+        else:
+            queries.append({"endpoint": RECOMMEND, "movie_title": title, "year": years[row] if year else None})
+    return queries
+
+
+async def send(client, query):
+    """
+    Send one query.
+
+    Returns:
+        tuple: Endpoint, latency in seconds, HTTP status (None if the request
+            failed) and whether the service answered with an error object
+    """
+    endpoint = query["endpoint"]
+    start = time.perf_counter()
+    try:
+        if endpoint == RECOMMEND:
+            response = await client.post(RECOMMEND, json={"movie_title": query["movie_title"], "year": query["year"]})
+        else:
+            response = await client.get(SUGGESTIONS, params={"query": query["query"]})
+    except httpx.HTTPError:
+        return endpoint, time.perf_counter() - start, None, False
+    latency = time.perf_counter() - start
+    # unknown or ambiguous titles are answered with 200 and an error object
+    app_error = response.status_code < 400 and response.content.startswith(b'{"error"')
+    return endpoint, latency, response.status_code, app_error
+
+
+async def replay(client, queries, concurrency):
+    """
+    Replay queries in order with a fixed number of requests in flight.
+
+    Returns:
+        tuple: Per request results of ``send`` and the wall time in seconds
+    """
+    pending = iter(queries)
+    results = []
+
+    async def worker():
+        for query in pending:
+            results.append(await send(client, query))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def summarize_level(results, seconds, concurrency):
+    """
+    Summarize one concurrency level per endpoint and over all requests.
+
+    Returns:
+        list: One result dict per endpoint, latencies in seconds
+    """
+    by_endpoint = defaultdict(list)
+    for result in results:
+        by_endpoint[result[0]].append(result)
+        by_endpoint["all"].append(result)
+
+    summaries = []
+    for endpoint, endpoint_results in sorted(by_endpoint.items()):
+        _, latencies, statuses, app_errors = zip(*endpoint_results)
+        status_counts = defaultdict(int)
+        for status in statuses:
+            status_counts[str(status)] += 1
+        errors = sum(status is None or status >= 400 for status in statuses)
+        summaries.append({
+            "concurrency": concurrency,
+            "endpoint": endpoint,
+            "requests": len(endpoint_results),
+            "throughput": len(endpoint_results) / seconds,
+            "error_rate": errors / len(endpoint_results),
+            "app_error_rate": sum(app_errors) / len(endpoint_results),
+            "status_counts": dict(status_counts),
+            **summarize(latencies),
+        })
+    return summaries
+
+
+async def sweep(client, queries, levels, n_requests, warmup):
+    """
+    Replay the first ``n_requests`` queries at every concurrency level.
+
+    The log is repeated if it is shorter, so every level sends the same requests.
+
+    Returns:
+        list: Result dicts of all levels, see ``summarize_level``
+    """
+    workload = list(islice(cycle(queries), n_requests))
+    if warmup:
+        # at the highest level, so the measured levels reuse already open connections
+        await replay(client, workload[:warmup], max(levels))
+
+    summaries = []
+    for concurrency in levels:
+        results, seconds = await replay(client, workload, concurrency)
+        summaries.extend(summarize_level(results, seconds, concurrency))
+        click.echo(f"concurrency {concurrency}: {len(results)} requests in {seconds:.2f}s", err=True)
+    return summaries
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """
+    Service started with ``run.py`` in production mode on a free local port.
+    """
+
+    def __init__(self, environment, workers=1, startup_timeout=300.0):
+        self.port = free_port()
+        self.environment = os.environ | environment | {
+            "SERVE_MODE": "production", "HOST": "127.0.0.1", "PORT": str(self.port), "WORKERS": str(workers),
+        }
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.process = subprocess.Popen([sys.executable, "run.py"], cwd=CLUSTERING_ENGINE_DIR, env=self.environment,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise click.ClickException(f"Server exited with status {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.url}/readyz", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise click.ClickException(f"Server not ready after {self.startup_timeout:.0f}s")
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def service_environment(data_path, model_path, bundle_path, log_level):
+    """
+    Settings of the tested service, passed as environment variables.
+
+    Returns:
+        dict: Environment variables read by ``config.Settings``
+    """
+    environment = {"LOG_LEVEL": log_level}
+    if bundle_path:
+        environment["BUNDLE_PATH"] = os.path.abspath(bundle_path)
+    else:
+        environment["DATA_PATH"] = os.path.abspath(data_path)
+        environment["MODEL_PATH"] = os.path.abspath(model_path)
+    return environment
+
+
+async def run_in_process(environment, queries, levels, n_requests, warmup, timeout):
+    # settings are read when main is imported
+    os.environ.update(environment)
+    from main import app, recommender_holder
+
+    recommender_holder.get()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=timeout) as client:
+        return await sweep(client, queries, levels, n_requests, warmup)
+
+
+async def run_against(url, queries, levels, n_requests, warmup, timeout):
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        return await sweep(client, queries, levels, n_requests, warmup)
+
+
+def catalog_options(func):
+    func = click.option("--size", default=100000, help="Movies of the synthetic catalog used without --data-path "
+                                                       "or --bundle-path")(func)
+    func = click.option("--bundle-path", default=None, help="Serving bundle, used instead of the CSV and model")(func)
+    func = click.option("--model-path", default=None, help="Fitted clustering model")(func)
+    func = click.option("--data-path", default=None, help="Cleaned movies CSV or Parquet file")(func)
+    return func
+
+
+def served_files(workdir, data_path, model_path, bundle_path, size, seed):
+    """
+    Returns:
+        tuple: Data, model and bundle paths, a synthetic catalog when none are given
+    """
+    if bundle_path or data_path:
+        if data_path and not model_path:
+            raise click.UsageError("--model-path is required with --data-path")
+        return data_path, model_path, bundle_path
+    click.echo(f"Generating a synthetic catalog of {size} movies", err=True)
+    data_path, model_path = write_catalog(workdir, size, seed=seed)
+    return data_path, model_path, None
+
+
+@click.group()
+def cli():
+    """Load tests of the anti-recommender service"""
+    pass
+
+
+@cli.command()
+@catalog_options
+@click.option("--queries", "n_queries", default=10000, help="Number of queries")
+@click.option("--zipf-exponent", default=1.0, help="Skew of the title popularity")
+@click.option("--suggestion-share", default=0.5, help="Share of search suggestion queries")
+@click.option("--year-share", default=0.5, help="Share of recommendation queries giving the year")
+@click.option("--seed", default=42, help="Random seed")
+@click.option("--output", required=True, help="JSON lines file for the query log")
+def generate(data_path, model_path, bundle_path, size, n_queries, zipf_exponent, suggestion_share, year_share, seed,
+             output):
+    """Write a synthetic Zipf-distributed query log drawn from the catalog"""
+    with tempfile.TemporaryDirectory() as workdir:
+        data_path, model_path, bundle_path = served_files(workdir, data_path, model_path, bundle_path, size, seed)
+        titles, years = load_catalog_titles(data_path, model_path, bundle_path)
+    queries = zipf_queries(titles, years, n_queries, zipf_exponent, suggestion_share, year_share, seed)
+    with open(output, "w") as f:
+        for query in queries:
+            f.write(json.dumps(query) + "\n")
+    click.echo(f"{len(queries)} queries saved to {output}")
+
+
+@cli.command()
+@catalog_options
+@click.option("--target", default="asgi", type=click.Choice(["asgi", "uvicorn"]),
+              help="Call the app in this process, or a local run.py server in production mode")
+@click.option("--url", default=None, help="Load test an already running service instead of starting one")
+@click.option("--workers", default=1, help="Worker processes of the local server")
+@click.option("--query-log", default=None, type=click.Path(exists=True),
+              help="Queries to replay, JSON lines from generate or the service log. "
+                   "Defaults to a synthetic Zipf mix drawn from the catalog")
+@click.option("--concurrency", default="1,4,16,64", help="Comma separated numbers of requests in flight")
+@click.option("--requests", "n_requests", default=2000, help="Requests sent at every concurrency level")
+@click.option("--warmup", default=200, help="Requests sent before the sweep, not measured")
+@click.option("--timeout", default=30.0, help="Request timeout in seconds, timed out requests count as errors")
+@click.option("--log-level", default="WARNING", help="Log level of the service")
+@click.option("--seed", default=42, help="Random seed of the synthetic catalog and queries")
+@click.option("--output", default="load_test_results.json", help="JSON file for the results")
+def run(data_path, model_path, bundle_path, size, target, url, workers, query_log, concurrency, n_requests, warmup,
+        timeout, log_level, seed, output):
+    """Replay queries at several concurrency levels and report latency and errors per endpoint"""
+    levels = [int(level) for level in concurrency.split(",")]
+    if url and not (query_log or data_path or bundle_path):
+        raise click.UsageError("--url needs a --query-log or the files the service serves")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if query_log:
+            queries = read_query_log(query_log)
+        # a running service with a query log needs no local catalog
+        if not (url and query_log):
+            data_path, model_path, bundle_path = served_files(workdir, data_path, model_path, bundle_path, size, seed)
+        if not query_log:
+            queries = zipf_queries(*load_catalog_titles(data_path, model_path, bundle_path), n_requests, seed=seed)
+
+        if url:
+            results = asyncio.run(run_against(url, queries, levels, n_requests, warmup, timeout))
+        elif target == "uvicorn":
+            with LocalServer(service_environment(data_path, model_path, bundle_path, log_level), workers) as server:
+                results = asyncio.run(run_against(server.url, queries, levels, n_requests, warmup, timeout))
+        else:
+            environment = service_environment(data_path, model_path, bundle_path, log_level)
+            results = asyncio.run(run_in_process(environment, queries, levels, n_requests, warmup, timeout))
+
+    metadata = environment_metadata() | {"target": url or target, "workers": workers, "query_log": query_log,
+                                         "requests": n_requests, "seed": seed}
+    with open(output, "w") as f:
+        json.dump({"metadata": metadata, "results": results}, f, indent=2)
+
+    for result in results:
+        click.echo(f"{result['concurrency']:>5} {result['endpoint']:<20} {result['throughput']:9.1f} req/s   "
+                   f"p50 {result['median'] * 1000:8.2f} ms   p95 {result['p95'] * 1000:8.2f} ms   "
+                   f"p99 {result['p99'] * 1000:8.2f} ms   errors {result['error_rate']:6.1%}   "
+                   f"error objects {result['app_error_rate']:6.1%}")
+    click.echo(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    cli()
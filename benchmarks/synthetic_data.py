@@ -0,0 +1,171 @@
+"""
+Reproducible synthetic MovieLens-like data for the benchmarks.
+
+Everything is generated from a seeded NumPy generator, so the same size and
+seed always give the same catalog, model, queries and raw files.
+"""
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+WORDS = np.array([
+    "Love", "War", "Night", "Day", "Dark", "Light", "Star", "Moon", "Sun", "City", "Island", "River",
+    "Mountain", "Road", "House", "Garden", "Ghost", "Dragon", "King", "Queen", "Prince", "Girl", "Boy",
+    "Man", "Woman", "Child", "Father", "Mother", "Brother", "Sister", "Friend", "Enemy", "Secret", "Lost",
+    "Last", "First", "Final", "Silent", "Wild", "Broken", "Golden", "Silver", "Red", "Blue", "Black",
+    "White", "Green", "Cold", "Hot", "Deep", "High", "Long", "Short", "Little", "Big", "Old", "New",
+    "Young", "Dead", "Alive", "Dream", "Storm", "Fire", "Ice", "Water", "Stone", "Glass", "Iron", "Steel",
+    "Shadow", "Empire", "Kingdom", "Legend", "Story", "Journey", "Return", "Escape", "Game", "Rules",
+    "Heart", "Soul", "Mind", "Eyes", "Hands", "Blood", "Money", "Power", "Time", "Summer", "Winter",
+    "Spring", "Autumn", "Morning", "Evening", "Midnight", "Paris", "London", "Tokyo", "Rome", "Berlin",
+    "Machine", "Robot", "Planet", "Galaxy", "Ocean", "Desert", "Forest", "Jungle", "Train", "Ship",
+    "Letter", "Song", "Dance", "Circus", "Hotel", "Station", "Bridge", "Tower", "Castle", "Village",
+    "Detective", "Doctor", "Captain", "Soldier", "Pirate", "Wolf", "Tiger", "Bird", "Horse", "Snake",
+])
+
+GENRES = np.array([
+    "Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary", "Drama", "Fantasy",
+    "Film-Noir", "Horror", "IMAX", "Musical", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western",
+])
+
+
+def _titles(rng, n_movies):
+    n_words = rng.choice([1, 2, 3, 4, 5], size=n_movies, p=[0.05, 0.35, 0.3, 0.2, 0.1])
+    words = rng.choice(WORDS, size=(n_movies, 5))
+    return np.array([" ".join(row[:k]) for row, k in zip(words, n_words)], dtype=object)
+
+
+def _genres(rng, n_movies):
+    n_genres = rng.integers(1, 4, size=n_movies)
+    genres = rng.choice(GENRES, size=(n_movies, 3))
+    return np.array(["|".join(dict.fromkeys(row[:k])) for row, k in zip(genres, n_genres)], dtype=object)
+
+
+def generate_catalog(n_movies, seed=42):
+    """
+    Generate a catalog in the format of ``cleaned_movies.csv``.
+
+    Args:
+        n_movies (int): Number of movies
+        seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        pd.DataFrame: movieId, title, genres, rating, standardized_title and year columns
+    """
+    rng = np.random.default_rng(seed)
+    standardized_titles = _titles(rng, n_movies)
+    years = rng.integers(1920, 2025, size=n_movies)
+    titles = [f"{title} ({year})" for title, year in zip(standardized_titles, years)]
+    return pd.DataFrame({
+        "movieId": np.arange(1, n_movies + 1),
+        "title": titles,
+        "genres": _genres(rng, n_movies),
+        "rating": rng.uniform(0.5, 5.0, size=n_movies),
+        "standardized_title": standardized_titles,
+        "year": years.astype(np.float64),
+    })
+
+
+def generate_model(n_movies, n_clusters=300, n_components=10, seed=42):
+    """
+    Generate a fitted-looking KMeans model for a catalog of ``n_movies`` movies.
+
+    Only ``labels_`` and ``cluster_centers_`` are set, which is everything the
+    recommender reads, so no clustering has to run.
+
+    Args:
+        n_movies (int): Number of movies
+        n_clusters (int, optional): Number of clusters. Defaults to 300.
+        n_components (int, optional): Dimension of the cluster centers. Defaults to 10.
+        seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        KMeans: Model with random cluster centers and labels
+    """
+    rng = np.random.default_rng(seed + 1)
+    model = KMeans(n_clusters=n_clusters)
+    model.cluster_centers_ = rng.normal(size=(n_clusters, n_components))
+    model.labels_ = rng.integers(0, n_clusters, size=n_movies).astype(np.int32)
+    return model
+
+
+def write_catalog(directory, n_movies, n_clusters=300, seed=42):
+    """
+    Write a synthetic catalog and model for the recommender.
+
+    Returns:
+        tuple: Paths of the dataset CSV and the model pickle
+    """
+    dataset_path = f"{directory}/synthetic_{n_movies}.csv"
+    model_path = f"{directory}/synthetic_{n_movies}_kmeans.pkl"
+    generate_catalog(n_movies, seed).to_csv(dataset_path, index=False)
+    joblib.dump(generate_model(n_movies, n_clusters, seed=seed), model_path)
+    return dataset_path, model_path
+
+
+def write_movielens(directory, n_movies, ratings_per_movie=10, seed=42):
+    """
+    Write raw ``movies.csv`` and ``ratings.csv`` files in the MovieLens format.
+
+    Titles mix the "Title (year)" and "Title, The (year)" forms, and a few
+    movies have no year or no genres, so every preprocessing branch runs.
+
+    Args:
+        directory (str): Output directory, used as the preprocessor working directory
+        n_movies (int): Number of movies
+        ratings_per_movie (int, optional): Average number of ratings per movie. Defaults to 10.
+        seed (int, optional): Random seed. Defaults to 42.
+    """
+    rng = np.random.default_rng(seed)
+    titles = _titles(rng, n_movies)
+    years = rng.integers(1920, 2025, size=n_movies)
+    article = rng.random(n_movies) < 0.1
+    no_year = rng.random(n_movies) < 0.01
+    raw_titles = [
+        (f"{title}, The" if moved else title) + ("" if missing else f" ({year})")
+        for title, year, moved, missing in zip(titles, years, article, no_year)
+    ]
+    genres = _genres(rng, n_movies)
+    genres[rng.random(n_movies) < 0.01] = "(no genres listed)"
+    pd.DataFrame({"movieId": np.arange(1, n_movies + 1), "title": raw_titles, "genres": genres}).to_csv(
+        f"{directory}/movies.csv", index=False)
+
+    n_ratings = n_movies * ratings_per_movie
+    pd.DataFrame({
+        "userId": rng.integers(1, max(n_ratings // 100, 2), size=n_ratings),
+        "movieId": rng.integers(1, n_movies + 1, size=n_ratings),
+        "rating": rng.integers(1, 11, size=n_ratings) / 2,
+        "timestamp": rng.integers(800_000_000, 1_700_000_000, size=n_ratings),
+    }).to_csv(f"{directory}/ratings.csv", index=False)
+
+
+def generate_queries(catalog, n_queries=200, seed=42):
+    """
+    Build title queries which take each path of title resolution.
+
+    Args:
+        catalog (pd.DataFrame): Catalog from ``generate_catalog``
+        n_queries (int, optional): Number of queries per path. Defaults to 200.
+        seed (int, optional): Random seed. Defaults to 42.
+
+    Returns:
+        dict: Lists of (title, year) queries for the "exact", "contains" and
+            "fuzzy" paths and of search strings for "suggestions"
+    """
+    rng = np.random.default_rng(seed + 2)
+    rows = rng.choice(len(catalog), size=n_queries, replace=len(catalog) < n_queries)
+    titles = catalog["standardized_title"].to_numpy()[rows]
+    years = catalog["year"].to_numpy()[rows].astype(int)
+
+    def typo(title):
+        # swap two neighbouring letters in the middle, which breaks substring matches
+        middle = max(len(title) // 2, 1)
+        return title[:middle - 1] + title[middle] + title[middle - 1] + title[middle + 1:]
+
+    return {
+        "exact": [(title, int(year)) for title, year in zip(titles, years)],
+        "contains": [(title[1:-1].lower(), int(year)) for title, year in zip(titles, years)],
+        "fuzzy": [(typo(title.lower()) + "x", None) for title in titles],
+        "suggestions": [typo(title)[:max(len(title) - 2, 3)] for title in titles],
+    }
@@ -0,0 +1,68 @@
+import contextlib
+import io
+import time
+
+import numpy as np
+
+
+def summarize(samples):
+    """
+    Summarize timing samples in seconds.
+
+    Returns:
+        dict: Number of samples and min, median, mean, p95, p99 and max in seconds
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    return {
+        "n": int(len(samples)),
+        "min": float(samples.min()),
+        "median": float(np.median(samples)),
+        "mean": float(samples.mean()),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+        "max": float(samples.max()),
+    }
+
+
+def time_calls(func, inputs):
+    """
+    Time one call of ``func`` per input, e.g. one request per query.
+
+    Anything printed by ``func`` is discarded so that it doesn't distort the timings.
+
+    Args:
+        func (callable): Function called with each input unpacked as arguments
+        inputs (list): Argument tuples
+
+    Returns:
+        dict: Latency summary of the calls, see ``summarize``
+    """
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for args in inputs:
+            start = time.perf_counter()
+            func(*args)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def time_repeats(func, repeats, setup=None):
+    """
+    Time ``repeats`` runs of a whole stage.
+
+    Args:
+        func (callable): Stage to run, called with the result of ``setup`` if given
+        repeats (int): Number of runs
+        setup (callable, optional): Untimed preparation run before every run
+
+    Returns:
+        dict: Duration summary of the runs, see ``summarize``
+    """
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            args = () if setup is None else (setup(),)
+            start = time.perf_counter()
+            func(*args)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
@@ -4,8 +4,28 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     data_path: str = "data/clustered_dataset.csv"
     model_path: str = "data/movies_kmeans.pkl"
+    bundle_path: str | None = None
+    eager_load: bool = True
+    reload_watch: bool = False
+    reload_poll_interval: float = 30.0
+    admin_token: str | None = None
     host: str = "0.0.0.0"
     port: int = 8080
+    max_batch_size: int = 1000
+    suggestion_workers: int = 1
+    cache_size: int = 1024
+    cache_ttl: float = 3600.0
+    distant_clusters: int = 1
+    serve_mode: str = "development"
+    workers: int = 0
+    executor_workers: int = 4
+    max_queue_depth: int = 64
+    backlog: int = 2048
+    limit_concurrency: int | None = None
+    metrics_enabled: bool = True
+    metrics_dir: str | None = None
+    metrics_write_interval: float = 1.0
+    log_level: str = "INFO"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,81 @@
+import logging
+import os
+import time
+
+import click
+
+from config import settings
+from src.CatalogExporter import CatalogExporter
+from src.MovieAntiRecommender import MovieAntiRecommender
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@click.group()
+def cli():
+    """Offline anti-recommendation jobs"""
+    pass
+
+
+@cli.command()
+@click.option('--data-path', default=settings.data_path, help='Cleaned movies CSV file')
+@click.option('--model-path', default=settings.model_path, help='Fitted clustering model')
+@click.option('--bundle-path', default=settings.bundle_path, help='Serving bundle, used instead of the CSV and model')
+@click.option('--distant-clusters', default=settings.distant_clusters,
+              help='Number of most distant clusters recommendations are sampled from')
+@click.option('--workers', default=None, type=int, help='Number of worker processes, defaults to the number of CPUs')
+@click.option('--chunk-size', default=10000, help='Movies sampled and written at a time, one Parquet row group each')
+@click.option('--seed', default=42, help='Random seed, the same seed gives the same recommendations')
+@click.option('--output', default='data/anti_recommendations.parquet', help='Output Parquet file')
+def export(data_path, model_path, bundle_path, distant_clusters, workers, chunk_size, seed, output):
+    """Precompute anti-recommendations for every movie of the catalog"""
+
+    try:
+        recommender = MovieAntiRecommender(distant_clusters=distant_clusters)
+        if bundle_path:
+            recommender.load_bundle(bundle_path)
+        else:
+            recommender.load_dataset(data_path, model_path)
+
+        start = time.perf_counter()
+        exporter = CatalogExporter(recommender, workers=workers, chunk_size=chunk_size, seed=seed)
+        metadata = exporter.export(output)
+
+        logger.info(f"Exported anti-recommendations of {metadata['n_movies']} movies to {output} "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    except Exception as e:
+        logger.error(f"Error during export: {str(e)}")
+        raise click.Abort()
+
+
+@cli.command()
+@click.option('--data-path', default=settings.data_path, help='Cleaned movies CSV file')
+@click.option('--model-path', default=settings.model_path, help='Fitted clustering model')
+@click.option('--bundle-path', default=settings.bundle_path, help='Serving bundle, used instead of the CSV and model')
+@click.option('--output', default='data/catalog.bundle', help='Output serving bundle with prebuilt indexes')
+def bundle(data_path, model_path, bundle_path, output):
+    """Write a serving bundle with prebuilt lookup indexes, which the application maps instead of building them"""
+
+    try:
+        recommender = MovieAntiRecommender()
+        if bundle_path:
+            recommender.load_bundle(bundle_path)
+        else:
+            recommender.load_dataset(data_path, model_path)
+
+        # the output may replace the bundle it was loaded from, which is still mapped
+        temporary_path = f"{output}.tmp"
+        recommender.save_bundle(temporary_path)
+        os.replace(temporary_path, output)
+
+        logger.info(f"Saved serving bundle of {len(recommender.catalog)} movies with prebuilt indexes to {output}")
+
+    except Exception as e:
+        logger.error(f"Error during bundle export: {str(e)}")
+        raise click.Abort()
+
+
+if __name__ == '__main__':
+    cli()
@@ -1,14 +1,90 @@
 import logging
-from fastapi import FastAPI, Depends
+import os
+import signal
+from contextlib import asynccontextmanager
+import time
+from fastapi import FastAPI, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 from src.MovieAntiRecommender import MovieAntiRecommender
+from src.RecommenderHolder import RecommenderHolder
+from src.BoundedExecutor import BoundedExecutor
+from src.Metrics import Metrics
+from src.MetricsDirectory import MetricsDirectory
 from config import settings
 
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=settings.log_level.upper())
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+metrics = Metrics() if settings.metrics_enabled else None
+if metrics is not None:
+    metrics.describe("antirecommender_request_seconds", "HTTP request latency in seconds")
+    metrics.describe("antirecommender_stage_seconds", "Time spent in each stage of a recommender operation")
+    metrics.describe("antirecommender_title_resolutions_total", "Title lookups by the path which resolved them")
+
+# forked workers sum their metrics through this directory, set by run.py in production mode
+metrics_directory = MetricsDirectory(metrics, settings.metrics_dir) if metrics is not None and settings.metrics_dir \
+    else None
+
+
+def create_recommender():
+    logger.info("Initializing recommender...")
+    logger.info(f"Ititializing with data path: {settings.data_path} and model path: {settings.model_path}")
+    recommender = MovieAntiRecommender(suggestion_workers=settings.suggestion_workers,
+                                       cache_size=settings.cache_size,
+                                       cache_ttl=settings.cache_ttl,
+                                       metrics=metrics,
+                                       distant_clusters=settings.distant_clusters)
+    if settings.bundle_path:
+        logger.info(f"Loading serving bundle: {settings.bundle_path}")
+        recommender.load_bundle(settings.bundle_path)
+    else:
+        recommender.load_dataset(settings.data_path, settings.model_path)
+    recommender.warmup()
+    logger.info("Recommender initialized successfully")
+    logger.info(f"Using dataset: {settings.data_path} and model: {settings.model_path}")
+    return recommender
+
+
+recommender_holder = RecommenderHolder(create_recommender)
+executor = BoundedExecutor(settings.executor_workers, settings.max_queue_depth)
+
+
+def get_recommender():
+    return recommender_holder.get()
+
+
+def watched_paths():
+    if settings.bundle_path:
+        return [settings.bundle_path]
+    return [settings.data_path, settings.model_path]
+
+
+def supervisor_pid():
+    """
+    Process id of the prefork supervisor which owns reloads, None when not running under one.
+    """
+    return getattr(app.state, "supervisor_pid", None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load in a background thread, the event loop keeps answering health checks meanwhile
+    if settings.eager_load:
+        recommender_holder.load_in_background()
+    # a prefork supervisor watches the files itself and replaces its workers on changes
+    if settings.reload_watch and supervisor_pid() is None:
+        recommender_holder.watch(watched_paths(), settings.reload_poll_interval)
+    if metrics_directory is not None:
+        metrics_directory.start(settings.metrics_write_interval)
+    yield
+    recommender_holder.stop_watching()
+    if metrics_directory is not None:
+        metrics_directory.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,20 +95,16 @@ app.add_middleware(
 )
 
 
-def get_recommender():
-    if not hasattr(get_recommender, "instance"):
-        try:
-            logger.info("Initializing recommender...")
-            logger.info(f"Ititializing with data path: {settings.data_path} and model path: {settings.model_path}")
-            recommender = MovieAntiRecommender()
-            recommender.load_dataset(settings.data_path, settings.model_path)
-            logger.info("Recommender initialized successfully")
-            logger.info(f"Using dataset: {settings.data_path} and model: {settings.model_path}")
-            get_recommender.instance = recommender
-        except Exception as e:
-            logger.error(f"Error initializing recommender: {e}")
-            raise
-    return get_recommender.instance
+if metrics is not None:
+    @app.middleware("http")
+    async def observe_request_latency(request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        # label by route template, raw paths would create a series per query
+        route = request.scope.get("route")
+        metrics.observe("antirecommender_request_seconds", time.perf_counter() - start, method=request.method,
+                        path=route.path if route is not None else "unmatched", status=response.status_code)
+        return response
 
 
 class RecommendationRequest(BaseModel):
@@ -40,18 +112,58 @@ class RecommendationRequest(BaseModel):
     year: int | None = None
 
 
+class BatchRecommendationRequest(BaseModel):
+    items: list[RecommendationRequest]
+
+
 class SearchSuggestionRequest(BaseModel):
     query: str
 
 
+class RawJSONResponse(Response):
+    """
+    Response whose content is already encoded JSON, sent as is.
+    """
+    media_type = "application/json"
+
+
+def busy_response():
+    executor.reject()
+    logger.warning(f"Rejecting request, {executor.pending} requests already pending")
+    return JSONResponse({"error": "Server is busy, try again later"}, status_code=503, headers={"Retry-After": "1"})
+
+
 @app.post("/recommend")
-def recommend_movies(request: RecommendationRequest, recommender: MovieAntiRecommender = Depends(get_recommender)):
+async def recommend_movies(request: RecommendationRequest,
+                           recommender: MovieAntiRecommender = Depends(get_recommender)):
+    if executor.saturated:
+        return busy_response()
     try:
         logger.info(f"Received recommendation request for movie: {request.movie_title}, year: {request.year}")
-        recommendations = recommender.recommend(str(request.movie_title),
-                                                request.year)
-        logger.info(f"Recommendations: {recommendations}")
-        return recommendations
+        recommendations = await executor.run(recommender.recommend_json, str(request.movie_title), request.year)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Recommendations: {recommendations.decode()}")
+        return RawJSONResponse(recommendations)
+    except ValueError as e:
+        logger.error(f"Error recommending movies: {e}")
+        return {"error": str(e)}
+    except Exception:
+        logger.error("An unexpected error occurred")
+        return {"error": "An unexpected error occurred"}
+
+
+@app.post("/recommend/batch")
+async def recommend_movies_batch(request: BatchRecommendationRequest,
+                                 recommender: MovieAntiRecommender = Depends(get_recommender)):
+    if executor.saturated:
+        return busy_response()
+    try:
+        logger.info(f"Received batch recommendation request for {len(request.items)} movies")
+        if len(request.items) > settings.max_batch_size:
+            return {"error": f"Batch size exceeds the limit of {settings.max_batch_size} movies"}
+        results = await executor.run(recommender.recommend_many_json,
+                                     [(str(item.movie_title), item.year) for item in request.items])
+        return RawJSONResponse(b'{"results":[' + b",".join(results) + b"]}")
     except ValueError as e:
         logger.error(f"Error recommending movies: {e}")
         return {"error": str(e)}
@@ -61,12 +173,64 @@ def recommend_movies(request: RecommendationRequest, recommender: MovieAntiRecom
 
 
 @app.get("/search-suggestions")
-def search_suggestions(query: str, recommender: MovieAntiRecommender = Depends(get_recommender)):
+async def search_suggestions(query: str, recommender: MovieAntiRecommender = Depends(get_recommender)):
+    if executor.saturated:
+        return busy_response()
     try:
         logger.info(f"Received search suggestions request for query: {query}")
-        suggestions = recommender.search_suggestions(query)
-        logger.info(f"Suggestions: {suggestions}")
+        suggestions = await executor.run(recommender.search_suggestions, query)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Suggestions: {suggestions}")
         return {"suggestions": suggestions}
     except Exception as e:
         logger.error(f"Error searching suggestions: {e}")
         return {"error": str(e)}
+
+
+# caches and executors belong to the worker process answering, which is named in the stats
+@app.get("/cache-stats")
+def cache_stats(recommender: MovieAntiRecommender = Depends(get_recommender)):
+    return {**recommender.cache_stats(), "worker": os.getpid()}
+
+
+@app.get("/executor-stats")
+def executor_stats():
+    return {**executor.stats(), "worker": os.getpid()}
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    if metrics is None:
+        return JSONResponse({"error": "Metrics are disabled"}, status_code=404)
+    registry = metrics_directory.collect() if metrics_directory is not None else metrics
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    status = recommender_holder.status()
+    return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+
+@app.post("/admin/reload")
+def reload_recommender(x_admin_token: str | None = Header(default=None)):
+    if not settings.admin_token:
+        return JSONResponse({"error": "Admin endpoints are disabled"}, status_code=403)
+    if x_admin_token != settings.admin_token:
+        return JSONResponse({"error": "Invalid admin token"}, status_code=401)
+
+    if supervisor_pid() is not None:
+        # reloading this worker alone would leave the others serving the old data
+        os.kill(supervisor_pid(), signal.SIGHUP)
+        logger.info(f"Reload requested from supervisor {supervisor_pid()}")
+        return JSONResponse({"reload_started": True, "generation": recommender_holder.generation}, status_code=202)
+
+    started = recommender_holder.reload_in_background()
+    logger.info(f"Reload requested, started: {started}")
+    return JSONResponse({"reload_started": started, "generation": recommender_holder.generation},
+                        status_code=202 if started else 409)
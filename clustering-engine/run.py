@@ -1,17 +1,54 @@
 import logging
+import os
+import tempfile
 import uvicorn
 from config import settings
+from src.MetricsDirectory import MetricsDirectory
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 print("Starting server...")
 
+
+def serve_production():
+    """
+    Load the recommender once, then fork the worker processes sharing it.
+
+    The process stays the workers' supervisor: SIGHUP, ``/admin/reload`` and,
+    with ``RELOAD_WATCH``, changes of the data files reload the recommender
+    here and replace the workers by forks of the reloaded process.
+    """
+    if settings.metrics_enabled:
+        # every worker writes its metrics here, so any of them can answer a scrape with the totals
+        if not settings.metrics_dir:
+            settings.metrics_dir = tempfile.mkdtemp(prefix="antirecommender-metrics-")
+        MetricsDirectory.clear(settings.metrics_dir)
+
+    from main import app, recommender_holder, watched_paths
+    from src.PreforkServer import PreforkServer
+
+    # load before forking, so workers share the loaded data instead of each loading it
+    recommender_holder.get()
+    logger.info(f"Recommender preloaded, load timings: {recommender_holder.timings}")
+
+    app.state.supervisor_pid = os.getpid()
+    check_reload = recommender_holder.change_detector(watched_paths()) if settings.reload_watch else None
+    server = PreforkServer(app, host=settings.host, port=settings.port, workers=settings.workers,
+                           backlog=settings.backlog, limit_concurrency=settings.limit_concurrency,
+                           reload=recommender_holder.reload, check_reload=check_reload,
+                           check_interval=settings.reload_poll_interval)
+    server.serve()
+
+
 if __name__ == "__main__":
     logger.info("Starting server...")
-    uvicorn.run(
-        "main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=True
-    )
+    if settings.serve_mode == "production":
+        serve_production()
+    else:
+        uvicorn.run(
+            "main:app",
+            host=settings.host,
+            port=settings.port,
+            reload=True
+        )
@@ -0,0 +1,78 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedExecutor:
+    """
+    Thread pool for CPU-heavy request work with a bounded queue.
+
+    Handlers await ``run`` instead of doing fuzzy matching on the event loop
+    or on Starlette's large default threadpool, so only ``max_workers``
+    requests compete for the GIL at a time. At most ``max_queue`` more wait for
+    a free thread; beyond that the executor is ``saturated`` and callers should
+    reject the request right away instead of queueing it.
+
+    ``run`` and ``saturated`` are meant to be used from the event loop thread,
+    which keeps the pending counter consistent without a lock.
+    """
+
+    def __init__(self, max_workers=4, max_queue=64):
+        """
+        Args:
+            max_workers (int, optional): Number of worker threads. Defaults to 4.
+            max_queue (int, optional): Number of calls allowed to wait for a
+                worker thread. Defaults to 64.
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recommender-worker")
+
+    @property
+    def saturated(self):
+        return self.pending >= self.max_workers + self.max_queue
+
+    def reject(self):
+        """
+        Count a call turned away because the executor was saturated.
+        """
+        self.rejected += 1
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a function on a worker thread and wait for its result.
+
+        Args:
+            func (callable): Function to run
+            *args: Positional arguments of ``func``
+            **kwargs: Keyword arguments of ``func``
+
+        Returns:
+            Whatever ``func`` returned
+
+        Raises:
+            Exception: Whatever ``func`` raised
+        """
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Worker count, queue limit, pending, completed and rejected calls
+        """
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,173 @@
+import json
+import logging
+import multiprocessing
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# recommender shared with the forked pool processes, set before the pool is created
+_recommender = None
+
+
+def _sample_chunk(task):
+    """
+    Sample the anti-recommendations of one chunk of catalog rows.
+
+    Args:
+        task (tuple): Chunk index, first row, row after the last one and seed
+
+    Returns:
+        tuple: First row of the chunk and the (rows, rating bands) recommended movie ids, -1 for none
+    """
+    chunk, start, stop, seed = task
+    # a generator per chunk keeps the output independent of the number and scheduling of processes
+    rng = np.random.default_rng([seed, chunk])
+    picked = _recommender.sample_rows(np.arange(start, stop), rng=rng)
+    movie_ids = np.where(picked >= 0, _recommender.catalog.movie_ids[np.maximum(picked, 0)], -1)
+    return start, movie_ids.astype(np.int32)
+
+
+class CatalogExporter:
+    """
+    Precompute anti-recommendations for every movie of the catalog.
+
+    Goes straight from catalog rows to their distant clusters, without
+    resolving titles. The catalog is split in chunks sampled on a pool of
+    forked processes which share the loaded recommender, and every chunk is
+    appended to a Parquet file as one row group as soon as it is done, so
+    memory stays bounded by the chunk size whatever the catalog size.
+
+    The file has a ``movie_id`` column with the query movie ids and one
+    ``<band>_rated`` column per rating band with the recommended movie ids
+    (-1 if the band has no movie in the distant clusters), all int32, in
+    catalog order. The export parameters are stored in the file's metadata.
+    Writing and loading the file needs pyarrow.
+    """
+
+    METADATA_KEY = b"anti_recommendations"
+
+    def __init__(self, recommender, workers=None, chunk_size=10000, seed=42):
+        """
+        Args:
+            recommender (MovieAntiRecommender): Loaded recommender
+            workers (int, optional): Number of processes. Defaults to the number of CPUs.
+            chunk_size (int, optional): Movies sampled and written at a time, the
+                rows of one row group. Defaults to 10000.
+            seed (int, optional): Seed of the sampling, the same seed gives the same
+                output for any number of processes. Defaults to 42.
+        """
+        self.recommender = recommender
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.seed = seed
+
+    def columns(self):
+        """
+        Returns:
+            list: Names of the recommendation columns, one per rating band
+        """
+        return [f"{band}_rated" for band in self.recommender.RATING_BANDS]
+
+    def _tasks(self):
+        n_movies = len(self.recommender.catalog)
+        return [(chunk, start, min(start + self.chunk_size, n_movies), self.seed)
+                for chunk, start in enumerate(range(0, n_movies, self.chunk_size))]
+
+    def export(self, output_path):
+        """
+        Sample and write the anti-recommendations of the whole catalog.
+
+        The file is written next to ``output_path`` and moved over it once
+        complete, so readers never see a partial export.
+
+        Args:
+            output_path (str): Parquet file, its directory is created if missing
+
+        Returns:
+            dict: The export parameters stored in the file's metadata
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        global _recommender
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        columns = self.columns()
+        metadata = {
+            "n_movies": len(self.recommender.catalog),
+            "seed": self.seed,
+            "chunk_size": self.chunk_size,
+            "distant_clusters": int(self.recommender.distant_clusters.shape[1]),
+            "missing": -1,
+        }
+        schema = pa.schema([(column, pa.int32()) for column in ["movie_id"] + columns],
+                           metadata={self.METADATA_KEY: json.dumps(metadata)})
+
+        tasks = self._tasks()
+        temporary_path = f"{output_path}.tmp"
+        _recommender = self.recommender
+        try:
+            with pq.ParquetWriter(temporary_path, schema, compression="zstd") as writer:
+                if self.workers > 1 and len(tasks) > 1:
+                    # forked processes see the loaded recommender without pickling it, imap hands the
+                    # chunks over in catalog order so the row groups follow the catalog
+                    with multiprocessing.get_context("fork").Pool(self.workers) as pool:
+                        self._write_chunks(pool.imap(_sample_chunk, tasks), writer, schema, len(tasks))
+                else:
+                    self._write_chunks(map(_sample_chunk, tasks), writer, schema, len(tasks))
+            os.replace(temporary_path, output_path)
+        finally:
+            _recommender = None
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        return metadata
+
+    def _write_chunks(self, chunks, writer, schema, n_chunks):
+        import pyarrow as pa
+
+        catalog_ids = self.recommender.catalog.movie_ids
+        for done, (start, movie_ids) in enumerate(chunks, start=1):
+            arrays = [catalog_ids[start:start + len(movie_ids)].astype(np.int32)]
+            arrays += [movie_ids[:, band] for band in range(movie_ids.shape[1])]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=len(movie_ids))
+            if done % 10 == 0 or done == n_chunks:
+                logger.info(f"Exported {done}/{n_chunks} chunks")
+
+    @classmethod
+    def read_metadata(cls, path):
+        """
+        Read the export parameters of a file written by ``export``.
+
+        Args:
+            path (str): Parquet file
+
+        Returns:
+            dict: The export parameters
+        """
+        import pyarrow.parquet as pq
+
+        return json.loads(pq.read_schema(path).metadata[cls.METADATA_KEY])
+
+    @staticmethod
+    def load(path, columns=None, movie_ids=None):
+        """
+        Load exported anti-recommendations.
+
+        Args:
+            path (str): Parquet file written by ``export``
+            columns (list, optional): Recommendation columns to read. Defaults to all of them.
+            movie_ids (list, optional): Only read the rows of these query movie ids,
+                row groups which cannot hold any of them are skipped. Defaults to all movies.
+
+        Returns:
+            pd.DataFrame: ``movie_id`` and the requested columns, int32, -1 for no recommendation
+        """
+        import pyarrow.parquet as pq
+
+        if columns is not None:
+            columns = ["movie_id"] + [column for column in columns if column != "movie_id"]
+        filters = [("movie_id", "in", list(movie_ids))] if movie_ids is not None else None
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
@@ -0,0 +1,88 @@
+import numpy as np
+import orjson
+
+
+class JsonFragments:
+    """
+    Read-only table of pre-serialized JSON values, one per row.
+
+    Every value is encoded once into a single byte buffer addressed by
+    offsets, so a response listing some rows is a join of buffer slices
+    instead of building and encoding Python objects per request.
+    """
+
+    def __init__(self, buffer, offsets):
+        """
+        Wrap already encoded values.
+
+        Args:
+            buffer (bytes): Concatenated JSON encodings of all rows, or any
+                buffer such as a memoryview of a memory-mapped array
+            offsets (np.ndarray): int64 offsets, row ``i`` is ``buffer[offsets[i]:offsets[i + 1]]``
+        """
+        self.buffer = buffer
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Encode a sequence of JSON serializable values.
+
+        Args:
+            values (iterable): Values, one per row
+
+        Returns:
+            JsonFragments: Encoded values
+        """
+        encoded = [orjson.dumps(value) for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Wrap the arrays produced by ``to_arrays`` without copying them.
+        """
+        return cls(memoryview(arrays["data"]), arrays["offsets"])
+
+    def to_arrays(self):
+        """
+        Returns:
+            dict: Array name -> np.ndarray
+        """
+        return {"data": np.frombuffer(self.buffer, dtype=np.uint8), "offsets": self.offsets}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return bytes(self.buffer[self.offsets[row]:self.offsets[row + 1]])
+
+    def take(self, rows):
+        """
+        Encoded values of several rows.
+
+        Args:
+            rows (array-like): Row ids
+
+        Returns:
+            list: bytes-like value of every row
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        buffer = self.buffer
+        starts = self.offsets[rows].tolist()
+        stops = self.offsets[rows + 1].tolist()
+        return [buffer[start:stop] for start, stop in zip(starts, stops)]
+
+    def array(self, rows):
+        """
+        Encode several rows as a JSON array.
+
+        Args:
+            rows (array-like): Row ids
+
+        Returns:
+            bytes: JSON array of the rows' values
+        """
+        return b"[" + b",".join(self.take(rows)) + b"]"
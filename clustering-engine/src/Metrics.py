@@ -0,0 +1,167 @@
+import bisect
+import threading
+import time
+
+
+class Metrics:
+    """
+    Minimal in-process registry of counters and histograms.
+
+    Renders the Prometheus text exposition format, so a ``/metrics`` endpoint
+    can be scraped without extra dependencies. Every worker process keeps its
+    own registry, registries of several workers are summed with ``snapshot``
+    and ``merge``.
+    """
+
+    DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                       1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (tuple, optional): Upper bounds of the histogram buckets in seconds
+        """
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._descriptions = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, description):
+        """
+        Set the HELP text of a metric.
+        """
+        self._descriptions[name] = description
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Add to a counter.
+
+        Args:
+            name (str): Metric name
+            amount (float, optional): Increment. Defaults to 1.
+            **labels: Label values of the counter
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """
+        Record a value, usually a duration in seconds, in a histogram.
+
+        Args:
+            name (str): Metric name
+            value (float): Observed value
+            **labels: Label values of the histogram
+        """
+        key = (name, tuple(sorted(labels.items())))
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # per bucket counts, the last one for values above every bound, then sum
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[bucket] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        """
+        Copy the recorded values.
+
+        Returns:
+            dict: Picklable counters and histograms, which ``merge`` adds to a registry
+        """
+        with self._lock:
+            return {"buckets": self.buckets, "descriptions": dict(self._descriptions), "counters": dict(self._counters),
+                    "histograms": {key: list(histogram) for key, histogram in self._histograms.items()}}
+
+    def merge(self, snapshot):
+        """
+        Add the values of a snapshot, e.g. of another worker, to this registry.
+
+        Raises:
+            ValueError: If the snapshot's histograms have other buckets
+        """
+        if tuple(snapshot["buckets"]) != self.buckets:
+            raise ValueError("Can't merge histograms with different buckets")
+        for name, description in snapshot["descriptions"].items():
+            self._descriptions.setdefault(name, description)
+        with self._lock:
+            for key, value in snapshot["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, values in snapshot["histograms"].items():
+                histogram = self._histograms.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+                for position, value in enumerate(values):
+                    histogram[position] += value
+
+    def timer(self, operation):
+        """
+        Start timing the stages of one operation.
+
+        Returns:
+            StageTimer: Timer recording into the ``antirecommender_stage_seconds`` histogram
+        """
+        return StageTimer(self, operation)
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        values = ",".join(f'{name}="{str(value)}"' for name, value in labels)
+        return "{" + values + "}"
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(histogram) for key, histogram in self._histograms.items()}
+
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in self._descriptions:
+                    lines.append(f"# HELP {name} {self._descriptions[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), histogram[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {histogram[-1]}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Records the time between consecutive ``lap`` calls as stage durations.
+    """
+
+    def __init__(self, metrics, operation):
+        self.metrics = metrics
+        self.operation = operation
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        """
+        Record the time since the previous lap, or since the start, as ``stage``.
+        """
+        now = time.perf_counter()
+        self.metrics.observe("antirecommender_stage_seconds", now - self.last, operation=self.operation, stage=stage)
+        self.last = now
@@ -0,0 +1,102 @@
+import logging
+import os
+import pickle
+import threading
+
+from src.Metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsDirectory:
+    """
+    Share the metrics of forked worker processes through a directory.
+
+    Every worker writes a snapshot of its registry to a file named after its
+    process id, at a fixed interval and whenever it is scraped. The worker
+    answering ``/metrics`` sums the snapshots of all workers, so the totals
+    don't depend on which worker the kernel handed the scrape to. Files of
+    workers which exited are kept and still summed, so counters never go
+    back when a worker is replaced.
+    """
+
+    SUFFIX = ".metrics"
+
+    def __init__(self, metrics, directory):
+        """
+        Args:
+            metrics (Metrics): Registry of the current process
+            directory (str): Directory shared by all worker processes
+        """
+        self.metrics = metrics
+        self.directory = directory
+        self._stop = None
+
+    @classmethod
+    def clear(cls, directory):
+        """
+        Create the directory or remove the snapshots a previous server left in it.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(cls.SUFFIX):
+                os.remove(os.path.join(directory, name))
+
+    def write(self):
+        """
+        Write the snapshot of the current process, replacing its previous one.
+        """
+        path = os.path.join(self.directory, f"{os.getpid()}{self.SUFFIX}")
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(self.metrics.snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def collect(self):
+        """
+        Sum the snapshots of every worker, including a fresh one of this process.
+
+        Returns:
+            Metrics: Registry with the totals of all workers
+        """
+        self.write()
+        total = Metrics(self.metrics.buckets)
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    total.merge(pickle.load(f))
+            except (OSError, EOFError, pickle.UnpicklingError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {name}: {e}")
+        return total
+
+    def start(self, interval=1.0):
+        """
+        Write the snapshot of the current process every ``interval`` seconds.
+
+        Returns:
+            threading.Thread: The writer thread, stopped by ``stop``
+        """
+        self.stop()
+        stop = threading.Event()
+        self._stop = stop
+
+        def write_periodically():
+            while not stop.wait(interval):
+                try:
+                    self.write()
+                except OSError as e:
+                    logger.error(f"Error writing metrics snapshot: {e}")
+
+        writer = threading.Thread(target=write_periodically, name="metrics-writer", daemon=True)
+        writer.start()
+        return writer
+
+    def stop(self):
+        """
+        Stop the writer started by ``start`` and write a last snapshot.
+        """
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+            self.write()
@@ -1,45 +1,273 @@
+import logging
+import time
 import numpy as np
+import orjson
 import pandas as pd
 import joblib
-from difflib import get_close_matches
-from rapidfuzz import process, fuzz
+from src.JsonFragments import JsonFragments
+from src.MovieCatalog import MovieCatalog
+from src.ResultCache import ResultCache
+from src.ServingBundle import ServingBundle
+from src.SuggestionEngine import SuggestionEngine
+from src.TitleIndex import TitleIndex
+
+logger = logging.getLogger(__name__)
 
 
 class MovieAntiRecommender:
     """
     A class that recommends movies that are dissimilar to a given movie.
-    Uses clustering to find movies that are in the most distant cluster
+    Uses clustering to find movies that are in the most distant clusters
     and filters them by rating.
     """
 
-    def __init__(self):
+    # rating bands of ``rating_buckets``, in order
+    RATING_BANDS = ("low", "high", "top")
+    # version of the lookup indexes saved in serving bundles, bumped whenever their arrays change
+    INDEX_VERSION = 1
+
+    def __init__(self, suggestion_workers=1, cache_size=1024, cache_ttl=3600.0, metrics=None,
+                 distant_clusters=1):
         """
         Initialize MovieAntiRecommender with empty attributes.
+
+        Args:
+            suggestion_workers (int, optional): Number of threads used to score
+                search suggestions, -1 uses all cores. Defaults to 1.
+            cache_size (int, optional): Maximum number of cached title resolutions
+                and search suggestions each. Defaults to 1024.
+            cache_ttl (float, optional): Seconds a cached entry stays valid.
+                Defaults to 3600.
+            metrics (Metrics, optional): Registry receiving stage timings and
+                title resolution paths. Nothing is measured if not given.
+            distant_clusters (int, optional): Number of most distant clusters
+                recommendations are sampled from. Defaults to 1, the farthest only.
         """
-        self.dataset = None
+        self.metrics = metrics
+        self.n_distant_clusters = distant_clusters
+        self.suggestion_workers = suggestion_workers
+        self.title_cache = ResultCache(cache_size, cache_ttl)
+        self.suggestion_cache = ResultCache(cache_size, cache_ttl)
+        self.catalog = None
         self.model = None
+        self.labels = None
+        self.cluster_centers = None
         self.silhouette_avg = None
         self.rating_quantiles = None
+        self.title_index = None
+        self.farthest_clusters = None
+        self.distant_clusters = None
+        self.rating_buckets = None
+        self.record_fragments = None
+        self.suggestion_engine = None
+        self.load_timings = {}
 
     def load_dataset(self, name: str, model_name: str):
         """
         Load the movie dataset and pre-trained clustering model.
 
         Args:
-            name (str): Path to the CSV file containing movie dataset
+            name (str): Path to the CSV or Parquet file containing movie dataset.
+                Reading Parquet needs pyarrow.
             model_name (str): Path to the saved clustering model file
 
         Raises:
             AssertionError: If dataset size doesn't match model labels size
         """
-        self.dataset = pd.read_csv(name)
+        start = time.perf_counter()
+        if name.endswith(".parquet"):
+            movies_df = pd.read_parquet(name, columns=list(MovieCatalog.DATAFRAME_COLUMNS))
+        else:
+            movies_df = pd.read_csv(name, usecols=list(MovieCatalog.DATAFRAME_COLUMNS))
+        self.catalog = MovieCatalog.from_dataframe(movies_df)
         self.model = joblib.load(model_name)
+        self.labels = np.ascontiguousarray(self.model.labels_, dtype=np.int32)
+        self.cluster_centers = np.ascontiguousarray(self.model.cluster_centers_)
+        self.load_timings = {"read_seconds": time.perf_counter() - start}
+
+        self._build_indexes(getattr(self.model, "distant_clusters_", None))
+
+    def load_bundle(self, bundle_path: str):
+        """
+        Load the movie catalog and clustering from a serving bundle.
+
+        The bundle is memory-mapped, so the catalog, labels and cluster centers
+        are not copied and are shared between processes serving the same file.
+        Lookup indexes saved in the bundle by ``save_bundle`` are mapped the
+        same way, otherwise they are built from the catalog.
+
+        Args:
+            bundle_path (str): Path to the bundle written by the preprocessor
+                ``export`` command or by ``save_bundle``
+
+        Raises:
+            AssertionError: If dataset size doesn't match model labels size
+        """
+        start = time.perf_counter()
+        bundle = ServingBundle.open(bundle_path)
+        self.catalog = MovieCatalog.from_arrays(bundle.arrays)
+        self.model = None
+        self.labels = bundle["labels"]
+        self.cluster_centers = bundle["cluster_centers"]
+        self.load_timings = {"read_seconds": time.perf_counter() - start}
+
+        indexes = None
+        index_version = bundle.metadata.get("index_version")
+        if index_version == self.INDEX_VERSION:
+            indexes = bundle.arrays
+        elif index_version is not None:
+            logger.warning(f"Serving bundle indexes have version {index_version}, expected {self.INDEX_VERSION}, "
+                           f"rebuilding them")
+        self._build_indexes(bundle.arrays.get("distant_clusters"), indexes)
+
+    def save_bundle(self, bundle_path: str):
+        """
+        Write the loaded catalog, clustering and lookup indexes to a serving bundle.
+
+        Args:
+            bundle_path (str): Output file path
+        """
+        arrays = self.catalog.to_arrays()
+        arrays["labels"] = self.labels
+        arrays["cluster_centers"] = self.cluster_centers
+        arrays["distant_clusters"] = self.distant_clusters
+        arrays.update(self._index_arrays())
+        ServingBundle.write(bundle_path, arrays, {"n_movies": len(self.catalog),
+                                                  "n_clusters": int(self.cluster_centers.shape[0]),
+                                                  "index_version": self.INDEX_VERSION})
+
+    def _index_arrays(self):
+        """
+        Flatten the lookup indexes into named arrays for a serving bundle.
+
+        Returns:
+            dict: Array name -> np.ndarray
+        """
+        arrays = {}
+        for prefix, index_arrays in (("title_index.", self.title_index.to_arrays()),
+                                     ("suggestions.", self.suggestion_engine.to_arrays()),
+                                     ("record_fragments.", self.record_fragments.to_arrays())):
+            for name, array in index_arrays.items():
+                arrays[prefix + name] = array
+        for band, (rows, offsets) in zip(self.RATING_BANDS, self.rating_buckets):
+            arrays[f"rating_buckets.{band}.rows"] = rows
+            arrays[f"rating_buckets.{band}.offsets"] = offsets
+        return arrays
+
+    @staticmethod
+    def _prefixed(arrays, prefix):
+        """
+        Arrays whose name starts with a prefix, keyed by the rest of the name.
+        """
+        return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
 
-        self.rating_quantiles = self.dataset['rating'].quantile([0.25, 0.75, 0.97]).to_numpy()
+    def _build_indexes(self, distant_clusters=None, indexes=None):
+        """
+        Build the lookup structures used for serving from the loaded catalog and clustering.
+
+        Args:
+            distant_clusters (np.ndarray, optional): Ranking of the most distant
+                clusters stored in the model artifact. Computed from the cluster
+                centers if not given or shorter than ``n_distant_clusters``.
+            indexes (dict, optional): Arrays of prebuilt indexes saved by
+                ``save_bundle``, which are wrapped instead of built.
+        """
+        start = time.perf_counter()
+        self.rating_quantiles = np.quantile(self.catalog.ratings, [0.25, 0.75, 0.97])
 
-        assert self.dataset.shape[0] == self.model.labels_.shape[0], "Dataset \
+        assert len(self.catalog) == self.labels.shape[0], "Dataset \
                                 and model labels have different number of rows"
 
+        if indexes is not None:
+            self.title_index = TitleIndex.from_arrays(self._prefixed(indexes, "title_index."), self.catalog.years)
+            self.suggestion_engine = SuggestionEngine.from_arrays(self._prefixed(indexes, "suggestions."),
+                                                                  workers=self.suggestion_workers)
+        else:
+            standardized_titles = self.catalog.standardized_titles.tolist()
+            self.title_index = TitleIndex(standardized_titles, self.catalog.years)
+            self.suggestion_engine = SuggestionEngine(standardized_titles, self.catalog.years,
+                                                      workers=self.suggestion_workers)
+
+        n_distant = max(1, min(self.n_distant_clusters, self.cluster_centers.shape[0] - 1))
+        if distant_clusters is None or distant_clusters.shape[1] < n_distant:
+            distant_clusters = self._compute_distant_clusters(self.cluster_centers, n_distant)
+        self.distant_clusters = np.ascontiguousarray(distant_clusters[:, :n_distant], dtype=np.int32)
+        self.farthest_clusters = self.distant_clusters[:, 0]
+
+        if indexes is not None:
+            self.rating_buckets = [(indexes[f"rating_buckets.{band}.rows"], indexes[f"rating_buckets.{band}.offsets"])
+                                   for band in self.RATING_BANDS]
+            self.record_fragments = JsonFragments.from_arrays(self._prefixed(indexes, "record_fragments."))
+        else:
+            ratings = self.catalog.ratings
+            self.rating_buckets = [
+                self._bucket_by_cluster(ratings < self.rating_quantiles[0]),
+                self._bucket_by_cluster(ratings > self.rating_quantiles[1]),
+                self._bucket_by_cluster(ratings > self.rating_quantiles[2]),
+            ]
+
+            # every record is encoded to JSON once, responses splice the encoded bytes
+            self.record_fragments = self.catalog.json_fragments()
+
+        # cached results refer to the previous dataset
+        self.title_cache.clear()
+        self.suggestion_cache.clear()
+
+        self.load_timings["index_seconds"] = time.perf_counter() - start
+
+    def warmup(self):
+        """
+        Run one uncached title resolution and suggestion search.
+
+        Touches the title index, the fuzzy matchers and the catalog pages so
+        the first real request does not pay for it.
+        """
+        start = time.perf_counter()
+        warmup_title = self.catalog.standardized_titles[0] if len(self.catalog) else "warmup"
+        self._resolve_title(warmup_title)
+        self._resolve_title(warmup_title[:-1] + "#")
+        self.suggestion_engine.suggest(warmup_title)
+        self.load_timings["warmup_seconds"] = time.perf_counter() - start
+
+    @staticmethod
+    def _compute_distant_clusters(cluster_centers, k=1):
+        """
+        Rank the most distant clusters of every cluster.
+
+        Args:
+            cluster_centers (np.ndarray): Cluster centers of the clustering model
+            k (int, optional): Number of distant clusters kept per cluster. Defaults to 1.
+
+        Returns:
+            np.ndarray: Array of shape (n_clusters, k) with the indexes of the
+                cluster centers ordered from the farthest
+        """
+        centers = np.asarray(cluster_centers, dtype=np.float64)
+        distances = np.linalg.norm(centers[:, None, :] - centers[None, :, :], axis=2)
+        # stable order keeps the first of equally distant clusters first, like argmax
+        return np.argsort(-distances, axis=1, kind="stable")[:, :k].astype(np.int32)
+
+    def _bucket_by_cluster(self, mask):
+        """
+        Group the rows selected by a mask by their cluster label.
+
+        Args:
+            mask (np.ndarray): Boolean mask over dataset rows
+
+        Returns:
+            tuple: A tuple containing:
+                - np.ndarray: Selected row ids ordered by cluster
+                - np.ndarray: Offsets such that rows of cluster ``c`` are
+                  ``rows[offsets[c]:offsets[c + 1]]``
+        """
+        rows = np.flatnonzero(mask).astype(np.int32)
+        labels = self.labels[rows]
+        rows = rows[np.argsort(labels, kind="stable")]
+        counts = np.bincount(labels, minlength=self.cluster_centers.shape[0])
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return rows, offsets
+
     def standardize_title(self, movie_title, year=None):
         """
         Find the exact movie in the dataset based on title and optional year.
@@ -59,41 +287,53 @@ class MovieAntiRecommender:
                 "message": "Please provide a movie title"
             }
 
-        movie_titles = self.dataset['standardized_title'].values
+        cache_key = (movie_title.lower(), None if year is None else int(year))
+        matching_titles_ids = self.title_cache.get(cache_key)
+        if matching_titles_ids is None:
+            timer = self.metrics.timer("standardize_title") if self.metrics is not None else None
+            matching_titles_ids = self._resolve_title(movie_title, year, timer)
+            self.title_cache.put(cache_key, matching_titles_ids)
+        elif self.metrics is not None:
+            self.metrics.increment("antirecommender_title_resolutions_total", path="cache")
+        return matching_titles_ids
+
+    def _resolve_title(self, movie_title, year=None, timer=None):
+        """
+        Look up a non-empty title in the title index, see ``standardize_title``.
 
+        If a StageTimer is given, the time of every lookup stage and the path
+        which produced the result (exact, contains, close_match or none) are
+        recorded.
+        """
         # zeroth try: exact match if query is directly the name of
         # the movie with proper spelling up to a case difference
-        matching_condition = self.dataset['standardized_title'].str.lower() == movie_title.lower()
-        if year is not None:
-            matching_condition &= self.dataset['year'].astype(int) == int(year)
-        matching_titles = self.dataset[matching_condition]
-        matching_titles_ids = matching_titles.index
-
-        if len(matching_titles) == 1:
-            return matching_titles.index
-
-        # First try: exact match after lowercasing for movies which contains the query
-        matching_titles = np.array([str(title) for title in movie_titles
-                                  if movie_title.lower() in title.lower()])
-        if len(matching_titles) > 0:
-            matching_titles_ids = self.dataset[self.dataset['standardized_title'].isin(matching_titles)].index
-            if year is not None:
-                year_filter = self.dataset.loc[matching_titles_ids, 'year'].astype(int) == int(year)
-                matching_titles_ids = matching_titles_ids[year_filter]
-
-        # Second try: find close matches with low threshold
-        if len(matching_titles_ids) == 0:
-            print("No exact match found. Searching for close matches...")
-            matches = get_close_matches(movie_title.lower(),
-                                     [t.lower() for t in movie_titles],
-                                     n=5, cutoff=0.6)
-            matching_titles = np.array([title for title in movie_titles
-                                      if title.lower() in matches])
-            if len(matching_titles) > 0:
-                matching_titles_ids = self.dataset[self.dataset['standardized_title'].isin(matching_titles)].index
-                if year is not None:
-                    year_filter = self.dataset.loc[matching_titles_ids, 'year'].astype(int) == int(year)
-                    matching_titles_ids = matching_titles_ids[year_filter]
+        matching_titles_ids = self.title_index.exact(movie_title, year)
+        path = "exact"
+        if timer is not None:
+            timer.lap("exact")
+
+        if len(matching_titles_ids) != 1:
+            # First try: exact match after lowercasing for movies which contains the query
+            contained_titles_ids = self.title_index.contains(movie_title)
+            if len(contained_titles_ids) > 0:
+                matching_titles_ids = self.title_index.filter_year(contained_titles_ids, year)
+                path = "contains"
+            if timer is not None:
+                timer.lap("contains")
+
+            # Second try: find close matches with low threshold
+            if len(matching_titles_ids) == 0:
+                logger.debug("No exact match found. Searching for close matches...")
+                close_titles_ids = self.title_index.close_matches(movie_title, n=5, cutoff=0.6)
+                if len(close_titles_ids) > 0:
+                    matching_titles_ids = self.title_index.filter_year(close_titles_ids, year)
+                    path = "close_match"
+                if timer is not None:
+                    timer.lap("close_match")
+
+        if timer is not None:
+            self.metrics.increment("antirecommender_title_resolutions_total",
+                                   path=path if len(matching_titles_ids) > 0 else "none")
 
         if len(matching_titles_ids) == 0:
             return {
@@ -102,17 +342,16 @@ class MovieAntiRecommender:
                 "possible_matches": []
             }
 
-        matching_titles = self.dataset.loc[matching_titles_ids, 'standardized_title'].values
-        matching_titles_years = self.dataset.loc[matching_titles_ids, 'year'].values.astype(int)
-
-        if len(matching_titles) > 1:
+        if len(matching_titles_ids) > 1:
+            matching_titles = self.catalog.standardized_titles.take(matching_titles_ids)
+            matching_titles_years = self.catalog.years[matching_titles_ids].tolist()
             return {
                 "error": "Ambiguous match found",
                 "message": "Please be more specific. Did you mean one of these?",
-                "possible_matches": list(zip(matching_titles.tolist(), matching_titles_years.tolist()))
+                "possible_matches": list(zip(matching_titles, matching_titles_years))
             }
 
-        return matching_titles_ids
+        return pd.Index(matching_titles_ids)
 
     def recommend(self, movie_title, year=None):
         """
@@ -132,52 +371,187 @@ class MovieAntiRecommender:
                 OR
                 - error message and possible matches if movie not found
         """
-        movie_idx = self.standardize_title(movie_title, year)
+        return self.recommend_many([(movie_title, year)])[0]
+
+    def recommend_json(self, movie_title, year=None):
+        """
+        Generate anti-recommendations for a given movie as encoded JSON.
 
-        if isinstance(movie_idx, dict):
-            return movie_idx
+        Same as ``recommend``, but the response is spliced together from the
+        pre-serialized movie records instead of building dicts.
+
+        Args:
+            movie_title (str): Title of the movie to base recommendations on
+            year (int, optional): Release year of the movie. Defaults to None.
 
-        movie_cluster = self.model.labels_[movie_idx]
-        movie_cluster_center = self.model.cluster_centers_[movie_cluster]
+        Returns:
+            bytes: JSON encoding of the ``recommend`` result
+        """
+        return self.recommend_many_json([(movie_title, year)])[0]
 
-        cluster_distances = np.linalg.norm(movie_cluster_center.reshape(1, -1) - self.model.cluster_centers_, axis=1)
-        farthers_cluster_idx = np.argmax(cluster_distances)
+    def recommend_many(self, queries):
+        """
+        Generate anti-recommendations for a batch of movies.
 
-        possible_movies_low = self.dataset[(self.model.labels_ == farthers_cluster_idx) &
-                                           (self.dataset["rating"] < self.rating_quantiles[0])]
-        possible_movies_mid = self.dataset[(self.model.labels_ == farthers_cluster_idx) &
-                                           (self.dataset["rating"] > self.rating_quantiles[1])]
-        possible_movies_high = self.dataset[(self.model.labels_ == farthers_cluster_idx) &
-                                            (self.dataset["rating"] > self.rating_quantiles[2])]
+        Each distinct query is resolved once, and the farthest cluster lookup,
+        sampling and record building are done for the whole batch at once.
 
-        if len(possible_movies_low) > 0:
-            movie_low = possible_movies_low.sample(1)
-        else:
-            movie_low = pd.DataFrame()
+        Args:
+            queries (list): List of (movie_title, year) pairs, year may be None
 
-        if len(possible_movies_mid) > 0:
-            movie_mid = possible_movies_mid.sample(1)
-        else:
-            movie_mid = pd.DataFrame()
+        Returns:
+            list: One result per query, in the same format as ``recommend``.
+                Queries which could not be resolved get their own error dict.
+        """
+        timer = self.metrics.timer("recommend") if self.metrics is not None else None
+        results, query_positions, query_rows, picked = self._sample_recommendations(queries, timer)
+        if not query_positions:
+            return results
+
+        picked_rows = picked[picked >= 0]
+        records = self.catalog.records(picked_rows)
+
+        query_titles = self.catalog.titles.take(query_rows)
+        query_ratings = self.catalog.ratings[query_rows].tolist()
+        query_years = self.catalog.years[query_rows].tolist()
+
+        record_start = 0
+        for i, position in enumerate(query_positions):
+            record_stop = record_start + int(np.count_nonzero(picked[i] >= 0))
+            results[position] = {
+                "recommendations": records[record_start:record_stop],
+                # Add best match to recommendations
+                "query": {
+                    "title": query_titles[i],
+                    "rating": query_ratings[i],
+                    "year": query_years[i]
+                }
+            }
+            record_start = record_stop
 
-        if len(possible_movies_high) > 0:
-            movie_high = possible_movies_high.sample(1)
-        else:
-            movie_high = pd.DataFrame()
+        if timer is not None:
+            timer.lap("records")
+        return results
 
-        recommendations = pd.concat([movie_low, movie_mid, movie_high])
+    def recommend_many_json(self, queries):
+        """
+        Generate anti-recommendations for a batch of movies as encoded JSON.
 
-        recommendations = recommendations.drop(['movieId'], axis=1)
-        recommendations = recommendations.to_dict(orient='records')
-        recommendations = {"recommendations": recommendations}
+        Same as ``recommend_many``, but every result is spliced together from
+        the pre-serialized movie records.
 
-        # Add best match to recommendations
-        recommendations["query"] = {
-            "title": self.dataset.iloc[movie_idx].title.values[0],
-            "rating": float(self.dataset.iloc[movie_idx].rating.values[0]),
-            "year": int(self.dataset.iloc[movie_idx].year.values[0])
-        }
-        return recommendations
+        Args:
+            queries (list): List of (movie_title, year) pairs, year may be None
+
+        Returns:
+            list: bytes with the JSON encoding of every result of ``recommend_many``
+        """
+        timer = self.metrics.timer("recommend") if self.metrics is not None else None
+        results, query_positions, query_rows, picked = self._sample_recommendations(queries, timer)
+        for position, result in enumerate(results):
+            if result is not None:
+                results[position] = orjson.dumps(result)
+        if not query_positions:
+            return results
+
+        query_titles = self.catalog.titles.take(query_rows)
+        query_ratings = self.catalog.ratings[query_rows].tolist()
+        query_years = self.catalog.years[query_rows].tolist()
+
+        for i, position in enumerate(query_positions):
+            query = orjson.dumps({"title": query_titles[i], "rating": query_ratings[i], "year": query_years[i]})
+            results[position] = b"".join([b'{"recommendations":', self.record_fragments.array(picked[i][picked[i] >= 0]),
+                                          b',"query":', query, b"}"])
+
+        if timer is not None:
+            timer.lap("records")
+        return results
+
+    def _sample_recommendations(self, queries, timer=None):
+        """
+        Resolve a batch of queries and sample the recommended rows.
+
+        Args:
+            queries (list): List of (movie_title, year) pairs, year may be None
+            timer (StageTimer, optional): Timer receiving the stage durations
+
+        Returns:
+            tuple: A tuple containing:
+                - list: One entry per query, the error dict for unresolved queries, None otherwise
+                - list: Positions of the resolved queries
+                - np.ndarray: Dataset row of every resolved query
+                - np.ndarray: (resolved queries, rating bands) recommended rows, -1 for empty bands
+        """
+        results = [None] * len(queries)
+        resolved = {}
+        query_positions = []
+        query_rows = []
+        for position, (movie_title, year) in enumerate(queries):
+            key = (movie_title.lower() if isinstance(movie_title, str) else movie_title, year)
+            if key not in resolved:
+                try:
+                    resolved[key] = self.standardize_title(movie_title, year)
+                except ValueError as e:
+                    resolved[key] = {"error": str(e)}
+
+            movie_idx = resolved[key]
+            if isinstance(movie_idx, dict):
+                results[position] = movie_idx
+            else:
+                query_positions.append(position)
+                query_rows.append(movie_idx[0])
+
+        if timer is not None:
+            timer.lap("resolve")
+        query_rows = np.array(query_rows, dtype=np.int64)
+        if not query_positions:
+            return results, query_positions, query_rows, np.empty((0, len(self.rating_buckets)), dtype=np.int64)
+
+        return results, query_positions, query_rows, self.sample_rows(query_rows, timer=timer)
+
+    def sample_rows(self, query_rows, rng=None, timer=None):
+        """
+        Sample anti-recommendations for movies given by their dataset rows.
+
+        Skips title resolution, for callers which already know the rows, like
+        exports of the whole catalog.
+
+        Args:
+            query_rows (np.ndarray): Dataset rows of the query movies
+            rng (np.random.Generator, optional): Source of the random draws.
+                Defaults to the global NumPy random state.
+            timer (StageTimer, optional): Timer receiving the stage durations
+
+        Returns:
+            np.ndarray: (queries, rating bands) recommended dataset rows, -1
+                where a rating band has no movies in the distant clusters
+        """
+        randint = np.random.randint if rng is None else rng.integers
+        query_rows = np.asarray(query_rows, dtype=np.int64)
+        # (queries, k) clusters to sample from, the farthest first
+        distant_clusters = self.distant_clusters[self.labels[query_rows]]
+        if timer is not None:
+            timer.lap("farthest_cluster")
+
+        # one random movie per rating band, drawn uniformly from the band's movies
+        # in all the distant clusters of the query, -1 if the band is empty in all of them
+        recommendation_ids = np.full((len(self.rating_buckets), len(query_rows)), -1, dtype=np.int64)
+        for band, (bucket_rows, bucket_offsets) in enumerate(self.rating_buckets):
+            starts = bucket_offsets[distant_clusters]
+            sizes = bucket_offsets[distant_clusters + 1] - starts
+            cumulative_sizes = np.cumsum(sizes, axis=1)
+            totals = cumulative_sizes[:, -1]
+            non_empty = totals > 0
+            draws = randint(0, totals[non_empty])
+            # cluster holding the drawn movie, then its position inside that cluster's band
+            chosen = (cumulative_sizes[non_empty] <= draws[:, None]).sum(axis=1)
+            picked_starts = starts[non_empty, chosen]
+            preceding = cumulative_sizes[non_empty, chosen] - sizes[non_empty, chosen]
+            recommendation_ids[band, non_empty] = bucket_rows[picked_starts + draws - preceding]
+
+        if timer is not None:
+            timer.lap("sampling")
+        return recommendation_ids.T
 
     def search_suggestions(self, query):
         """
@@ -189,22 +563,24 @@ class MovieAntiRecommender:
         Returns:
             list: List of movies that match the query
         """
-        movie_titles = self.dataset['standardized_title'].values
-        matches = process.extract(query, movie_titles, scorer=fuzz.token_set_ratio, limit=10)
-        matches = np.array([match[0] for match in matches])
-        print(matches)
-
-        # get year for each suggestion match. Titles can be repeated with different years.
-        # if multiple years, append all repeated titles to the suggestion before moving to the next title
-        suggestions_list = []
-        suggestions_limit = 6
-        for match in matches:
-            suggestions_year = self.dataset[self.dataset['standardized_title'] == match]['year'].values
-
-            if len(suggestions_year) > 1:
-                for year in suggestions_year:
-                    suggestions_list.append(f"{match} ({year})")
-            else:
-                suggestions_list.append(f"{match} ({suggestions_year[0]})")
+        cache_key = self.suggestion_engine.normalize_query(query)
+        suggestions = self.suggestion_cache.get(cache_key)
+        if suggestions is None:
+            timer = self.metrics.timer("search_suggestions") if self.metrics is not None else None
+            suggestions = self.suggestion_engine.suggest(query)
+            self.suggestion_cache.put(cache_key, suggestions)
+            if timer is not None:
+                timer.lap("suggest")
+        return list(suggestions)
+
+    def cache_stats(self):
+        """
+        Return the counters of the title resolution and suggestion caches.
 
-        return suggestions_list[:suggestions_limit]
+        Returns:
+            dict: Hits, misses, evictions and size for each cache
+        """
+        return {
+            "title_resolution": self.title_cache.stats(),
+            "search_suggestions": self.suggestion_cache.stats(),
+        }
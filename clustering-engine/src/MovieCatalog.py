@@ -0,0 +1,130 @@
+import numpy as np
+from src.JsonFragments import JsonFragments
+from src.StringTable import StringTable
+
+
+class MovieCatalog:
+    """
+    Compact read-only movie catalog used for serving.
+
+    Numeric columns are contiguous NumPy arrays and string columns are
+    interned StringTables, so responses can be built straight from row ids
+    without keeping a pandas DataFrame around.
+    """
+
+    STRING_COLUMNS = ("titles", "genres", "standardized_titles")
+    # columns of ``cleaned_movies.csv`` the catalog is built from
+    DATAFRAME_COLUMNS = ("movieId", "title", "genres", "rating", "standardized_title", "year")
+
+    def __init__(self, movie_ids, titles, genres, ratings, standardized_titles, years):
+        """
+        Wrap already encoded columns, all of the same length.
+
+        Args:
+            movie_ids (np.ndarray): int32 MovieLens ids
+            titles (StringTable): Original titles
+            genres (StringTable): Pipe separated genres
+            ratings (np.ndarray): float64 average ratings
+            standardized_titles (StringTable): Standardized titles
+            years (np.ndarray): int32 release years
+        """
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.genres = genres
+        self.ratings = ratings
+        self.standardized_titles = standardized_titles
+        self.years = years
+
+    @classmethod
+    def from_dataframe(cls, movies_df):
+        """
+        Encode a movie DataFrame with the columns of ``cleaned_movies.csv``.
+
+        Args:
+            movies_df (pd.DataFrame): Movies with movieId, title, genres, rating,
+                standardized_title and year columns
+
+        Returns:
+            MovieCatalog: Encoded catalog
+        """
+        return cls(
+            movie_ids=movies_df['movieId'].to_numpy(dtype=np.int32),
+            titles=StringTable.from_strings(movies_df['title']),
+            genres=StringTable.from_strings(movies_df['genres']),
+            ratings=movies_df['rating'].to_numpy(dtype=np.float64),
+            standardized_titles=StringTable.from_strings(movies_df['standardized_title']),
+            years=movies_df['year'].to_numpy().astype(np.int32),
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        Wrap the catalog arrays of a serving bundle without copying them.
+
+        Args:
+            arrays (mapping): Array name -> np.ndarray, as produced by ``to_arrays``
+
+        Returns:
+            MovieCatalog: Catalog backed by the given arrays
+        """
+        string_tables = {
+            column: StringTable(arrays[f"{column}_data"], arrays[f"{column}_offsets"], arrays[f"{column}_codes"])
+            for column in cls.STRING_COLUMNS
+        }
+        return cls(movie_ids=arrays["movie_ids"], ratings=arrays["ratings"], years=arrays["years"], **string_tables)
+
+    def to_arrays(self):
+        """
+        Flatten the catalog into named arrays for a serving bundle.
+
+        Returns:
+            dict: Array name -> np.ndarray
+        """
+        arrays = {"movie_ids": self.movie_ids, "ratings": self.ratings, "years": self.years}
+        for column in self.STRING_COLUMNS:
+            string_table = getattr(self, column)
+            arrays[f"{column}_data"] = string_table.data
+            arrays[f"{column}_offsets"] = string_table.offsets
+            arrays[f"{column}_codes"] = string_table.codes
+        return arrays
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def records(self, rows):
+        """
+        Build response records for several rows.
+
+        Args:
+            rows (array-like): Row ids
+
+        Returns:
+            list: One dict per row with title, genres, rating,
+                standardized_title and year
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        return list(self._iter_records(self.titles.take(rows), self.genres.take(rows), self.ratings[rows].tolist(),
+                                       self.standardized_titles.take(rows), self.years[rows].tolist()))
+
+    def json_fragments(self):
+        """
+        Encode the response record of every row to JSON once.
+
+        Returns:
+            JsonFragments: Encoded records, one per row
+        """
+        # whole columns decode every distinct string only once
+        return JsonFragments.from_values(self._iter_records(self.titles.tolist(), self.genres.tolist(),
+                                                            self.ratings.tolist(), self.standardized_titles.tolist(),
+                                                            self.years.tolist()))
+
+    @staticmethod
+    def _iter_records(titles, genres, ratings, standardized_titles, years):
+        for title, genre, rating, standardized_title, year in zip(titles, genres, ratings, standardized_titles, years):
+            yield {
+                "title": title,
+                "genres": genre,
+                "rating": rating,
+                "standardized_title": standardized_title,
+                "year": year
+            }
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class NgramPostings:
+    """
+    Read-only postings lists of the character n-grams of a list of strings.
+
+    Every n-gram is packed into an integer key made of its code points, the
+    keys are sorted and the ids of the strings containing each n-gram are
+    stored back to back, so the postings are three flat arrays which can be
+    saved to a serving bundle and memory-mapped back.
+    """
+
+    # bits of a Unicode code point, three of them fit a uint64 key
+    CODEPOINT_BITS = 21
+    MAX_NGRAM_SIZE = 3
+
+    def __init__(self, keys, offsets, ids, ngram_size=3):
+        """
+        Wrap already built postings.
+
+        Args:
+            keys (np.ndarray): Sorted uint64 keys of the distinct n-grams
+            offsets (np.ndarray): int64 offsets, the postings of ``keys[i]`` are ``ids[offsets[i]:offsets[i + 1]]``
+            ids (np.ndarray): int32 string ids, ascending within every postings list
+            ngram_size (int, optional): Length of the n-grams. Defaults to 3.
+        """
+        if ngram_size > self.MAX_NGRAM_SIZE:
+            raise ValueError(f"N-grams longer than {self.MAX_NGRAM_SIZE} characters are not supported")
+        self.keys = keys
+        self.offsets = offsets
+        self.ids = ids
+        self.ngram_size = ngram_size
+
+    @classmethod
+    def from_strings(cls, strings, ngram_size=3):
+        """
+        Index the distinct n-grams of every string.
+
+        Args:
+            strings (list): Strings, addressed by their position
+            ngram_size (int, optional): Length of the n-grams. Defaults to 3.
+
+        Returns:
+            NgramPostings: Postings of every n-gram
+        """
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        codepoints = np.frombuffer("".join(strings).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        n_positions = max(len(codepoints) - ngram_size + 1, 0)
+
+        keys = np.zeros(n_positions, dtype=np.uint64)
+        for i in range(ngram_size):
+            keys = (keys << np.uint64(cls.CODEPOINT_BITS)) | codepoints[i:i + n_positions]
+
+        # keep the n-grams which don't run into the next string
+        string_ids = np.repeat(np.arange(len(strings), dtype=np.int32), lengths)[:n_positions]
+        ends = np.cumsum(lengths)
+        inside = np.arange(n_positions) + ngram_size <= ends[string_ids]
+        keys, string_ids = keys[inside], string_ids[inside]
+
+        order = np.lexsort((string_ids, keys))
+        keys, string_ids = keys[order], string_ids[order]
+        distinct = np.ones(len(keys), dtype=bool)
+        distinct[1:] = (keys[1:] != keys[:-1]) | (string_ids[1:] != string_ids[:-1])
+        keys, string_ids = keys[distinct], string_ids[distinct]
+
+        unique_keys, starts = np.unique(keys, return_index=True)
+        offsets = np.append(starts, len(keys)).astype(np.int64)
+        return cls(unique_keys, offsets, string_ids, ngram_size)
+
+    @classmethod
+    def from_arrays(cls, arrays, ngram_size=3):
+        """
+        Wrap the arrays produced by ``to_arrays`` without copying them.
+        """
+        return cls(arrays["keys"], arrays["offsets"], arrays["ids"], ngram_size)
+
+    def to_arrays(self):
+        """
+        Returns:
+            dict: Array name -> np.ndarray
+        """
+        return {"keys": self.keys, "offsets": self.offsets, "ids": self.ids}
+
+    def ngrams(self, text):
+        """
+        Return the set of distinct character n-grams of a string.
+        """
+        n = self.ngram_size
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def get(self, gram):
+        """
+        Ids of the strings containing an n-gram.
+
+        Args:
+            gram (str): N-gram of ``ngram_size`` characters
+
+        Returns:
+            np.ndarray: Sorted string ids, or None if no string contains the n-gram
+        """
+        key = 0
+        for char in gram:
+            key = (key << self.CODEPOINT_BITS) | ord(char)
+        position = int(np.searchsorted(self.keys, np.uint64(key)))
+        if position == len(self.keys) or self.keys[position] != key:
+            return None
+        return self.ids[self.offsets[position]:self.offsets[position + 1]]
@@ -0,0 +1,274 @@
+import logging
+import math
+import os
+import select
+import signal
+import socket
+import time
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+class PreforkServer:
+    """
+    Serve an ASGI app from several forked uvicorn worker processes.
+
+    The caller loads everything the app needs before ``serve`` is called.
+    The listening socket is bound once and the workers are forked from the
+    loaded process afterwards, so they share the recommender's memory
+    copy-on-write instead of each loading and indexing the data again.
+    Requests are spread over the workers by the kernel as they accept
+    connections on the shared socket, so throughput grows with the number
+    of cores. Workers which die are replaced until the server is stopped
+    with SIGTERM or SIGINT.
+
+    Reloads are owned by this supervisor process: on SIGHUP, or when the
+    ``check_reload`` hook reports a change, it calls ``reload`` and, if that
+    succeeds, forks a new generation of workers from the reloaded state and
+    gracefully stops the previous one. Workers never reload on their own.
+    """
+
+    def __init__(self, app, host="0.0.0.0", port=8080, workers=None, backlog=2048, limit_concurrency=None,
+                 reload=None, check_reload=None, check_interval=30.0):
+        """
+        Args:
+            app: ASGI application, already loaded
+            host (str, optional): Address to bind. Defaults to "0.0.0.0".
+            port (int, optional): Port to bind. Defaults to 8080.
+            workers (int, optional): Number of worker processes. Defaults to
+                the number of CPUs this process may use, see ``available_cpus``.
+            backlog (int, optional): Listen backlog of the shared socket. Defaults to 2048.
+            limit_concurrency (int, optional): Connections and tasks a worker
+                accepts before answering 503. Defaults to no limit.
+            reload (callable, optional): Reloads the app's state in the
+                supervisor, returns False if it failed and the current workers
+                should be kept. Defaults to only replacing the workers.
+            check_reload (callable, optional): Called every ``check_interval``
+                seconds, returns True when a reload is needed, e.g. because
+                the data files changed. Defaults to no check.
+            check_interval (float, optional): Seconds between ``check_reload``
+                calls. Defaults to 30.
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or self.available_cpus()
+        self.backlog = backlog
+        self.limit_concurrency = limit_concurrency
+        self.reload = reload
+        self.check_reload = check_reload
+        self.check_interval = check_interval
+        self.children = set()
+        # workers of a previous generation, shutting down after a reload
+        self.retiring = set()
+        self.stopping = False
+        self.reload_requested = False
+        self.socket = None
+        self._wakeup = None
+
+    @staticmethod
+    def available_cpus():
+        """
+        Number of CPUs this process can actually use.
+
+        Counts the CPUs of the process's affinity mask, capped by the CPU
+        quota of its cgroup (e.g. ``docker run --cpus``), which ``os.cpu_count``
+        ignores.
+
+        Returns:
+            int: At least 1
+        """
+        try:
+            cpus = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cpus = os.cpu_count() or 1
+
+        quota = None
+        try:
+            # cgroup v2: "<quota> <period>" or "max <period>"
+            with open("/sys/fs/cgroup/cpu.max") as f:
+                limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+        except (OSError, ValueError):
+            try:
+                # cgroup v1, a negative quota means no limit
+                with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                    limit = int(f.read())
+                with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                    period = int(f.read())
+                if limit > 0 and period > 0:
+                    quota = limit / period
+            except (OSError, ValueError):
+                pass
+
+        if quota is not None:
+            cpus = min(cpus, math.ceil(quota))
+        return max(cpus, 1)
+
+    def bind(self):
+        """
+        Bind the listening socket shared by all workers.
+
+        Returns:
+            socket.socket: The bound socket
+        """
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        # asyncio only disables Nagle's algorithm on accepted sockets of an explicit TCP protocol, without
+        # it keep-alive responses written in several parts stall on the client's delayed ACK for ~40ms
+        sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        self.socket = sock
+        return sock
+
+    def _run_worker(self):
+        # undo the supervisor's signal handling, uvicorn installs its own handlers for a graceful shutdown
+        signal.set_wakeup_fd(-1)
+        for fd in self._wakeup or ():
+            os.close(fd)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        # reloads are the supervisor's job
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        config = uvicorn.Config(self.app, backlog=self.backlog, limit_concurrency=self.limit_concurrency,
+                                log_config=None)
+        uvicorn.Server(config).run(sockets=[self.socket])
+
+    def spawn(self):
+        """
+        Fork a worker process serving on the shared socket.
+
+        Returns:
+            int: Process id of the worker
+        """
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker()
+            except BaseException:
+                logger.exception("Worker process failed")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self.children.add(pid)
+        logger.info(f"Started worker process {pid}")
+        return pid
+
+    def _terminate(self, pids):
+        for pid in list(pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pids.discard(pid)
+
+    def stop(self, signum=signal.SIGTERM, frame=None):
+        """
+        Ask every worker to shut down gracefully and stop replacing them.
+        """
+        self.stopping = True
+        self._terminate(self.children)
+        self._terminate(self.retiring)
+
+    def request_reload(self, signum=signal.SIGHUP, frame=None):
+        """
+        Reload and replace the workers as soon as the supervisor loop wakes up.
+        """
+        self.reload_requested = True
+
+    def _reload_workers(self):
+        """
+        Reload in the supervisor, then replace every worker by a fresh fork.
+
+        The new workers start accepting connections before the previous ones
+        are asked to finish their requests and exit, so no request is refused.
+        """
+        logger.info("Reloading before replacing the worker processes")
+        if self.reload is not None and not self.reload():
+            logger.error("Reload failed, keeping the current worker processes")
+            return
+        if self.stopping:
+            return
+
+        previous = self.children
+        self.children = set()
+        self.retiring |= previous
+        for _ in range(self.workers):
+            self.spawn()
+        self._terminate(self.retiring)
+        logger.info(f"Replaced worker processes {sorted(previous)}")
+
+    def _reap(self):
+        """
+        Collect exited workers and replace the ones which died unexpectedly.
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            self.children.discard(pid)
+            if not self.stopping:
+                logger.warning(f"Worker process {pid} exited with status {status}, starting a new one")
+                # don't spin if workers die right after starting
+                time.sleep(1)
+                self.spawn()
+
+    def serve(self):
+        """
+        Bind, fork the workers and supervise them until stopped.
+        """
+        if self.socket is None:
+            self.bind()
+
+        # signal handlers only set flags, the wakeup pipe interrupts the wait for them
+        self._wakeup = os.pipe()
+        for fd in self._wakeup:
+            os.set_blocking(fd, False)
+        signal.set_wakeup_fd(self._wakeup[1])
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, self.request_reload)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+        logger.info(f"Serving on {self.host}:{self.port} with {self.workers} worker processes")
+        for _ in range(self.workers):
+            self.spawn()
+
+        next_check = time.monotonic() + self.check_interval
+        try:
+            while self.children or self.retiring:
+                timeout = max(next_check - time.monotonic(), 0) if self.check_reload is not None else None
+                select.select([self._wakeup[0]], [], [], timeout)
+                try:
+                    while os.read(self._wakeup[0], 512):
+                        pass
+                except BlockingIOError:
+                    pass
+
+                self._reap()
+                if self.check_reload is not None and time.monotonic() >= next_check:
+                    if not self.stopping and self.check_reload():
+                        self.reload_requested = True
+                    next_check = time.monotonic() + self.check_interval
+                if self.reload_requested and not self.stopping:
+                    self.reload_requested = False
+                    self._reload_workers()
+        finally:
+            signal.set_wakeup_fd(-1)
+            for fd in self._wakeup:
+                os.close(fd)
+            self._wakeup = None
+            self.socket.close()
+        logger.info("All worker processes stopped")
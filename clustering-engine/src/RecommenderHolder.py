@@ -0,0 +1,281 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RecommenderHolder:
+    """
+    Process-wide holder that creates the recommender exactly once.
+
+    The recommender can be created eagerly in a background thread, so that
+    the event loop keeps serving health checks while data is loaded, or
+    lazily by the first caller of ``get``. Concurrent callers wait for the
+    same single initialization instead of each loading the data.
+
+    A loaded recommender can be replaced without a restart: ``reload`` builds
+    a new instance while the current one keeps serving and then swaps it in
+    with a single attribute assignment. Only one reload runs at a time, so
+    at most two instances are alive during a swap.
+    """
+
+    def __init__(self, factory):
+        """
+        Args:
+            factory (callable): Creates a fully loaded recommender
+        """
+        self.factory = factory
+        self.instance = None
+        self.error = None
+        self.timings = {}
+        self.loading = False
+        self.reloading = False
+        self.generation = 0
+        self.reload_error = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watch_stop = None
+
+    @property
+    def ready(self):
+        return self.instance is not None
+
+    def get(self):
+        """
+        Return the recommender, creating it first if needed.
+
+        Raises:
+            Exception: Whatever the factory raised if loading failed
+        """
+        instance = self.instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self.instance is None:
+                start = time.perf_counter()
+                self.loading = True
+                try:
+                    instance = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                finally:
+                    self.loading = False
+                self.timings = dict(getattr(instance, "load_timings", {}))
+                self.timings["total_seconds"] = time.perf_counter() - start
+                self.error = None
+                self.instance = instance
+                self.generation += 1
+        return self.instance
+
+    def _claim_reload(self):
+        """
+        Take the reload lock unless a reload is already running.
+
+        ``reloading`` is set under the lock, so it is reported as soon as a
+        reload is claimed, even before its thread runs.
+
+        Returns:
+            bool: True if the caller now owns the reload and must run ``_reload_claimed``
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        self.reloading = True
+        return True
+
+    def _reload_claimed(self):
+        """
+        Run a reload claimed by ``_claim_reload`` and release it.
+
+        Returns:
+            bool: True if the new instance was swapped in
+        """
+        try:
+            start = time.perf_counter()
+            try:
+                instance = self.factory()
+            except Exception as e:
+                self.reload_error = str(e)
+                logger.error(f"Error reloading recommender, keeping the current one: {e}")
+                return False
+
+            timings = dict(getattr(instance, "load_timings", {}))
+            timings["total_seconds"] = time.perf_counter() - start
+            with self._lock:
+                self.instance = instance
+                self.timings = timings
+                self.reload_error = None
+                self.generation += 1
+            logger.info(f"Recommender reloaded, generation {self.generation}, load timings: {timings}")
+            return True
+        finally:
+            self._release_reload()
+
+    def _release_reload(self):
+        self.reloading = False
+        self._reload_lock.release()
+
+    def reload(self):
+        """
+        Build a new recommender and atomically swap it in.
+
+        Requests keep being served by the current instance until the new one
+        is fully loaded. If loading fails the current instance is kept.
+
+        Returns:
+            bool: True if the new instance was swapped in, False if another
+                reload was already running or loading failed
+        """
+        if self.instance is None:
+            self.get()
+            return True
+
+        if not self._claim_reload():
+            return False
+        return self._reload_claimed()
+
+    def reload_in_background(self):
+        """
+        Start a reload in a daemon thread unless one is already running.
+
+        The reload is claimed before the thread starts, so of two concurrent
+        calls only one is told a reload started.
+
+        Returns:
+            bool: True if a reload was started
+        """
+        if self.instance is None:
+            target = self.reload
+        elif self._claim_reload():
+            target = self._reload_claimed
+        else:
+            return False
+
+        try:
+            threading.Thread(target=target, name="recommender-reloader", daemon=True).start()
+        except Exception:
+            if target == self._reload_claimed:
+                self._release_reload()
+            raise
+        return True
+
+    @staticmethod
+    def _files_signature(paths):
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def change_detector(self, paths):
+        """
+        Create a check for changes of the watched files.
+
+        A change is reported once it has been stable for two consecutive
+        checks, so files which are still being written are not picked up, and
+        only once, so a failed reload is not retried until the files change again.
+
+        Args:
+            paths (list): Files to watch, e.g. the dataset and model paths
+
+        Returns:
+            callable: Returns True when the files changed since the last reported change
+        """
+        signatures = {"loaded": self._files_signature(paths)}
+        signatures["previous"] = signatures["loaded"]
+
+        def changed():
+            signature = self._files_signature(paths)
+            stable_change = signature != signatures["loaded"] and signature == signatures["previous"]
+            if stable_change:
+                signatures["loaded"] = signature
+            signatures["previous"] = signature
+            return stable_change
+
+        return changed
+
+    def watch(self, paths, interval=30.0):
+        """
+        Reload whenever one of the watched files changes.
+
+        Files are polled every ``interval`` seconds and a reload starts only
+        once a change has been stable for a whole interval, see ``change_detector``.
+
+        Args:
+            paths (list): Files to watch, e.g. the dataset and model paths
+            interval (float, optional): Polling interval in seconds. Defaults to 30.
+
+        Returns:
+            threading.Thread: The watcher thread, stopped by ``stop_watching``
+        """
+        self.stop_watching()
+        stop = threading.Event()
+        self._watch_stop = stop
+        changed = self.change_detector(paths)
+
+        def poll():
+            pending = False
+            while not stop.wait(interval):
+                if changed():
+                    logger.info(f"Change detected in {list(paths)}, reloading recommender")
+                    pending = True
+                # a change seen while another reload runs is reloaded once that one is done
+                if pending and self._claim_reload():
+                    pending = False
+                    self._reload_claimed()
+
+        watcher = threading.Thread(target=poll, name="recommender-watcher", daemon=True)
+        watcher.start()
+        return watcher
+
+    def stop_watching(self):
+        """
+        Stop the file watcher started by ``watch``, if any.
+        """
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
+    def load_in_background(self):
+        """
+        Start creating the recommender in a daemon thread.
+
+        Returns:
+            threading.Thread: The loader thread
+        """
+        def load():
+            try:
+                self.get()
+                logger.info(f"Recommender ready, load timings: {self.timings}")
+            except Exception as e:
+                logger.error(f"Error initializing recommender: {e}")
+
+        loader = threading.Thread(target=load, name="recommender-loader", daemon=True)
+        loader.start()
+        return loader
+
+    def status(self):
+        """
+        Describe the loading state for readiness probes.
+
+        Returns:
+            dict: Status ("ready", "loading", "failed" or "not_loaded") with
+                load timings or the loading error
+        """
+        if self.instance is not None:
+            status = {"status": "ready", "timings": self.timings, "generation": self.generation,
+                      "reloading": self.reloading}
+            if self.reload_error is not None:
+                status["reload_error"] = self.reload_error
+            return status
+        if self.loading:
+            return {"status": "loading"}
+        if self.error is not None:
+            return {"status": "failed", "error": self.error}
+        return {"status": "not_loaded"}
@@ -0,0 +1,128 @@
+import numpy as np
+
+
+class StringTable:
+    """
+    Read-only column of strings stored as contiguous NumPy arrays.
+
+    Distinct values are interned once into a single UTF-8 byte buffer
+    addressed by offsets, and every row only keeps an int32 code pointing
+    at its value.
+    """
+
+    def __init__(self, data, offsets, codes):
+        """
+        Wrap already encoded arrays.
+
+        Args:
+            data (np.ndarray): uint8 buffer with the UTF-8 bytes of all distinct values
+            offsets (np.ndarray): int64 offsets, value ``i`` is ``data[offsets[i]:offsets[i + 1]]``
+            codes (np.ndarray): int32 value index for every row
+        """
+        self.data = data
+        self.offsets = offsets
+        self.codes = codes
+
+    @classmethod
+    def from_strings(cls, values):
+        """
+        Intern and encode a sequence of strings.
+
+        Args:
+            values (iterable): Strings, one per row
+
+        Returns:
+            StringTable: Encoded string column
+        """
+        interned = {}
+        codes = np.array([interned.setdefault(str(value), len(interned)) for value in values], dtype=np.int32)
+
+        encoded = [value.encode("utf-8") for value in interned]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets, codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        return self.value(self.codes[row])
+
+    def __iter__(self):
+        for code in self.codes.tolist():
+            yield self.value(code)
+
+    @property
+    def n_values(self):
+        """
+        Number of distinct values.
+        """
+        return len(self.offsets) - 1
+
+    def value(self, code):
+        """
+        Decode the distinct value with the given code.
+        """
+        return self.data[self.offsets[code]:self.offsets[code + 1]].tobytes().decode("utf-8")
+
+    def values(self, codes):
+        """
+        Decode several distinct values.
+
+        Args:
+            codes (array-like): Value codes
+
+        Returns:
+            list: Decoded strings
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        data = memoryview(self.data)
+        starts = self.offsets[codes].tolist()
+        stops = self.offsets[codes + 1].tolist()
+        return [str(data[start:stop], "utf-8") for start, stop in zip(starts, stops)]
+
+    def take(self, rows):
+        """
+        Decode the values of several rows.
+
+        Args:
+            rows (array-like): Row ids
+
+        Returns:
+            list: Decoded strings
+        """
+        return self.values(self.codes[rows])
+
+    def tolist(self):
+        """
+        Decode the whole column.
+        """
+        values = self.values(np.arange(self.n_values))
+        return [values[code] for code in self.codes.tolist()]
+
+    def search(self, order, value):
+        """
+        Find where a string belongs among the distinct values.
+
+        Values are compared by their UTF-8 bytes, which orders them like
+        Python compares strings.
+
+        Args:
+            order (np.ndarray): Value codes sorted by value
+            value (str): String to look for
+
+        Returns:
+            int: Position in ``order`` of the first value not smaller than ``value``
+        """
+        key = value.encode("utf-8")
+        data = memoryview(self.data)
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            code = int(order[middle])
+            if data[self.offsets[code]:self.offsets[code + 1]].tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
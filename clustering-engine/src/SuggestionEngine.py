@@ -0,0 +1,194 @@
+import numpy as np
+from rapidfuzz import process, fuzz
+from src.NgramPostings import NgramPostings
+from src.StringTable import StringTable
+
+
+class SuggestionEngine:
+    """
+    Type-ahead title suggestions over a fixed catalog.
+
+    Titles are deduplicated once together with all their release years.
+    Every query first narrows the catalog down with a prefix and a character
+    trigram index and then scores only those candidates with rapidfuzz.
+    The index is a set of flat arrays, see ``to_arrays``, so it can be stored
+    in a serving bundle and memory-mapped back.
+    """
+
+    def __init__(self, titles, years, max_candidates=2000, workers=1, ngram_size=3):
+        """
+        Build the suggestion index.
+
+        Args:
+            titles (array-like): Standardized titles, one per dataset row
+            years (array-like): Release years, one per dataset row
+            max_candidates (int, optional): Maximum number of titles scored per
+                query. Defaults to 2000.
+            workers (int, optional): Number of threads used by rapidfuzz for
+                scoring, -1 uses all cores. Defaults to 1.
+            ngram_size (int, optional): Length of the character n-grams.
+                Defaults to 3.
+        """
+        # unique titles in order of first appearance, each with all its years
+        title_table = StringTable.from_strings(titles)
+        unique_titles = title_table.values(np.arange(title_table.n_values))
+        year_order = np.argsort(title_table.codes, kind="stable")
+        year_offsets = np.zeros(title_table.n_values + 1, dtype=np.int64)
+        np.cumsum(np.bincount(title_table.codes, minlength=title_table.n_values), out=year_offsets[1:])
+
+        lower_titles = [title.lower() for title in unique_titles]
+        lower_offsets = np.zeros(len(lower_titles) + 1, dtype=np.int64)
+        np.cumsum([len(title.encode("utf-8")) for title in lower_titles], out=lower_offsets[1:])
+
+        arrays = {
+            "title_data": title_table.data,
+            "title_offsets": title_table.offsets,
+            "years": np.asarray(years).astype(np.int32)[year_order],
+            "year_offsets": year_offsets,
+            "lower_data": np.frombuffer("".join(lower_titles).encode("utf-8"), dtype=np.uint8),
+            "lower_offsets": lower_offsets,
+            # sorted lowercase titles for prefix range lookups
+            "prefix_order": np.array(sorted(range(len(lower_titles)), key=lower_titles.__getitem__), dtype=np.int32),
+        }
+        for name, array in NgramPostings.from_strings(lower_titles, ngram_size).to_arrays().items():
+            arrays[f"ngram_{name}"] = array
+        self._wrap(arrays, max_candidates, workers, ngram_size)
+        self._all_lower_titles = lower_titles
+
+    @classmethod
+    def from_arrays(cls, arrays, max_candidates=2000, workers=1, ngram_size=3):
+        """
+        Wrap the arrays produced by ``to_arrays`` without copying them.
+
+        Args:
+            arrays (mapping): Array name -> np.ndarray
+            max_candidates (int, optional): Maximum number of titles scored per
+                query. Defaults to 2000.
+            workers (int, optional): Number of rapidfuzz threads. Defaults to 1.
+            ngram_size (int, optional): Length of the indexed n-grams. Defaults to 3.
+
+        Returns:
+            SuggestionEngine: Engine backed by the given arrays
+        """
+        engine = cls.__new__(cls)
+        engine._wrap(arrays, max_candidates, workers, ngram_size)
+        return engine
+
+    def _wrap(self, arrays, max_candidates, workers, ngram_size):
+        self.arrays = dict(arrays)
+        self.max_candidates = max_candidates
+        self.workers = workers
+        self.ngram_size = ngram_size
+
+        self.titles = StringTable(arrays["title_data"], arrays["title_offsets"], None)
+        self.years = arrays["years"]
+        self.year_offsets = arrays["year_offsets"]
+        self.lower_titles = StringTable(arrays["lower_data"], arrays["lower_offsets"], None)
+        self.prefix_order = arrays["prefix_order"]
+        self.ngram_postings = NgramPostings.from_arrays(
+            {name: arrays[f"ngram_{name}"] for name in ("keys", "offsets", "ids")}, ngram_size)
+        # decoded on the first query which has to score the whole catalog
+        self._all_lower_titles = None
+
+    def to_arrays(self):
+        """
+        Returns:
+            dict: Array name -> np.ndarray
+        """
+        return dict(self.arrays)
+
+    @property
+    def n_titles(self):
+        """
+        Number of unique titles.
+        """
+        return self.titles.n_values
+
+    def _prefix_candidates(self, query):
+        """
+        Title ids whose lowercased title starts with the query.
+        """
+        start = self.lower_titles.search(self.prefix_order, query)
+        stop = self.lower_titles.search(self.prefix_order, query + "\uffff")
+        stop = min(stop, start + self.max_candidates)
+        return self.prefix_order[start:stop].astype(np.int64)
+
+    @staticmethod
+    def normalize_query(query):
+        """
+        Lowercase a query and collapse its whitespace.
+
+        Suggestions only depend on the normalized query, so it can be used as a cache key.
+        """
+        return " ".join(query.lower().split())
+
+    def _candidates(self, query):
+        """
+        Select the title ids worth scoring for a normalized query.
+
+        Candidates are the titles starting with the query together with the
+        titles sharing the most trigrams with it. Returns None if the whole
+        catalog should be scored.
+        """
+        query_ngrams = self.ngram_postings.ngrams(query)
+        if not query_ngrams:
+            # too short for trigrams, type-ahead only needs the prefix matches
+            return self._prefix_candidates(query)
+
+        postings = [self.ngram_postings.get(gram) for gram in query_ngrams]
+        postings = [posting for posting in postings if posting is not None]
+        if not postings:
+            return None
+
+        shared_ngrams = np.bincount(np.concatenate(postings), minlength=self.n_titles)
+        matched = np.flatnonzero(shared_ngrams)
+        if len(matched) > self.max_candidates:
+            # stable sort so that ties keep the earlier titles
+            top = np.argsort(-shared_ngrams[matched], kind="stable")[:self.max_candidates]
+            matched = matched[top]
+
+        candidates = np.union1d(self._prefix_candidates(query), matched)
+        return candidates
+
+    def suggest(self, query, limit=10, suggestions_limit=6):
+        """
+        Suggest titles with their release years for a query.
+
+        Matching is case insensitive and ignores repeated whitespace.
+
+        Args:
+            query (str): Partial or misspelled title
+            limit (int, optional): Number of best matching titles to expand.
+                Defaults to 10.
+            suggestions_limit (int, optional): Maximum number of suggestions.
+                Defaults to 6.
+
+        Returns:
+            list: Suggestions formatted as "title (year)". A title released in
+                several years gives one suggestion per year.
+        """
+        query = self.normalize_query(query)
+        candidates = self._candidates(query)
+        if candidates is None or len(candidates) < limit:
+            candidates = np.arange(self.n_titles)
+            if self._all_lower_titles is None:
+                self._all_lower_titles = self.lower_titles.values(candidates)
+            choices = self._all_lower_titles
+        else:
+            choices = self.lower_titles.values(candidates)
+
+        scores = process.cdist([query], choices, scorer=fuzz.token_set_ratio,
+                               dtype=np.float32, workers=self.workers)[0]
+
+        # best scores first, ties keep catalog order like process.extract
+        best = np.argsort(-scores, kind="stable")[:limit]
+
+        suggestions_list = []
+        for title_id in candidates[best].tolist():
+            title = self.titles.value(title_id)
+            for year in self.years[self.year_offsets[title_id]:self.year_offsets[title_id + 1]].tolist():
+                suggestions_list.append(f"{title} ({year})")
+            if len(suggestions_list) >= suggestions_limit:
+                break
+
+        return suggestions_list[:suggestions_limit]
@@ -0,0 +1,342 @@
+import math
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+from rapidfuzz import process
+from rapidfuzz.distance import LCSseq
+from src.NgramPostings import NgramPostings
+from src.StringTable import StringTable
+
+
+class TitleIndex:
+    """
+    Lookup structures over standardized movie titles.
+
+    Built once per dataset so that exact, substring and close-match title
+    lookups do not have to rescan and re-lowercase the whole catalog on
+    every request. All lookups return sorted arrays of row positions.
+
+    The index is a set of flat arrays, see ``to_arrays``, so a serving bundle
+    can store it and every process memory-maps it instead of building it.
+    """
+
+    # characters with their own row in the close-match character counts
+    CHAR_ROWS = 64
+
+    def __init__(self, titles, years, ngram_size=3):
+        """
+        Build the index.
+
+        Args:
+            titles (array-like): Standardized titles, one per dataset row
+            years (array-like): Release years, one per dataset row
+            ngram_size (int, optional): Length of the character n-grams used
+                by the substring index. Defaults to 3.
+        """
+        # unique lowercase titles in order of first appearance, and the unique title of every row
+        lower_titles = StringTable.from_strings(str(title).lower() for title in titles)
+        unique_titles = lower_titles.values(np.arange(lower_titles.n_values))
+
+        # row ids grouped by unique title, in row order
+        title_rows = np.argsort(lower_titles.codes, kind="stable").astype(np.int32)
+        title_row_offsets = np.zeros(lower_titles.n_values + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lower_titles.codes, minlength=lower_titles.n_values), out=title_row_offsets[1:])
+
+        # unique titles ordered by length, used to bound close-match candidates
+        lengths = np.fromiter(map(len, unique_titles), dtype=np.int64, count=len(unique_titles))
+        length_order = np.argsort(lengths, kind="stable").astype(np.int32)
+        char_codepoints, char_rows, char_counts = self._count_chars([unique_titles[i] for i in length_order.tolist()])
+
+        arrays = {
+            "title_data": lower_titles.data,
+            "title_offsets": lower_titles.offsets,
+            "sorted_titles": np.array(sorted(range(len(unique_titles)), key=unique_titles.__getitem__), dtype=np.int32),
+            "title_rows": title_rows,
+            "title_row_offsets": title_row_offsets,
+            "length_order": length_order,
+            "sorted_lengths": lengths[length_order],
+            "char_codepoints": char_codepoints,
+            "char_rows": char_rows,
+            "char_counts": char_counts,
+        }
+        for name, array in NgramPostings.from_strings(unique_titles, ngram_size).to_arrays().items():
+            arrays[f"ngram_{name}"] = array
+        self._wrap(arrays, years, ngram_size)
+
+    @classmethod
+    def from_arrays(cls, arrays, years, ngram_size=3):
+        """
+        Wrap the arrays produced by ``to_arrays`` without copying them.
+
+        Args:
+            arrays (mapping): Array name -> np.ndarray
+            years (array-like): Release years, one per dataset row
+            ngram_size (int, optional): Length of the indexed n-grams. Defaults to 3.
+
+        Returns:
+            TitleIndex: Index backed by the given arrays
+        """
+        index = cls.__new__(cls)
+        index._wrap(arrays, years, ngram_size)
+        return index
+
+    def _wrap(self, arrays, years, ngram_size):
+        self.arrays = dict(arrays)
+        self.ngram_size = ngram_size
+        self.years = np.asarray(years)
+
+        # unique lowercase titles, addressed by position in the n-gram postings
+        self.unique_titles = StringTable(arrays["title_data"], arrays["title_offsets"], None)
+        self.sorted_titles = arrays["sorted_titles"]
+        self.title_rows = arrays["title_rows"]
+        self.title_row_offsets = arrays["title_row_offsets"]
+        self.title_counts = np.diff(self.title_row_offsets)
+        self.ngram_postings = NgramPostings.from_arrays(
+            {name: arrays[f"ngram_{name}"] for name in ("keys", "offsets", "ids")}, ngram_size)
+
+        self.length_order = arrays["length_order"]
+        self.sorted_lengths = arrays["sorted_lengths"]
+        self.char_counts = arrays["char_counts"]
+        self.char_columns = {chr(char): row for char, row in zip(arrays["char_codepoints"].tolist(),
+                                                                 arrays["char_rows"].tolist())}
+
+    def to_arrays(self):
+        """
+        Returns:
+            dict: Array name -> np.ndarray, everything but the release years
+        """
+        return dict(self.arrays)
+
+    @classmethod
+    def _count_chars(cls, titles):
+        """
+        Count the characters of every title.
+
+        The most frequent characters get a row each and all others share the
+        last row, which keeps the counts an upper bound of the characters two
+        strings have in common.
+
+        Args:
+            titles (list): Titles, in the column order of the counts
+
+        Returns:
+            tuple: Code points of the counted characters, the row of each and
+                the (rows, titles) count matrix
+        """
+        lengths = np.fromiter(map(len, titles), dtype=np.int64, count=len(titles))
+        codepoints = np.frombuffer("".join(titles).encode("utf-32-le"), dtype=np.uint32)
+        frequencies = np.bincount(codepoints)
+        chars = np.flatnonzero(frequencies)
+
+        n_rows = max(min(len(chars), cls.CHAR_ROWS), 1)
+        rows = np.empty(len(frequencies), dtype=np.int64)
+        rows[chars[np.argsort(-frequencies[chars], kind="stable")]] = np.minimum(np.arange(len(chars)), n_rows - 1)
+
+        dtype = np.uint8 if len(lengths) == 0 or lengths.max() <= np.iinfo(np.uint8).max else np.uint16
+        title_ids = np.repeat(np.arange(len(titles)), lengths)
+        counts = np.bincount(rows[codepoints] * len(titles) + title_ids, minlength=n_rows * len(titles))
+        return chars.astype(np.uint32), rows[chars], counts.reshape(n_rows, len(titles)).astype(dtype)
+
+    def _title(self, title_id):
+        return self.unique_titles.value(title_id)
+
+    def _rows_for_titles(self, title_ids):
+        """
+        Collect sorted row ids for a collection of unique title ids.
+        """
+        if len(title_ids) == 0:
+            return np.array([], dtype=np.int64)
+        offsets = self.title_row_offsets
+        rows = np.concatenate([self.title_rows[offsets[i]:offsets[i + 1]] for i in title_ids]).astype(np.int64)
+        rows.sort()
+        return rows
+
+    def filter_year(self, rows, year):
+        """
+        Keep only the rows released in the given year.
+
+        Args:
+            rows (np.ndarray): Row ids to filter
+            year (int, optional): Release year. If None, rows are returned unchanged.
+
+        Returns:
+            np.ndarray: Filtered row ids
+        """
+        if year is None:
+            return rows
+        return rows[self.years[rows] == int(year)]
+
+    def exact(self, movie_title, year=None):
+        """
+        Rows whose title equals the query up to a case difference.
+
+        Args:
+            movie_title (str): Title to look up
+            year (int, optional): Release year. Defaults to None.
+
+        Returns:
+            np.ndarray: Sorted row ids
+        """
+        query = movie_title.lower()
+        position = self.unique_titles.search(self.sorted_titles, query)
+        if position == len(self.sorted_titles):
+            return np.array([], dtype=np.int64)
+        title_id = int(self.sorted_titles[position])
+        if self._title(title_id) != query:
+            return np.array([], dtype=np.int64)
+        return self.filter_year(self._rows_for_titles([title_id]), year)
+
+    def contains(self, movie_title):
+        """
+        Rows whose lowercased title contains the lowercased query.
+
+        Candidates are narrowed down with the n-gram postings and then verified
+        with a plain substring check. Queries shorter than the n-gram size are
+        searched for in the buffer holding all unique titles.
+
+        Args:
+            movie_title (str): Substring to look for
+
+        Returns:
+            np.ndarray: Sorted row ids
+        """
+        query = movie_title.lower()
+        grams = self.ngram_postings.ngrams(query)
+
+        if not grams:
+            return self._rows_for_titles(self._scan(query))
+
+        postings = []
+        for gram in grams:
+            posting = self.ngram_postings.get(gram)
+            if posting is None:
+                return np.array([], dtype=np.int64)
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if len(candidates) == 0:
+                return np.array([], dtype=np.int64)
+
+        candidates = candidates.tolist()
+        titles = self.unique_titles.values(candidates)
+        title_ids = [title_id for title_id, title in zip(candidates, titles) if query in title]
+        return self._rows_for_titles(title_ids)
+
+    def _scan(self, query):
+        """
+        Ids of the unique titles containing a short query.
+
+        Every occurrence of the query's UTF-8 bytes in the title buffer is
+        mapped back to the title it starts in, and kept if it also ends there.
+        """
+        offsets = self.unique_titles.offsets
+        if not query:
+            return np.flatnonzero(np.diff(offsets) >= 0)
+
+        needle = query.encode("utf-8")
+        buffer = memoryview(self.unique_titles.data)
+        starts = np.fromiter((match.start() for match in re.finditer(b"(?=" + re.escape(needle) + b")", buffer)),
+                             dtype=np.int64)
+        title_ids = np.searchsorted(offsets, starts, side="right") - 1
+        title_ids = title_ids[starts + len(needle) <= offsets[title_ids + 1]]
+        return np.unique(title_ids)
+
+    def close_matches(self, movie_title, n=5, cutoff=0.6):
+        """
+        Rows whose lowercased title is among the ``difflib`` close matches.
+
+        Gives the same result as ``difflib.get_close_matches`` run over the
+        lowercased title of every row. difflib's ratio counts characters of
+        matching blocks, which are never more than the characters the two
+        strings have in common, nor than their longest common subsequence.
+        Both bounds are computed in bulk, the first over every title of a
+        length that can reach the cutoff and the second, in rapidfuzz, over
+        the titles left. Titles are then scored best bound first until no
+        remaining bound reaches the cutoff or beats the ``n``-th best match.
+
+        Args:
+            movie_title (str): Title to match
+            n (int, optional): Maximum number of matches. Defaults to 5.
+            cutoff (float, optional): Minimum similarity score. Defaults to 0.6.
+
+        Returns:
+            np.ndarray: Sorted row ids
+        """
+        word = movie_title.lower()
+        word_length = len(word)
+
+        # ratio <= 2 * min(la, lb) / (la + lb), so only a length window can pass the cutoff
+        min_length = math.floor(word_length * cutoff / (2 - cutoff))
+        max_length = math.ceil(word_length * (2 - cutoff) / cutoff)
+        start = np.searchsorted(self.sorted_lengths, min_length, side="left")
+        stop = np.searchsorted(self.sorted_lengths, max_length, side="right")
+
+        if start >= stop:
+            return np.array([], dtype=np.int64)
+
+        # characters in common with the query, as counted by difflib's quick_ratio
+        query_counts = defaultdict(int)
+        for char in word:
+            if char in self.char_columns:
+                query_counts[self.char_columns[char]] += 1
+        common = np.zeros(stop - start, dtype=np.int64)
+        for row, count in query_counts.items():
+            common += np.minimum(self.char_counts[row, start:stop], count)
+        totals = self.sorted_lengths[start:stop] + word_length
+        bounds = np.divide(2.0 * common, totals, out=np.ones(len(totals)), where=totals > 0)
+
+        candidates = np.flatnonzero(bounds >= cutoff)
+        if len(candidates) == 0:
+            return np.array([], dtype=np.int64)
+        candidate_titles = self.unique_titles.values(self.length_order[start + candidates])
+        common = process.cdist([word], candidate_titles, scorer=LCSseq.similarity, dtype=np.int64)[0]
+        bounds = 2.0 * common / totals[candidates] if word_length else bounds[candidates]
+        keep = bounds >= cutoff
+        order = np.argsort(-bounds[keep], kind="stable")
+        candidates = candidates[keep][order]
+        bounds = bounds[keep][order]
+
+        scored = []
+        threshold = cutoff
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        for position, bound in zip(candidates.tolist(), bounds.tolist()):
+            # equal scores are ordered by title, so a bound equal to the threshold can still win
+            if bound < threshold:
+                break
+            title_id = int(self.length_order[start + position])
+            title = self._title(title_id)
+            matcher.set_seq1(title)
+            score = matcher.ratio()
+            if score >= cutoff:
+                scored.append((score, title, title_id))
+                threshold, _ = self._top_matches(scored, n, cutoff)
+
+        _, title_ids = self._top_matches(scored, n, cutoff)
+        return self._rows_for_titles(title_ids)
+
+    def _top_matches(self, scored, n, cutoff):
+        """
+        Pick the best scored titles the way difflib does.
+
+        Duplicated titles take as many of the ``n`` slots as they have rows.
+
+        Returns:
+            tuple: Score a title needs to still enter the top matches, and the
+                picked title ids
+        """
+        title_ids = []
+        taken = 0
+        threshold = cutoff
+        for score, _, title_id in sorted(scored, reverse=True):
+            if taken >= n:
+                break
+            title_ids.append(title_id)
+            taken += self.title_counts[title_id]
+            if taken >= n:
+                threshold = score
+        return threshold, title_ids
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import pytest
+from src.BoundedExecutor import BoundedExecutor
+
+
+def test_run_returns_result_from_worker_thread():
+    executor = BoundedExecutor(max_workers=2, max_queue=1)
+
+    result = asyncio.run(executor.run(lambda a, b=0: (a + b, threading.current_thread().name), 1, b=2))
+
+    assert result[0] == 3
+    assert result[1].startswith("recommender-worker")
+    assert executor.stats()["completed"] == 1
+    assert executor.pending == 0
+
+
+def test_run_propagates_exceptions():
+    executor = BoundedExecutor(max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("no match")
+
+    with pytest.raises(ValueError, match="no match"):
+        asyncio.run(executor.run(fail))
+    assert executor.pending == 0
+
+
+def test_saturated_once_workers_and_queue_are_full():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        tasks = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        saturated = executor.saturated
+        release.set()
+        await asyncio.gather(*tasks)
+        return saturated
+
+    assert asyncio.run(scenario())
+    assert not executor.saturated
+
+    executor.reject()
+    assert executor.stats()["rejected"] == 1
@@ -0,0 +1,61 @@
+import numpy as np
+import pyarrow.parquet as pq
+from src.CatalogExporter import CatalogExporter
+
+
+def test_export_recommends_from_farthest_cluster(get_test_recommender, tmp_path):
+    recommender = get_test_recommender
+    output = str(tmp_path / "anti_recommendations.parquet")
+    metadata = CatalogExporter(recommender, workers=1, chunk_size=7, seed=3).export(output)
+    exported = CatalogExporter.load(output)
+
+    assert metadata["n_movies"] == len(recommender.catalog)
+    assert CatalogExporter.read_metadata(output) == metadata
+    assert list(exported.columns) == ["movie_id", "low_rated", "high_rated", "top_rated"]
+    np.testing.assert_array_equal(exported["movie_id"], recommender.catalog.movie_ids)
+
+    row_of_movie = {movie_id: row for row, movie_id in enumerate(recommender.catalog.movie_ids.tolist())}
+    for band, (bucket_rows, _) in enumerate(recommender.rating_buckets):
+        recommended = exported[exported.columns[band + 1]]
+        for row, movie_id in enumerate(recommended.tolist()):
+            farthest_cluster = recommender.farthest_clusters[recommender.labels[row]]
+            in_band = bucket_rows[recommender.labels[bucket_rows] == farthest_cluster]
+            if movie_id == -1:
+                assert len(in_band) == 0
+            else:
+                assert row_of_movie[movie_id] in in_band
+
+
+def test_export_writes_a_row_group_per_chunk(get_test_recommender, tmp_path):
+    output = str(tmp_path / "anti_recommendations.parquet")
+    CatalogExporter(get_test_recommender, workers=2, chunk_size=4, seed=3).export(output)
+
+    n_movies = len(get_test_recommender.catalog)
+    metadata = pq.ParquetFile(output).metadata
+    assert metadata.num_row_groups == -(-n_movies // 4)
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == \
+        [min(4, n_movies - start) for start in range(0, n_movies, 4)]
+    assert not (tmp_path / "anti_recommendations.parquet.tmp").exists()
+
+
+def test_load_selects_columns_and_movies(get_test_recommender, tmp_path):
+    output = str(tmp_path / "anti_recommendations.parquet")
+    CatalogExporter(get_test_recommender, workers=1, chunk_size=4, seed=3).export(output)
+    exported = CatalogExporter.load(output)
+
+    movie_ids = get_test_recommender.catalog.movie_ids[[0, 5]].tolist()
+    selected = CatalogExporter.load(output, columns=["top_rated"], movie_ids=movie_ids)
+
+    assert list(selected.columns) == ["movie_id", "top_rated"]
+    expected = exported[exported["movie_id"].isin(movie_ids)]
+    np.testing.assert_array_equal(selected["top_rated"], expected["top_rated"])
+
+
+def test_export_is_reproducible_across_workers(get_test_recommender, tmp_path):
+    CatalogExporter(get_test_recommender, workers=1, chunk_size=5, seed=11).export(str(tmp_path / "serial.parquet"))
+    CatalogExporter(get_test_recommender, workers=2, chunk_size=5, seed=11).export(str(tmp_path / "pool.parquet"))
+    serial = CatalogExporter.load(str(tmp_path / "serial.parquet"))
+    pool = CatalogExporter.load(str(tmp_path / "pool.parquet"))
+
+    for column in serial:
+        np.testing.assert_array_equal(serial[column], pool[column])
@@ -0,0 +1,12 @@
+import orjson
+from src.JsonFragments import JsonFragments
+
+
+def test_fragments_round_trip():
+    values = [{"title": "Amélie", "rating": 4.5, "year": 2001}, {"title": "Movie \"2\"", "rating": 1.0, "year": None}, []]
+    fragments = JsonFragments.from_values(values)
+
+    assert len(fragments) == 3
+    assert [orjson.loads(fragments[row]) for row in range(3)] == values
+    assert orjson.loads(fragments.array([2, 0, 0])) == [values[2], values[0], values[0]]
+    assert fragments.array([]) == b"[]"
@@ -1,7 +1,11 @@
+import signal
+import orjson
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, Mock
 from main import app, get_recommender
+from src.Metrics import Metrics
+from src.MetricsDirectory import MetricsDirectory
 
 
 mock_recommender = Mock()
@@ -26,7 +30,7 @@ def reset_mock_recommender():
 
 def test_recommend_movies_success():
 
-    mock_recommender.recommend.return_value = {
+    mock_recommender.recommend_json.return_value = orjson.dumps({
         "recommendations": [
             {
                 "title": "Mocked Movie 1",
@@ -34,7 +38,7 @@ def test_recommend_movies_success():
                 "year": 2000
             }
         ]
-    }
+    })
 
     response = client.post(
         "/recommend",
@@ -42,18 +46,19 @@ def test_recommend_movies_success():
     )
 
     assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
     assert "recommendations" in response.json()
-    mock_recommender.recommend.assert_called_once_with("Test Movie", 2000)
+    mock_recommender.recommend_json.assert_called_once_with("Test Movie", 2000)
 
 
 def test_recommend_movies_not_found():
-    mock_recommender.recommend.side_effect = ValueError("Movie 'Invalid Movie' not found in the dataset.")
+    mock_recommender.recommend_json.side_effect = ValueError("Movie 'Invalid Movie' not found in the dataset.")
 
     response = client.post("/recommend", json={"movie_title": "Invalid Movie", "year": None})
     print(response.json())
     assert response.status_code == 200
     assert response.json() == {"error": "Movie 'Invalid Movie' not found in the dataset."}
-    mock_recommender.recommend.assert_called_once_with("Invalid Movie", None)
+    mock_recommender.recommend_json.assert_called_once_with("Invalid Movie", None)
 
 
 def test_recommend_movies_invalid_request():
@@ -63,3 +68,175 @@ def test_recommend_movies_invalid_request():
     )
 
     assert response.status_code == 422
+
+
+def test_recommend_movies_batch_success():
+    mock_recommender.recommend_many_json.return_value = [
+        orjson.dumps({"recommendations": [{"title": "Mocked Movie 1", "rating": 1.5, "year": 2000}]}),
+        orjson.dumps({"error": "No matches found", "message": "No movies found matching your criteria.",
+                      "possible_matches": []}),
+    ]
+
+    response = client.post(
+        "/recommend/batch",
+        json={"items": [{"movie_title": "Test Movie", "year": 2000}, {"movie_title": "Invalid Movie"}]}
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 2
+    assert "recommendations" in results[0]
+    assert results[1]["error"] == "No matches found"
+    mock_recommender.recommend_many_json.assert_called_once_with([("Test Movie", 2000), ("Invalid Movie", None)])
+
+
+def test_recommend_movies_batch_too_large():
+    with patch("main.settings.max_batch_size", 1):
+        response = client.post(
+            "/recommend/batch",
+            json={"items": [{"movie_title": "Movie 1"}, {"movie_title": "Movie 2"}]}
+        )
+
+    assert response.status_code == 200
+    assert "error" in response.json()
+    mock_recommender.recommend_many_json.assert_not_called()
+
+
+def test_recommend_movies_batch_invalid_request():
+    response = client.post("/recommend/batch", json={"items": [{}]})
+
+    assert response.status_code == 422
+
+
+def test_cache_stats():
+    mock_recommender.cache_stats.return_value = {
+        "title_resolution": {"hits": 1, "misses": 2, "evictions": 0, "size": 2},
+        "search_suggestions": {"hits": 0, "misses": 1, "evictions": 0, "size": 1},
+    }
+
+    response = client.get("/cache-stats")
+
+    assert response.status_code == 200
+    assert response.json()["title_resolution"]["hits"] == 1
+
+
+def test_healthz():
+    response = client.get("/healthz")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_not_ready():
+    with patch("main.recommender_holder.status", return_value={"status": "loading"}):
+        response = client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json() == {"status": "loading"}
+
+
+def test_readyz_ready():
+    status = {"status": "ready", "timings": {"total_seconds": 1.5}}
+    with patch("main.recommender_holder.status", return_value=status):
+        response = client.get("/readyz")
+
+    assert response.status_code == 200
+    assert response.json() == status
+
+
+def test_admin_reload_disabled_without_token():
+    with patch("main.settings.admin_token", None):
+        response = client.post("/admin/reload")
+
+    assert response.status_code == 403
+
+
+def test_admin_reload_rejects_wrong_token():
+    with patch("main.settings.admin_token", "secret"):
+        response = client.post("/admin/reload", headers={"X-Admin-Token": "wrong"})
+
+    assert response.status_code == 401
+
+
+def test_admin_reload_starts_reload():
+    with patch("main.settings.admin_token", "secret"), \
+            patch("main.recommender_holder.reload_in_background", return_value=True) as reload_in_background:
+        response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 202
+    assert response.json()["reload_started"]
+    reload_in_background.assert_called_once()
+
+
+def test_recommend_rejected_when_executor_saturated():
+    with patch("main.executor.pending", 10 ** 6):
+        response = client.post("/recommend", json={"movie_title": "Test Movie"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    mock_recommender.recommend_json.assert_not_called()
+
+
+def test_executor_stats():
+    mock_recommender.search_suggestions.return_value = ["Movie 1 (2000)"]
+    client.get("/search-suggestions", params={"query": "movie"})
+
+    response = client.get("/executor-stats")
+
+    assert response.status_code == 200
+    assert response.json()["pending"] == 0
+    assert response.json()["completed"] >= 1
+
+
+def test_metrics_endpoint():
+    mock_recommender.search_suggestions.return_value = ["Movie 1 (2000)"]
+    client.get("/search-suggestions", params={"query": "movie"})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'antirecommender_request_seconds_count{method="GET",path="/search-suggestions",status="200"}' \
+        in response.text
+
+
+def test_metrics_endpoint_disabled():
+    # the latency middleware is only installed at import when metrics are enabled,
+    # so call the endpoint directly
+    from main import metrics_endpoint
+    with patch("main.metrics", None):
+        response = metrics_endpoint()
+
+    assert response.status_code == 404
+
+
+def test_admin_reload_is_delegated_to_supervisor():
+    # Test a prefork worker asks the supervisor to reload and replace all workers instead of reloading alone
+    app.state.supervisor_pid = 12345
+    try:
+        with patch("main.settings.admin_token", "secret"), patch("main.os.kill") as kill, \
+                patch("main.recommender_holder.reload_in_background") as reload_in_background:
+            response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    finally:
+        del app.state.supervisor_pid
+
+    assert response.status_code == 202
+    kill.assert_called_once_with(12345, signal.SIGHUP)
+    reload_in_background.assert_not_called()
+
+
+def test_metrics_endpoint_sums_workers(tmp_path):
+    # Test any worker answers a scrape with the totals of all workers
+    from main import metrics
+    series = 'antirecommender_request_seconds_count{method="GET",path="/search-suggestions",status="200"}'
+    other = Metrics()
+    other.observe("antirecommender_request_seconds", 0.01, method="GET", path="/search-suggestions", status=200)
+    with patch("os.getpid", return_value=1):
+        MetricsDirectory(other, str(tmp_path)).write()
+    client.get("/search-suggestions", params={"query": "movie"})
+    own = next(line for line in metrics.render().splitlines() if line.startswith(series))
+
+    with patch("main.metrics_directory", MetricsDirectory(metrics, str(tmp_path))):
+        response = client.get("/metrics")
+
+    assert f"{series} {int(own.split()[-1]) + 1}" in response.text.splitlines()
@@ -0,0 +1,89 @@
+import os
+from unittest.mock import patch
+
+import pytest
+from src.Metrics import Metrics
+from src.MetricsDirectory import MetricsDirectory
+
+
+def test_counter_render():
+    metrics = Metrics()
+    metrics.describe("lookups_total", "Lookups by path")
+    metrics.increment("lookups_total", path="exact")
+    metrics.increment("lookups_total", amount=2, path="exact")
+    metrics.increment("lookups_total", path="none")
+
+    text = metrics.render()
+
+    assert "# HELP lookups_total Lookups by path" in text
+    assert "# TYPE lookups_total counter" in text
+    assert 'lookups_total{path="exact"} 3' in text
+    assert 'lookups_total{path="none"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        metrics.observe("latency_seconds", value, path="/recommend")
+
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{path="/recommend",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{path="/recommend",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{path="/recommend",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{path="/recommend"} 6.05' in lines
+    assert 'latency_seconds_count{path="/recommend"} 4' in lines
+
+
+def test_stage_timer_records_each_lap():
+    metrics = Metrics()
+    timer = metrics.timer("recommend")
+    timer.lap("resolve")
+    timer.lap("sampling")
+
+    text = metrics.render()
+
+    assert 'antirecommender_stage_seconds_count{operation="recommend",stage="resolve"} 1' in text
+    assert 'antirecommender_stage_seconds_count{operation="recommend",stage="sampling"} 1' in text
+
+
+def test_merge_sums_snapshots():
+    first, second = Metrics(buckets=(0.1, 1.0)), Metrics(buckets=(0.1, 1.0))
+    first.describe("lookups_total", "Lookups by path")
+    first.increment("lookups_total", path="exact")
+    second.increment("lookups_total", amount=2, path="exact")
+    second.increment("lookups_total", path="none")
+    first.observe("latency_seconds", 0.05)
+    second.observe("latency_seconds", 0.5)
+
+    total = Metrics(buckets=(0.1, 1.0))
+    total.merge(first.snapshot())
+    total.merge(second.snapshot())
+    lines = total.render().splitlines()
+
+    assert "# HELP lookups_total Lookups by path" in lines
+    assert 'lookups_total{path="exact"} 3' in lines
+    assert 'lookups_total{path="none"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert "latency_seconds_count 2" in lines
+    with pytest.raises(ValueError):
+        total.merge(Metrics(buckets=(1.0,)).snapshot())
+
+
+def test_metrics_directory_sums_workers(tmp_path):
+    # Test a scrape sees the metrics of every worker, including workers which exited
+    MetricsDirectory.clear(str(tmp_path))
+    workers = [Metrics(), Metrics()]
+    for pid, worker in enumerate(workers, start=100):
+        worker.increment("lookups_total", path="exact")
+        with patch("os.getpid", return_value=pid):
+            MetricsDirectory(worker, str(tmp_path)).write()
+
+    workers[1].increment("lookups_total", path="exact")
+    with patch("os.getpid", return_value=101):
+        total = MetricsDirectory(workers[1], str(tmp_path)).collect()
+
+    assert 'lookups_total{path="exact"} 3' in total.render()
+    MetricsDirectory.clear(str(tmp_path))
+    assert os.listdir(tmp_path) == []
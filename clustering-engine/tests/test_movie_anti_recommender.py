@@ -1,3 +1,5 @@
+import json
+import numpy as np
 import pandas as pd
 
 
@@ -72,3 +74,129 @@ def test_valid_title_no_year(get_test_recommender):
     result = get_test_recommender.standardize_title("Movie 37")
     assert isinstance(result, pd.Index)
     assert len(result) == 1
+
+
+def test_farthest_clusters_table(get_test_recommender):
+    # Test precomputed farthest cluster matches a direct distance computation
+    centers = get_test_recommender.cluster_centers
+    for cluster, center in enumerate(centers):
+        expected = np.argmax(np.linalg.norm(center.reshape(1, -1) - centers, axis=1))
+        assert get_test_recommender.farthest_clusters[cluster] == expected
+
+
+def test_distant_clusters_ranking(data_paths):
+    # Test the ranked distant clusters are ordered by decreasing distance
+    from src.MovieAntiRecommender import MovieAntiRecommender
+
+    recommender = MovieAntiRecommender(distant_clusters=3)
+    recommender.load_dataset(data_paths["dataset"], data_paths["model"])
+    centers = recommender.cluster_centers
+    assert recommender.distant_clusters.shape == (centers.shape[0], 3)
+    for cluster, ranked in enumerate(recommender.distant_clusters):
+        distances = np.linalg.norm(centers[ranked] - centers[cluster], axis=1)
+        assert np.all(np.diff(distances) <= 0)
+        assert distances[0] == np.linalg.norm(centers - centers[cluster], axis=1).max()
+
+
+def test_recommend_from_distant_clusters(data_paths):
+    # Test recommendations are sampled from the top distant clusters only
+    from src.MovieAntiRecommender import MovieAntiRecommender
+
+    recommender = MovieAntiRecommender(distant_clusters=2)
+    recommender.load_dataset(data_paths["dataset"], data_paths["model"])
+    allowed = set(recommender.distant_clusters[recommender.labels[20]].tolist())
+    results = recommender.recommend_many([("Movie 14", 2010)] * 50)
+    catalog = recommender.catalog
+    for result in results:
+        for recommendation in result["recommendations"]:
+            row = [i for i in range(len(catalog))
+                   if catalog.titles[i] == recommendation["title"] and catalog.years[i] == recommendation["year"]][0]
+            assert recommender.labels[row] in allowed
+
+
+def test_rating_buckets(get_test_recommender):
+    # Test rating buckets hold exactly the rows of each cluster and rating band
+    labels = get_test_recommender.labels
+    ratings = get_test_recommender.catalog.ratings
+    quantiles = get_test_recommender.rating_quantiles
+    masks = [ratings < quantiles[0], ratings > quantiles[1], ratings > quantiles[2]]
+    for (rows, offsets), mask in zip(get_test_recommender.rating_buckets, masks):
+        for cluster in range(get_test_recommender.cluster_centers.shape[0]):
+            bucket = rows[offsets[cluster]:offsets[cluster + 1]]
+            assert sorted(bucket.tolist()) == np.flatnonzero(mask & (labels == cluster)).tolist()
+
+
+def test_recommend_from_farthest_cluster(get_test_recommender):
+    # Test recommendations come from the farthest cluster of the query movie
+    result = get_test_recommender.recommend("Movie 14", year=2010)
+    assert result["query"] == {"title": "Movie 14", "rating": 4.5, "year": 2010}
+
+    movie_cluster = get_test_recommender.labels[20]
+    farthest_cluster = get_test_recommender.farthest_clusters[movie_cluster]
+    catalog = get_test_recommender.catalog
+    for recommendation in result["recommendations"]:
+        assert "movieId" not in recommendation
+        row = [i for i in range(len(catalog))
+               if catalog.titles[i] == recommendation["title"] and catalog.years[i] == recommendation["year"]][0]
+        assert get_test_recommender.labels[row] == farthest_cluster
+
+
+def test_recommend_unknown_movie(get_test_recommender):
+    # Test recommend passes through the title resolution error
+    result = get_test_recommender.recommend("ThisMovieDoesNotExist123")
+    assert result["error"] == "No matches found"
+
+
+def test_recommend_many(get_test_recommender):
+    # Test batch recommendations keep query order and report errors per item
+    results = get_test_recommender.recommend_many([
+        ("Movie 14", 2010),
+        ("ThisMovieDoesNotExist123", None),
+        ("Movie 10", None),
+        ("movie 14", 2010),
+    ])
+    assert len(results) == 4
+    assert results[0]["query"] == {"title": "Movie 14", "rating": 4.5, "year": 2010}
+    assert results[1]["error"] == "No matches found"
+    assert results[2]["error"] == "Ambiguous match found"
+    assert results[3]["query"] == results[0]["query"]
+    for recommendation in results[0]["recommendations"] + results[3]["recommendations"]:
+        assert "movieId" not in recommendation
+
+
+def test_recommend_many_empty(get_test_recommender):
+    assert get_test_recommender.recommend_many([]) == []
+
+
+def test_metrics_count_resolution_paths(data_paths):
+    from src.Metrics import Metrics
+    from src.MovieAntiRecommender import MovieAntiRecommender
+
+    metrics = Metrics()
+    recommender = MovieAntiRecommender(metrics=metrics)
+    recommender.load_dataset(data_paths["dataset"], data_paths["model"])
+    recommender.standardize_title("Movie 14", year=2010)
+    recommender.standardize_title("Movie 14", year=2010)
+    recommender.standardize_title("mobie 1", year=2010)
+    recommender.standardize_title("Nonexistent Movie XYZ")
+    recommender.recommend("Movie 14", year=2010)
+
+    text = metrics.render()
+
+    assert 'antirecommender_title_resolutions_total{path="exact"} 1' in text
+    assert 'antirecommender_title_resolutions_total{path="cache"} 2' in text
+    assert 'antirecommender_title_resolutions_total{path="close_match"} 1' in text
+    assert 'antirecommender_title_resolutions_total{path="none"} 1' in text
+    assert 'antirecommender_stage_seconds_count{operation="recommend",stage="records"} 1' in text
+
+
+def test_recommend_many_json_matches_recommend_many(get_test_recommender):
+    # Test the spliced JSON encodes the same results as the dicts
+    queries = [("Movie 14", 2010), ("movie 3", None), ("ThisMovieDoesNotExist123", None), ("Movie 10", None)]
+    np.random.seed(7)
+    expected = get_test_recommender.recommend_many(queries)
+    np.random.seed(7)
+    encoded = get_test_recommender.recommend_many_json(queries)
+
+    assert all(isinstance(result, bytes) for result in encoded)
+    assert [json.loads(result) for result in encoded] == json.loads(json.dumps(expected))
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.MovieAntiRecommender import MovieAntiRecommender
+from src.MovieCatalog import MovieCatalog
+from src.StringTable import StringTable
+
+
+def test_string_table_interns_values():
+    table = StringTable.from_strings(["b", "a", "b", "żółw"])
+    assert table.n_values == 3
+    assert len(table) == 4
+    assert table[3] == "żółw"
+    assert table.take([2, 1]) == ["b", "a"]
+    assert table.tolist() == ["b", "a", "b", "żółw"]
+    assert list(table) == table.tolist()
+
+
+def test_catalog_dtypes(get_test_recommender):
+    catalog = get_test_recommender.catalog
+    assert len(catalog) == 50
+    assert catalog.movie_ids.dtype == np.int32
+    assert catalog.years.dtype == np.int32
+    assert get_test_recommender.labels.dtype == np.int32
+
+
+def test_catalog_records_match_dataframe(data_paths):
+    # Test records are the same as the former DataFrame based responses
+    movies_df = pd.read_csv(data_paths["dataset"])
+    catalog = MovieCatalog.from_dataframe(movies_df)
+    rows = [0, 16, 49]
+    expected = movies_df.iloc[rows].drop(['movieId'], axis=1).to_dict(orient='records')
+    assert catalog.records(rows) == expected
+
+
+def test_recommender_from_parquet(get_test_recommender, data_paths, tmp_path):
+    # Test a Parquet dataset loads into the same catalog as the CSV one
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "cleaned_movies.parquet")
+    pd.read_csv(data_paths["dataset"]).to_parquet(path, index=False)
+
+    recommender = MovieAntiRecommender()
+    recommender.load_dataset(path, data_paths["model"])
+
+    assert recommender.catalog.records(range(len(recommender.catalog))) == \
+        get_test_recommender.catalog.records(range(len(get_test_recommender.catalog)))
+    np.testing.assert_array_equal(recommender.catalog.movie_ids, get_test_recommender.catalog.movie_ids)
@@ -0,0 +1,101 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+from unittest.mock import mock_open, patch
+
+import httpx
+import pytest
+from src.PreforkServer import PreforkServer
+
+SERVER_SCRIPT = textwrap.dedent("""
+    import os
+    import sys
+    from src.PreforkServer import PreforkServer
+
+    generation = 1
+
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = f"{os.getpid()} {generation}".encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"%d" % len(body))]})
+        await send({"type": "http.response.body", "body": body})
+
+
+    def reload():
+        global generation
+        generation += 1
+        return True
+
+
+    PreforkServer(app, host="127.0.0.1", port=int(sys.argv[1]), workers=2, reload=reload).serve()
+""")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def worker_states(port, requests=20):
+    states = set()
+    for _ in range(requests):
+        # a new connection per request, so the kernel can hand it to any worker
+        pid, generation = httpx.get(f"http://127.0.0.1:{port}/", timeout=5).text.split()
+        states.add((int(pid), int(generation)))
+    return states
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            result = condition()
+            if result:
+                return result
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise AssertionError("Condition not met in time")
+
+
+def test_available_cpus_respects_cgroup_quota():
+    with patch("os.sched_getaffinity", return_value=set(range(8))):
+        with patch("builtins.open", mock_open(read_data="150000 100000\n")):
+            assert PreforkServer.available_cpus() == 2
+        with patch("builtins.open", mock_open(read_data="max 100000\n")):
+            assert PreforkServer.available_cpus() == 8
+        with patch("builtins.open", side_effect=OSError):
+            assert PreforkServer.available_cpus() == 8
+    assert PreforkServer(app=None).workers == PreforkServer.available_cpus()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Needs fork")
+def test_sighup_reloads_in_supervisor_and_replaces_workers():
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port)], cwd=Path(__file__).parent.parent)
+    try:
+        first = wait_for(lambda: worker_states(port))
+        assert {generation for _, generation in first} == {1}
+
+        def reloaded():
+            states = worker_states(port)
+            return states if {generation for _, generation in states} == {2} else None
+
+        server.send_signal(signal.SIGHUP)
+        second = wait_for(reloaded)
+        # every worker was forked again from the reloaded supervisor
+        assert not {pid for pid, _ in first} & {pid for pid, _ in second}
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=10) == 0
+    finally:
+        if server.poll() is None:
+            server.kill()
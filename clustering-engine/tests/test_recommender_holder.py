@@ -0,0 +1,215 @@
+import threading
+import time
+import pytest
+from src.RecommenderHolder import RecommenderHolder
+
+
+class SlowRecommender:
+    load_timings = {"read_seconds": 0.1}
+
+
+def test_single_initialization_under_concurrency():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return SlowRecommender()
+
+    holder = RecommenderHolder(factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(holder.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert holder.status()["status"] == "ready"
+    assert holder.timings["read_seconds"] == 0.1
+    assert "total_seconds" in holder.timings
+
+
+def test_background_load_reports_loading():
+    release = threading.Event()
+
+    def factory():
+        release.wait(5)
+        return SlowRecommender()
+
+    holder = RecommenderHolder(factory)
+    loader = holder.load_in_background()
+    while not holder.loading:
+        time.sleep(0.001)
+    assert holder.status() == {"status": "loading"}
+
+    release.set()
+    loader.join(5)
+    assert holder.ready
+
+
+def test_failed_load_can_be_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FileNotFoundError("data/clustered_dataset.csv")
+        return SlowRecommender()
+
+    holder = RecommenderHolder(factory)
+    with pytest.raises(FileNotFoundError):
+        holder.get()
+    assert holder.status()["status"] == "failed"
+
+    assert isinstance(holder.get(), SlowRecommender)
+    assert holder.status()["status"] == "ready"
+
+
+def test_warmup_records_timing(get_test_recommender):
+    get_test_recommender.warmup()
+    assert set(get_test_recommender.load_timings) == {"read_seconds", "index_seconds", "warmup_seconds"}
+    assert get_test_recommender.cache_stats()["title_resolution"]["size"] == 0
+
+
+def test_reload_swaps_instance():
+    instances = []
+
+    def factory():
+        instances.append(SlowRecommender())
+        return instances[-1]
+
+    holder = RecommenderHolder(factory)
+    first = holder.get()
+    assert holder.reload()
+    assert holder.get() is instances[-1]
+    assert holder.get() is not first
+    assert holder.generation == 2
+
+
+def test_reload_keeps_serving_old_instance_until_ready():
+    release = threading.Event()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return SlowRecommender()
+
+    holder = RecommenderHolder(factory)
+    first = holder.get()
+    assert holder.reload_in_background()
+    while not holder.reloading:
+        time.sleep(0.001)
+
+    # a second reload is refused while the first one runs
+    assert not holder.reload()
+    assert holder.get() is first
+    assert holder.status()["reloading"]
+
+    release.set()
+    while holder.reloading:
+        time.sleep(0.001)
+    assert holder.get() is not first
+    assert len(calls) == 2
+
+
+def test_concurrent_background_reloads_start_once(monkeypatch):
+    release = threading.Event()
+    calls = []
+    started = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return SlowRecommender()
+
+    real_start = threading.Thread.start
+
+    class DeferredThread(threading.Thread):
+        # the reloader threads only run once the test starts them, as if they were not scheduled yet
+        def start(self):
+            started.append(self)
+
+    holder = RecommenderHolder(factory)
+    holder.get()
+    monkeypatch.setattr("src.RecommenderHolder.threading.Thread", DeferredThread)
+
+    # the reload is claimed before its thread runs, so the second call is refused right away
+    assert holder.reload_in_background()
+    assert holder.status()["reloading"]
+    assert not holder.reload_in_background()
+    assert len(started) == 1
+
+    real_start(started[0])
+    release.set()
+    started[0].join(5)
+    assert holder.generation == 2
+    assert not holder.reloading
+    assert len(calls) == 2
+
+
+def test_watch_reloads_change_seen_during_running_reload(tmp_path):
+    watched = tmp_path / "clustered_dataset.csv"
+    watched.write_text("v1")
+    release = threading.Event()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 2:
+            release.wait(5)
+        return SlowRecommender()
+
+    holder = RecommenderHolder(factory)
+    holder.get()
+    assert holder.reload_in_background()
+
+    holder.watch([str(watched)], interval=0.01)
+    try:
+        watched.write_text("version 2")
+        time.sleep(0.1)
+        assert holder.generation == 1
+        release.set()
+        deadline = time.monotonic() + 5
+        while holder.generation < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        holder.stop_watching()
+    assert holder.generation == 3
+
+
+def test_failed_reload_keeps_old_instance():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) > 1:
+            raise ValueError("broken model")
+        return SlowRecommender()
+
+    holder = RecommenderHolder(factory)
+    first = holder.get()
+    assert not holder.reload()
+    assert holder.get() is first
+    assert holder.status()["reload_error"] == "broken model"
+
+
+def test_watch_reloads_on_stable_change(tmp_path):
+    watched = tmp_path / "clustered_dataset.csv"
+    watched.write_text("v1")
+    holder = RecommenderHolder(SlowRecommender)
+    holder.get()
+
+    holder.watch([str(watched)], interval=0.01)
+    try:
+        watched.write_text("version 2")
+        deadline = time.monotonic() + 5
+        while holder.generation < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        holder.stop_watching()
+    assert holder.generation == 2
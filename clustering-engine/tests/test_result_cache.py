@@ -0,0 +1,61 @@
+from unittest.mock import patch
+from src.ResultCache import ResultCache
+
+
+def test_hit_and_miss():
+    cache = ResultCache(maxsize=2, ttl=60)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+
+def test_lru_eviction():
+    cache = ResultCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = ResultCache(maxsize=2, ttl=10)
+    with patch("src.ResultCache.time.monotonic", return_value=100.0):
+        cache.put("a", 1)
+    with patch("src.ResultCache.time.monotonic", return_value=111.0):
+        assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache():
+    cache = ResultCache(maxsize=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_recommender_caches_title_resolution(get_test_recommender):
+    first = get_test_recommender.standardize_title("Movie 14", year=2010)
+    second = get_test_recommender.standardize_title("MOVIE 14", year=2010)
+    assert list(first) == list(second)
+    assert get_test_recommender.cache_stats()["title_resolution"]["hits"] == 1
+
+
+def test_recommender_caches_normalized_suggestions(get_test_recommender):
+    first = get_test_recommender.search_suggestions("movie 2")
+    second = get_test_recommender.search_suggestions("  Movie   2 ")
+    assert first == second
+    assert get_test_recommender.cache_stats()["search_suggestions"]["hits"] == 1
+
+
+def test_reload_clears_caches(get_test_recommender, data_paths):
+    get_test_recommender.search_suggestions("movie 2")
+    get_test_recommender.standardize_title("Movie 14")
+    get_test_recommender.load_dataset(data_paths["dataset"], data_paths["model"])
+    stats = get_test_recommender.cache_stats()
+    assert stats["title_resolution"]["size"] == 0
+    assert stats["search_suggestions"]["size"] == 0
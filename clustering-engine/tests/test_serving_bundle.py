@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.MovieAntiRecommender import MovieAntiRecommender
+from src.ServingBundle import ServingBundle
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "test.bundle")
+    arrays = {
+        "ints": np.arange(5, dtype=np.int32),
+        "matrix": np.random.rand(3, 4),
+        "bytes": np.frombuffer(b"abc", dtype=np.uint8),
+        "empty": np.array([], dtype=np.int64),
+    }
+    ServingBundle.write(path, arrays, {"n_movies": 5})
+
+    bundle = ServingBundle.open(path)
+    assert bundle.metadata == {"n_movies": 5}
+    for name, array in arrays.items():
+        assert bundle[name].dtype == array.dtype
+        np.testing.assert_array_equal(bundle[name], array)
+    assert isinstance(bundle["matrix"].base, np.memmap)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a.bundle"
+    path.write_bytes(b"movieId,title\n" * 4)
+    with pytest.raises(ValueError):
+        ServingBundle.open(str(path))
+
+
+def test_recommender_from_bundle(get_test_recommender, tmp_path):
+    # Test a recommender loaded from a bundle behaves like the CSV and pickle one
+    path = str(tmp_path / "catalog.bundle")
+    get_test_recommender.save_bundle(path)
+
+    recommender = MovieAntiRecommender()
+    recommender.load_bundle(path)
+
+    np.testing.assert_array_equal(recommender.labels, get_test_recommender.labels)
+    np.testing.assert_array_equal(recommender.farthest_clusters, get_test_recommender.farthest_clusters)
+    assert recommender.catalog.records(range(50)) == get_test_recommender.catalog.records(range(50))
+    assert recommender.recommend("Movie 14", 2010)["query"] == get_test_recommender.recommend("Movie 14", 2010)["query"]
+    assert recommender.search_suggestions("movie 2") == get_test_recommender.search_suggestions("movie 2")
+
+
+def test_recommender_uses_stored_distant_clusters(data_paths, tmp_path):
+    # Test the ranking stored in the bundle is loaded instead of recomputed
+    source = MovieAntiRecommender(distant_clusters=3)
+    source.load_dataset(data_paths["dataset"], data_paths["model"])
+    path = str(tmp_path / "catalog.bundle")
+    source.save_bundle(path)
+
+    recommender = MovieAntiRecommender(distant_clusters=2)
+    with patch.object(MovieAntiRecommender, "_compute_distant_clusters") as compute:
+        recommender.load_bundle(path)
+
+    compute.assert_not_called()
+    np.testing.assert_array_equal(recommender.distant_clusters, source.distant_clusters[:, :2])
+
+
+def test_recommender_maps_saved_indexes(get_test_recommender, tmp_path):
+    # Test indexes saved in the bundle are wrapped instead of built again
+    path = str(tmp_path / "catalog.bundle")
+    get_test_recommender.save_bundle(path)
+    assert ServingBundle.open(path).metadata["index_version"] == MovieAntiRecommender.INDEX_VERSION
+
+    recommender = MovieAntiRecommender()
+    with patch("src.MovieAntiRecommender.TitleIndex.__init__") as build_titles, \
+            patch("src.MovieAntiRecommender.SuggestionEngine.__init__") as build_suggestions:
+        recommender.load_bundle(path)
+    build_titles.assert_not_called()
+    build_suggestions.assert_not_called()
+
+    assert isinstance(recommender.title_index.unique_titles.data.base, np.memmap)
+    for (rows, offsets), (expected_rows, expected_offsets) in zip(recommender.rating_buckets,
+                                                                  get_test_recommender.rating_buckets):
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_array_equal(offsets, expected_offsets)
+    assert recommender.record_fragments.array(range(50)) == get_test_recommender.record_fragments.array(range(50))
+    for title in ["Movie 14", "movie 2", "Mobie 1"]:
+        assert repr(recommender.standardize_title(title)) == repr(get_test_recommender.standardize_title(title))
+        assert recommender.search_suggestions(title) == get_test_recommender.search_suggestions(title)
+
+
+def test_recommender_rebuilds_indexes_of_other_version(get_test_recommender, tmp_path):
+    # Test indexes of another version are ignored and built from the catalog
+    path = str(tmp_path / "catalog.bundle")
+    get_test_recommender.save_bundle(path)
+    with patch.object(MovieAntiRecommender, "INDEX_VERSION", MovieAntiRecommender.INDEX_VERSION + 1):
+        recommender = MovieAntiRecommender()
+        with patch("src.MovieAntiRecommender.TitleIndex.from_arrays") as wrap:
+            recommender.load_bundle(path)
+    wrap.assert_not_called()
+    assert recommender.search_suggestions("movie 2") == get_test_recommender.search_suggestions("movie 2")
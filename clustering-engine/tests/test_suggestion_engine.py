@@ -0,0 +1,50 @@
+from src.SuggestionEngine import SuggestionEngine
+
+
+def test_suggestions_expand_years(get_test_recommender):
+    # Test a title released in several years is suggested once per year
+    suggestions = get_test_recommender.search_suggestions("movie 2")
+    assert suggestions[:3] == ["movie 2 (2005)", "movie 2 (2015)", "movie 2 (2020)"]
+    assert len(suggestions) == len(set(suggestions))
+    assert len(suggestions) <= 6
+
+
+def test_suggestions_misspelled(get_test_recommender):
+    suggestions = get_test_recommender.search_suggestions("mvie 37")
+    assert "movie 37 (2012)" in suggestions
+
+
+def test_suggestions_short_query(get_test_recommender):
+    # Test queries shorter than a trigram are scored against the whole catalog
+    suggestions = get_test_recommender.search_suggestions("m")
+    assert 0 < len(suggestions) <= 6
+
+
+def test_prefix_candidates_are_kept():
+    # Test titles starting with the query are kept when the trigram candidates are full of earlier ties
+    titles = ["Lone Star", "Dark Star", "Wars of Stars", "Stardust", "Other"]
+    engine = SuggestionEngine(titles, [1990, 1974, 1990, 2007, 2000], max_candidates=2)
+    query = engine.normalize_query("  STAR ")
+    assert engine._prefix_candidates(query).tolist() == [3]
+    candidates = engine._candidates(query).tolist()
+    assert 3 in candidates
+    # the trigram path alone only keeps the first titles sharing both trigrams
+    assert sorted(set(candidates) - {3}) == [0, 1]
+
+
+def test_suggestions_match_full_scan():
+    # Test the candidate prefilter gives the same best titles as scoring everything
+    titles = [f"title {i} {word}" for i, word in enumerate(["alpha", "beta", "gamma", "delta"] * 50)]
+    years = list(range(1900, 2100))
+    prefiltered = SuggestionEngine(titles, years, max_candidates=20)
+    full = SuggestionEngine(titles, years, max_candidates=len(titles))
+    for query in ["title 12 gamma", "delta", "titel 3 beta"]:
+        assert prefiltered.suggest(query) == full.suggest(query)
+
+
+def test_engine_from_arrays_gives_same_suggestions(get_test_recommender):
+    # Test an engine wrapped from its arrays suggests like the built one
+    engine = get_test_recommender.suggestion_engine
+    wrapped = SuggestionEngine.from_arrays(engine.to_arrays())
+    for query in ["movie 2", "MOVIE 10", "mo", "m", "xyz", ""]:
+        assert wrapped.suggest(query) == engine.suggest(query)
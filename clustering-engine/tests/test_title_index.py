@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from difflib import get_close_matches
+from src.TitleIndex import TitleIndex
+
+
+def test_index_built_on_load(get_test_recommender):
+    # Test title index is built together with the dataset
+    assert isinstance(get_test_recommender.title_index, TitleIndex)
+    assert len(get_test_recommender.title_index.years) == len(get_test_recommender.catalog)
+
+
+def test_exact_lookup_with_and_without_year(get_test_recommender):
+    index = get_test_recommender.title_index
+    assert index.exact("MOVIE 10").tolist() == [15, 16]
+    assert index.exact("movie 10", 2015).tolist() == [16]
+    assert len(index.exact("movie 10", 1900)) == 0
+
+
+def test_contains_matches_substring_scan(get_test_recommender):
+    index = get_test_recommender.title_index
+    titles = pd.Series(get_test_recommender.catalog.standardized_titles.tolist()).str.lower()
+    for query in ["movie 2", "ie 3", "chapter", "xyz", "e", "ov"]:
+        expected = np.flatnonzero(titles.str.contains(query, regex=False).values)
+        assert index.contains(query).tolist() == expected.tolist()
+
+
+def test_close_matches_agree_with_difflib(get_test_recommender):
+    index = get_test_recommender.title_index
+    titles = pd.Series(get_test_recommender.catalog.standardized_titles.tolist()).str.lower()
+    for query in ["mobie 1", "msiovie 2", "movei 34 nxt", "ThisMovieDoesNotExist123"]:
+        matches = get_close_matches(query.lower(), titles.tolist(), n=5, cutoff=0.6)
+        expected = np.flatnonzero(titles.isin(matches).values)
+        assert index.close_matches(query).tolist() == expected.tolist()
+
+
+def test_close_matches_count_duplicated_titles():
+    # Test duplicated titles use up the match slots the way difflib does
+    index = TitleIndex(["abcd", "abcd", "abce", "abcf"], [2000, 2001, 2002, 2003])
+    assert index.close_matches("abcd", n=2).tolist() == [0, 1]
+
+
+def test_close_matches_agree_with_difflib_on_random_titles():
+    # Test candidate pruning never drops a difflib match, including score ties and duplicates
+    rng = np.random.default_rng(42)
+    pieces = np.array(list("abcde xyz") + ["ab", "cd", "é"])
+    titles = ["".join(rng.choice(pieces, size=rng.integers(0, 9))) for _ in range(300)]
+    index = TitleIndex(titles, rng.integers(1990, 2000, size=300))
+    for query in ["".join(rng.choice(pieces, size=rng.integers(1, 9))) for _ in range(50)]:
+        for n, cutoff in [(5, 0.6), (1, 0.6), (10, 0.3)]:
+            matches = get_close_matches(query, titles, n=n, cutoff=cutoff)
+            expected = [row for row, title in enumerate(titles) if title in matches]
+            assert index.close_matches(query, n=n, cutoff=cutoff).tolist() == expected
+
+
+def test_close_matches_without_common_trigram():
+    # Test a match sharing characters but no trigram with the query is found, as difflib scores it 0.6
+    index = TitleIndex(["axbxc", "zzzzz"], [2000, 2001])
+    assert index.close_matches("abcde").tolist() == [0]
+
+
+def test_contains_short_queries_with_multibyte_titles():
+    # Test queries shorter than a trigram never match across two titles or inside a character
+    titles = ["Été", "ab", "", "bé", "日本", "ab"]
+    index = TitleIndex(titles, [2000] * len(titles))
+    for query in ["", "é", "b", "ba", "日", "本", "tb", "té"]:
+        expected = [row for row, title in enumerate(titles) if query in title.lower()]
+        assert index.contains(query).tolist() == expected
+
+
+def test_index_from_arrays_gives_same_lookups(get_test_recommender):
+    # Test an index wrapped from its arrays answers like the built one
+    index = get_test_recommender.title_index
+    wrapped = TitleIndex.from_arrays(index.to_arrays(), index.years)
+    for query in ["movie 10", "MOVIE 2", "ie", "mobie 1", "xyz"]:
+        assert wrapped.exact(query).tolist() == index.exact(query).tolist()
+        assert wrapped.contains(query).tolist() == index.contains(query).tolist()
+        assert wrapped.close_matches(query).tolist() == index.close_matches(query).tolist()
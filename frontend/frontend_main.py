@@ -1,5 +1,8 @@
-from flask import Flask, render_template, request, jsonify
+import os
+from flask import Flask, Response, render_template, request, jsonify
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 app = Flask(__name__)
 
 
@@ -8,7 +11,85 @@ def hello_world():
     return render_template("index.html")
 
 
-BACKEND_URL = "http://backend:8000"
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://backend:8000")
+BACKEND_CONNECT_TIMEOUT = float(os.environ.get("BACKEND_CONNECT_TIMEOUT", "2"))
+BACKEND_READ_TIMEOUT = float(os.environ.get("BACKEND_READ_TIMEOUT", "10"))
+BACKEND_RETRIES = int(os.environ.get("BACKEND_RETRIES", "2"))
+BACKEND_POOL_SIZE = int(os.environ.get("BACKEND_POOL_SIZE", "10"))
+
+
+def create_backend_session():
+    """
+    Create the HTTP session shared by all calls to the recommender API.
+
+    The session keeps up to BACKEND_POOL_SIZE keep-alive connections to the
+    backend, so requests don't pay for a new TCP connection each time. Failed
+    connections are retried with exponential backoff, and so are 502/503/504
+    responses to idempotent methods only. Read timeouts are not retried, so a
+    slow backend doesn't get the same work several times.
+
+    Returns:
+        requests.Session: Session with a pooled, retrying adapter
+    """
+    retry = Retry(
+        total=BACKEND_RETRIES,
+        read=False,
+        backoff_factor=0.1,
+        status_forcelist=(502, 503, 504),
+        # a POST which got an error status may have been processed, only idempotent methods are sent again
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+backend_session = create_backend_session()
+
+
+class BackendClientError(requests.HTTPError):
+    """
+    The recommender API rejected the request with a 4xx status.
+
+    The response is passed on to the browser as it is, unlike connection
+    errors, timeouts and 5xx statuses, which mean the backend is unavailable.
+    """
+
+
+def call_backend(method, path, **kwargs):
+    """
+    Call the recommender API through the shared session.
+
+    Args:
+        method (str): HTTP method
+        path (str): Endpoint path, e.g. "/recommend"
+        **kwargs: Passed to ``requests.Session.request``, e.g. json or params
+
+    Returns:
+        dict: Parsed JSON response
+
+    Raises:
+        BackendClientError: On 4xx statuses
+        requests.RequestException: On connection errors, timeouts, 5xx
+            statuses and invalid JSON
+    """
+    response = backend_session.request(method, f"{BACKEND_URL}{path}",
+                                       timeout=(BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT), **kwargs)
+    if 400 <= response.status_code < 500:
+        raise BackendClientError(f"{response.status_code} Client Error for url: {response.url}", response=response)
+    response.raise_for_status()
+    return response.json()
+
+
+def backend_response(response):
+    """
+    Forward a response of the recommender API with its status and body.
+    """
+    return Response(response.content, status=response.status_code,
+                    content_type=response.headers.get("Content-Type", "application/json"))
 
 
 @app.route("/api/recommend", methods=["POST"])
@@ -23,23 +104,35 @@ def recommend():
         json.update({"year": year})
 
     # Make request to the recommender API
-    response = requests.post(
-        f"{BACKEND_URL}/recommend",
-        json=json
-    )
-
-    if "error" in response.json().keys():
-        possible_matches = [f"Title: {result[0]}, year: {int(result[1])}" for result in response.json()["possible_matches"]]
+    try:
+        response = call_backend("POST", "/recommend", json=json)
+    except BackendClientError as e:
+        app.logger.warning(f"Recommender API rejected the request: {e}")
+        return backend_response(e.response)
+    except requests.Timeout:
+        app.logger.error("Recommender API timed out")
+        return jsonify({"query": query, "error": "The recommender did not respond in time"}), 502
+    except requests.RequestException as e:
+        app.logger.error(f"Error calling the recommender API: {e}")
+        return jsonify({"query": query, "error": "The recommender is unavailable"}), 502
+
+    if "error" in response:
+        possible_matches = [f"Title: {result[0]}, year: {int(result[1])}"
+                            for result in response.get("possible_matches", [])]
 
         result = jsonify({
             "query": query,
+            "error": response["error"],
             "possible_matches": possible_matches
         })
 
         return result
     else:
 
-        recommendations = [f"Title: {result['standardized_title']}, year: {int(result['year'])}, rating: {result['rating']:.2f}" for result in response.json()["recommendations"]]
+        recommendations = [
+            f"Title: {result['standardized_title']}, year: {int(result['year'])}, rating: {result['rating']:.2f}"
+            for result in response["recommendations"]
+        ]
         result = jsonify({
             "query": query,
             "results": recommendations
@@ -48,5 +141,23 @@ def recommend():
         return result
 
 
+@app.route("/api/search-suggestions", methods=["GET"])
+def search_suggestions():
+    query = request.args.get("query", "")
+    if not query.strip():
+        return jsonify({"suggestions": []})
+
+    try:
+        response = call_backend("GET", "/search-suggestions", params={"query": query})
+    except BackendClientError as e:
+        app.logger.warning(f"Recommender API rejected the request: {e}")
+        return backend_response(e.response)
+    except requests.RequestException as e:
+        app.logger.error(f"Error calling the recommender API: {e}")
+        return jsonify({"suggestions": []}), 502
+
+    return jsonify({"suggestions": response.get("suggestions", [])})
+
+
 if __name__ == "__main__":
     app.run(debug=False)
@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+import pytest
+import requests
+from frontend import frontend_main
+from frontend.frontend_main import app, backend_session
+
+
+def backend_reply(status_code, body, content_type="application/json"):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    response.headers["Content-Type"] = content_type
+    response.url = "http://backend:8000/recommend"
+    return response
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def session():
+    with patch.object(frontend_main, "backend_session") as mocked:
+        yield mocked
+
+
+def test_recommend_formats_backend_results(client, session):
+    session.request.return_value = backend_reply(
+        200, b'{"recommendations": [{"standardized_title": "Heat", "year": 1995, "rating": 4.123}]}')
+
+    response = client.post("/api/recommend", json={"query": "heat", "year": 1995})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"query": "heat", "results": ["Title: Heat, year: 1995, rating: 4.12"]}
+    assert session.request.call_args.kwargs["json"] == {"movie_title": "heat", "year": 1995}
+
+
+def test_client_errors_are_passed_through(client, session):
+    session.request.return_value = backend_reply(422, b'{"detail": "movie_title is required"}')
+
+    response = client.post("/api/recommend", json={"query": None})
+
+    assert response.status_code == 422
+    assert response.get_json() == {"detail": "movie_title is required"}
+
+    session.request.return_value = backend_reply(429, b"Too many requests", "text/plain")
+    response = client.get("/api/search-suggestions?query=heat")
+    assert response.status_code == 429
+    assert response.data == b"Too many requests"
+
+
+@pytest.mark.parametrize("failure", [requests.Timeout("read timed out"), requests.ConnectionError("refused")])
+def test_unreachable_backend_is_bad_gateway(client, session, failure):
+    session.request.side_effect = failure
+
+    assert client.post("/api/recommend", json={"query": "heat"}).status_code == 502
+    response = client.get("/api/search-suggestions?query=heat")
+    assert response.status_code == 502
+    assert response.get_json() == {"suggestions": []}
+
+
+def test_server_errors_are_bad_gateway(client, session):
+    session.request.return_value = backend_reply(503, b'{"detail": "busy"}')
+
+    assert client.post("/api/recommend", json={"query": "heat"}).status_code == 502
+    assert client.get("/api/search-suggestions?query=heat").status_code == 502
+
+
+def test_only_idempotent_methods_are_retried():
+    retry = backend_session.get_adapter("http://backend:8000").max_retries
+
+    assert retry.is_retry("GET", 503)
+    assert not retry.is_retry("POST", 503)
+    assert not retry.is_retry("POST", 502)
+    # a read timeout may come after the backend did the work, it's never retried
+    assert retry.read is False
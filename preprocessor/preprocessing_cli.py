@@ -1,5 +1,6 @@
 import click
 import logging
+from src.BuildPipeline import BuildPipeline
 from src.MLensDataPreprocessor import MLensDataPreprocessor
 import numpy as np
 import joblib
@@ -12,6 +13,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+working_dir_option = click.option('--working-dir', default='/app/data', envvar='WORKING_DIR', show_default=True,
+                                  help='Directory with the MovieLens files and the outputs, also set by WORKING_DIR')
+data_format_option = click.option('--data-format', default='csv', type=click.Choice(['csv', 'parquet']),
+                                  help='Format of the cleaned movies, parquet also reads movies.parquet and '
+                                       'ratings.parquet inputs when they exist')
+
+
 @click.group()
 def cli():
     """Movie recommendation system data preprocessing CLI"""
@@ -19,26 +27,46 @@ def cli():
 
 
 @cli.command()
-def preprocess():
-    """Preprocess movie and ratings data"""
+@working_dir_option
+@click.option('--chunk-size', default=1_000_000, help='Ratings converted at a time')
+def convert(working_dir, chunk_size):
+    """Convert movies.csv and ratings.csv into typed Parquet files"""
     try:
-        # Create output directory if it doesn't exist
-        working_dir = "/app/data"
+        preprocessor = MLensDataPreprocessor(working_dir=working_dir, data_format="parquet")
+        for path in preprocessor.convert_inputs(chunk_size=chunk_size):
+            logger.info(f"Saved {path}")
+
+    except Exception as e:
+        logger.error(f"Error during conversion: {str(e)}")
+        raise click.Abort()
+
 
+@cli.command()
+@working_dir_option
+@click.option('--chunk-size', default=None, type=int,
+              help='Aggregate ratings in chunks of this many rows to bound memory usage')
+@click.option('--incremental', is_flag=True,
+              help='Only process movies and ratings changed since the last incremental run')
+@data_format_option
+def preprocess(working_dir, chunk_size, incremental, data_format):
+    """Preprocess movie and ratings data"""
+    try:
         logger.info("Starting data preprocessing...")
         logger.info(f"Working directory: {working_dir}")
 
         # Initialize preprocessor
-        preprocessor = MLensDataPreprocessor(working_dir=working_dir)
+        preprocessor = MLensDataPreprocessor(working_dir=working_dir, data_format=data_format)
 
         logger.info("Created preprocessor...")
         # Process data
-        movies_df, genre_matrix = preprocessor.preprocess_data()
-
-        # Save genre matrix
-        np.save(f"{working_dir}/genre_matrix_full.npy", genre_matrix)
-
-        logger.info(f"Successfully processed {len(movies_df)} movies")
+        if incremental:
+            movies_df, genre_matrix, stats = preprocessor.preprocess_incremental(chunk_size=chunk_size or 1_000_000)
+            logger.info(f"Full run: {stats['full']}, new ratings: {stats['new_ratings']}, "
+                        f"processed movies: {stats['processed_movies']}, removed movies: {stats['removed_movies']}")
+        else:
+            movies_df, genre_matrix = preprocessor.preprocess_data(chunk_size=chunk_size)
+
+        logger.info(f"Successfully processed {len(movies_df)} movies with {genre_matrix.shape[1]} genres")
         logger.info(f"Data saved to {working_dir}")
 
     except Exception as e:
@@ -47,14 +75,22 @@ def preprocess():
 
 
 @cli.command()
+@working_dir_option
 @click.option('--pca-components', default=10, help='Number of PCA components')
 @click.option('--kmeans-clusters', default=300, help='Number of KMeans clusters')
-def cluster(pca_components, kmeans_clusters):
+@click.option('--algorithm', default='full', type=click.Choice(['full', 'minibatch']),
+              help='Clustering backend, minibatch supports incremental updates')
+@click.option('--batch-size', default=1024, help='Mini-batch size of the minibatch backend')
+@click.option('--distant-clusters', default=10,
+              help='Most distant clusters ranked for every cluster and stored with the model')
+@data_format_option
+def cluster(working_dir, pca_components, kmeans_clusters, algorithm, batch_size, distant_clusters, data_format):
     """Cluster movies"""
 
-    working_dir = "/app/data"
     try:
-        preprocessor = MLensDataPreprocessor(pca_components, kmeans_clusters, working_dir)
+        preprocessor = MLensDataPreprocessor(pca_components, kmeans_clusters, working_dir,
+                                             algorithm=algorithm, batch_size=batch_size,
+                                             distant_clusters=distant_clusters, data_format=data_format)
         kmeans, stats = preprocessor.cluster_movies()
 
         logger.info("Successfully clustered movies")
@@ -67,10 +103,124 @@ def cluster(pca_components, kmeans_clusters):
         with open(f"{working_dir}/kmeans.pkl", "wb") as f:
             joblib.dump(kmeans, f)
 
+        # Save what the update command needs to fold in new movies
+        movie_ids = preprocessor.read_cleaned_movies(columns=["movieId"])["movieId"]
+        preprocessor.save_clustering_state(preprocessor.pca, preprocessor.load_genre_vocabulary(), movie_ids)
+
     except Exception as e:
         logger.error(f"Error during clustering: {str(e)}")
         raise click.Abort()
 
 
+@cli.command()
+@working_dir_option
+@data_format_option
+def update(working_dir, data_format):
+    """Fold movies added since the last clustering into the existing clusters"""
+
+    try:
+        preprocessor = MLensDataPreprocessor(working_dir=working_dir, data_format=data_format)
+        kmeans = joblib.load(f"{working_dir}/kmeans.pkl")
+        pca, clustered_vocabulary, clustered_movie_ids = preprocessor.load_clustering_state()
+
+        movie_ids = preprocessor.read_cleaned_movies(columns=["movieId"])["movieId"].to_numpy()
+        new_rows = np.flatnonzero(~np.isin(movie_ids, clustered_movie_ids))
+
+        kmeans = preprocessor.update_clusters(kmeans, pca, clustered_vocabulary, new_rows)
+        logger.info(f"Folded {len(new_rows)} new movies into {kmeans.cluster_centers_.shape[0]} clusters")
+
+        with open(f"{working_dir}/kmeans.pkl", "wb") as f:
+            joblib.dump(kmeans, f)
+        # the PCA input keeps the genres it was fitted on
+        preprocessor.save_clustering_state(pca, clustered_vocabulary, movie_ids)
+
+    except Exception as e:
+        logger.error(f"Error during cluster update: {str(e)}")
+        raise click.Abort()
+
+
+@cli.command()
+@working_dir_option
+@click.option('--pca-components', default=10, help='Number of PCA components')
+@click.option('--k-min', default=15, help='Smallest number of KMeans clusters')
+@click.option('--k-max', default=620, help='Largest number of KMeans clusters')
+@click.option('--k-step', default=5, help='Step between numbers of KMeans clusters')
+@click.option('--n-jobs', default=None, type=int, help='Number of worker processes, defaults to the number of CPUs')
+@click.option('--silhouette-sample-size', default=10000, help='Movies sampled to estimate the silhouette score')
+@click.option('--output', default='metrics_clustering.csv', help='Metrics file name, existing results are resumed')
+def scan(working_dir, pca_components, k_min, k_max, k_step, n_jobs, silhouette_sample_size, output):
+    """Scan numbers of clusters for inertia and silhouette score"""
+
+    try:
+        preprocessor = MLensDataPreprocessor(pca_components, working_dir=working_dir)
+        metrics = preprocessor.scan_clusters(range(k_min, k_max + 1, k_step), n_jobs=n_jobs,
+                                             silhouette_sample_size=silhouette_sample_size,
+                                             metrics_name=output)
+
+        logger.info(f"Scanned {len(metrics)} cluster counts, metrics saved to {working_dir}/{output}")
+
+    except Exception as e:
+        logger.error(f"Error during cluster scan: {str(e)}")
+        raise click.Abort()
+
+
+@cli.command()
+@working_dir_option
+@click.option('--model-file', default='kmeans.pkl', help='Fitted clustering model inside the working directory')
+@click.option('--output', default='catalog.bundle', help='Serving bundle file name inside the working directory')
+@data_format_option
+def export(working_dir, model_file, output, data_format):
+    """Export cleaned movies and clusters as a memory-mappable serving bundle"""
+
+    try:
+        preprocessor = MLensDataPreprocessor(working_dir=working_dir, data_format=data_format)
+        kmeans = joblib.load(f"{working_dir}/{model_file}")
+        bundle_path = preprocessor.export_serving_bundle(kmeans, output)
+
+        logger.info(f"Serving bundle saved to {bundle_path}")
+
+    except Exception as e:
+        logger.error(f"Error during export: {str(e)}")
+        raise click.Abort()
+
+
+@cli.command()
+@working_dir_option
+@click.option('--cache-dir', default=None, help='Stage cache directory, defaults to .build_cache in the working directory')
+@click.option('--chunk-size', default=None, type=int,
+              help='Aggregate ratings in chunks of this many rows to bound memory usage')
+@click.option('--pca-components', default=10, help='Number of PCA components')
+@click.option('--kmeans-clusters', default=300, help='Number of KMeans clusters')
+@click.option('--algorithm', default='full', type=click.Choice(['full', 'minibatch']),
+              help='Clustering backend, minibatch supports incremental updates')
+@click.option('--batch-size', default=1024, help='Mini-batch size of the minibatch backend')
+@click.option('--distant-clusters', default=10,
+              help='Most distant clusters ranked for every cluster and stored with the model')
+@data_format_option
+@click.option('--dataset-name', default='clustered_dataset', help='Cleaned movies file name, without extension')
+@click.option('--model-file', default='movies_kmeans.pkl', help='Clustering model file name')
+@click.option('--bundle-file', default='catalog.bundle', help='Serving bundle file name')
+def build(working_dir, cache_dir, chunk_size, pca_components, kmeans_clusters, algorithm, batch_size, distant_clusters,
+          data_format, dataset_name, model_file, bundle_file):
+    """Preprocess, cluster and export the serving files in one run, reusing cached stages"""
+
+    try:
+        preprocessor = MLensDataPreprocessor(pca_components, kmeans_clusters, working_dir,
+                                             algorithm=algorithm, batch_size=batch_size,
+                                             distant_clusters=distant_clusters, data_format=data_format)
+        pipeline = BuildPipeline(preprocessor, cache_dir=cache_dir, chunk_size=chunk_size, dataset_name=dataset_name,
+                                 model_name=model_file, bundle_name=bundle_file)
+        stats = pipeline.run()
+
+        cached = [stage for stage, stage_stats in stats.items() if isinstance(stage_stats, dict) and stage_stats.get("cached")]
+        logger.info(f"Build finished, cached stages: {', '.join(cached) or 'none'}")
+        for path in stats["outputs"]:
+            logger.info(f"Saved {path}")
+
+    except Exception as e:
+        logger.error(f"Error during build: {str(e)}")
+        raise click.Abort()
+
+
 if __name__ == '__main__':
     cli()
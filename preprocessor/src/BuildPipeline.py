@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+
+from src import MLensDataPreprocessor as preprocessor_module
+
+logger = logging.getLogger(__name__)
+
+
+class BuildPipeline:
+    """
+    Build the serving artifacts from the MovieLens files in one process.
+
+    Runs preprocessing, PCA, clustering and the export of the serving files
+    back to back, handing data over in memory. The output of every stage is
+    also cached in a directory named after a hash of everything it depends on:
+    the content of the input files or the key of the previous stage, the
+    stage parameters, the preprocessing code and the library versions. A
+    rebuild reuses every stage whose key did not change, so changing only the
+    number of clusters reruns only the clustering and the export.
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, preprocessor, cache_dir=None, chunk_size=None, dataset_name="clustered_dataset",
+                 model_name="movies_kmeans.pkl", bundle_name="catalog.bundle"):
+        """
+        Args:
+            preprocessor (MLensDataPreprocessor): Preprocessor holding the working
+                directory, data format and PCA and clustering parameters
+            cache_dir (str, optional): Directory of the stage cache. Defaults to
+                ``.build_cache`` inside the working directory.
+            chunk_size (int, optional): Aggregate ratings in chunks of this many rows.
+                Defaults to None, loading the whole ratings file.
+            dataset_name (str, optional): File name of the cleaned movies written for
+                the recommender, without extension. Defaults to "clustered_dataset".
+            model_name (str, optional): File name of the written clustering model.
+                Defaults to "movies_kmeans.pkl".
+            bundle_name (str, optional): File name of the written serving bundle.
+                Defaults to "catalog.bundle".
+        """
+        self.preprocessor = preprocessor
+        self.cache_dir = cache_dir or os.path.join(preprocessor.working_dir, ".build_cache")
+        self.chunk_size = chunk_size
+        self.dataset_name = dataset_name
+        self.model_name = model_name
+        self.bundle_name = bundle_name
+
+    @staticmethod
+    def file_digest(path):
+        """
+        Returns:
+            str: SHA-256 hex digest of a file's content
+        """
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+    def stage_key(self, stage, inputs, params):
+        """
+        Hash everything a stage's output depends on.
+
+        Args:
+            stage (str): Stage name
+            inputs (dict): Digests of input files or keys of previous stages
+            params (dict): Stage parameters
+
+        Returns:
+            str: SHA-256 hex digest
+        """
+        description = {
+            "stage": stage,
+            "cache_version": self.CACHE_VERSION,
+            "code": self.file_digest(preprocessor_module.__file__),
+            "versions": {"numpy": np.__version__, "scikit-learn": sklearn.__version__},
+            "inputs": inputs,
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def stage_dir(self, stage, key):
+        return os.path.join(self.cache_dir, f"{stage}-{key[:16]}")
+
+    def _run_stage(self, stage, key, compute, save, load):
+        """
+        Load a stage's output from the cache, or compute and cache it.
+
+        The output is written to a temporary directory renamed into place at the
+        end, so an interrupted build never leaves a partial cache entry behind.
+
+        Returns:
+            tuple: The stage output and the stage statistics
+        """
+        start = time.perf_counter()
+        directory = self.stage_dir(stage, key)
+        if os.path.isdir(directory):
+            output = load(directory)
+            cached = True
+        else:
+            output = compute()
+            temporary = f"{directory}.tmp-{os.getpid()}"
+            shutil.rmtree(temporary, ignore_errors=True)
+            os.makedirs(temporary)
+            save(temporary, output)
+            try:
+                os.rename(temporary, directory)
+            except OSError:
+                # another build cached the same key meanwhile
+                shutil.rmtree(temporary, ignore_errors=True)
+            cached = False
+
+        stats = {"key": key, "cached": cached, "seconds": time.perf_counter() - start}
+        logger.info(f"Stage {stage}: {'cached' if cached else 'computed'} in {stats['seconds']:.2f}s ({key[:16]})")
+        return output, stats
+
+    def _preprocess_stage(self):
+        preprocessor = self.preprocessor
+        inputs = {name: self.file_digest(preprocessor.input_path(name)) for name in ("movies", "ratings")}
+        key = self.stage_key("preprocess", inputs, {"data_format": preprocessor.data_format})
+
+        def save(directory, output):
+            cleaned_movies, genre_matrix, genre_vocabulary = output
+            # pickled rather than written as CSV, whose float parsing doesn't round trip exactly,
+            # so a cached build writes the same bytes as a fresh one
+            cleaned_movies.to_pickle(os.path.join(directory, "cleaned_movies.pkl"))
+            sparse.save_npz(os.path.join(directory, "genre_matrix.npz"), genre_matrix)
+            with open(os.path.join(directory, "genre_vocabulary.json"), "w") as f:
+                json.dump(genre_vocabulary, f)
+
+        def load(directory):
+            cleaned_movies = pd.read_pickle(os.path.join(directory, "cleaned_movies.pkl"))
+            with open(os.path.join(directory, "genre_vocabulary.json")) as f:
+                genre_vocabulary = json.load(f)
+            return cleaned_movies, sparse.load_npz(os.path.join(directory, "genre_matrix.npz")), genre_vocabulary
+
+        return self._run_stage("preprocess", key, lambda: preprocessor.clean_inputs(self.chunk_size), save, load)
+
+    def _pca_stage(self, preprocess_key, genre_matrix):
+        preprocessor = self.preprocessor
+        key = self.stage_key("pca", {"preprocess": preprocess_key}, {"pca_components": preprocessor.pca_components})
+
+        def compute():
+            data, _ = preprocessor.project_genre_matrix(genre_matrix)
+            return data, preprocessor.pca
+
+        def save(directory, output):
+            data, pca = output
+            np.save(os.path.join(directory, "projected.npy"), data)
+            joblib.dump(pca, os.path.join(directory, "pca.pkl"))
+
+        def load(directory):
+            return np.load(os.path.join(directory, "projected.npy")), joblib.load(os.path.join(directory, "pca.pkl"))
+
+        return self._run_stage("pca", key, compute, save, load)
+
+    def _cluster_stage(self, pca_key, data):
+        preprocessor = self.preprocessor
+        params = {"kmeans_clusters": preprocessor.kmeans_clusters, "algorithm": preprocessor.algorithm,
+                  "batch_size": preprocessor.batch_size, "distant_clusters": preprocessor.distant_clusters}
+        key = self.stage_key("cluster", {"pca": pca_key}, params)
+
+        def save(directory, kmeans):
+            joblib.dump(kmeans, os.path.join(directory, "kmeans.pkl"))
+
+        def load(directory):
+            return joblib.load(os.path.join(directory, "kmeans.pkl"))
+
+        return self._run_stage("cluster", key, lambda: preprocessor.fit_clusters(data), save, load)
+
+    def run(self):
+        """
+        Build the serving artifacts, reusing cached stages.
+
+        Writes the cleaned movies, the clustering model and the serving bundle
+        under the names the recommender expects, plus the files the ``update``
+        command needs (see ``save_clustering_state``), into the working directory.
+
+        Returns:
+            dict: Statistics of every stage (key, whether it was cached, seconds)
+                and the paths of the written files
+        """
+        stats = {}
+        (cleaned_movies, genre_matrix, genre_vocabulary), stats["preprocess"] = self._preprocess_stage()
+        (data, pca), stats["pca"] = self._pca_stage(stats["preprocess"]["key"], genre_matrix)
+        kmeans, stats["cluster"] = self._cluster_stage(stats["pca"]["key"], data)
+
+        start = time.perf_counter()
+        preprocessor = self.preprocessor
+        working_dir = preprocessor.working_dir
+        dataset_path = os.path.join(working_dir, f"{self.dataset_name}.{preprocessor.data_format}")
+        model_path = os.path.join(working_dir, self.model_name)
+        preprocessor.write_cleaned_movies(cleaned_movies, dataset_path)
+        joblib.dump(kmeans, model_path)
+        preprocessor.save_clustering_state(pca, genre_vocabulary, cleaned_movies["movieId"].to_numpy())
+        bundle_path = preprocessor.export_serving_bundle(kmeans, self.bundle_name, movies_df=cleaned_movies)
+        stats["export"] = {"seconds": time.perf_counter() - start}
+        logger.info(f"Stage export: written in {stats['export']['seconds']:.2f}s")
+
+        stats["outputs"] = [dataset_path, model_path, bundle_path]
+        return stats
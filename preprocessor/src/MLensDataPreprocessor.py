@@ -1,11 +1,58 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import joblib
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from src.ServingBundle import ServingBundle
+
+logger = logging.getLogger(__name__)
+
+# text before the first "(" and, if any, between the last "(" and the last ")" after it
+_TITLE_PATTERN = re.compile(r"(?s)^([^(]*)(?:.*\(([^(]*)\)[^()]*$)?")
+
+# PCA projection shared by the processes of a cluster scan
+_scan_data = None
+
+
+def _init_scan_worker(data):
+    global _scan_data
+    _scan_data = data
+
+
+def _fit_and_score(n_clusters, silhouette_sample_size):
+    """
+    Fit KMeans on the shared projection and return its inertia and silhouette score.
+    """
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+    labels = kmeans.fit_predict(_scan_data)
+    sample_size = silhouette_sample_size
+    if sample_size is not None and sample_size >= _scan_data.shape[0]:
+        sample_size = None
+    silhouette = silhouette_score(_scan_data, labels, sample_size=sample_size, random_state=42)
+    return n_clusters, float(kmeans.inertia_), float(silhouette)
 
 
 class MLensDataPreprocessor:
-    def __init__(self, pca_components=10, kmeans_clusters=300, working_dir="data"):
+    MANIFEST_NAME = "preprocess_manifest.json"
+    STATE_NAME = "preprocess_state.npz"
+    MANIFEST_VERSION = 1
+    FINGERPRINT_WINDOW = 1 << 16
+    # column types of the Parquet files, as pyarrow type aliases
+    MOVIES_SCHEMA = {"movieId": "int32", "title": "string", "genres": "string"}
+    RATINGS_SCHEMA = {"userId": "int32", "movieId": "int32", "rating": "float32", "timestamp": "int64"}
+    CLEANED_MOVIES_SCHEMA = {"movieId": "int32", "title": "string", "genres": "string", "rating": "float64",
+                             "standardized_title": "string", "year": "int32"}
+
+    def __init__(self, pca_components=10, kmeans_clusters=300, working_dir="data",
+                 algorithm="full", batch_size=1024, distant_clusters=10, data_format="csv"):
         """
         Initialize the MLensDataPreprocessor.
 
@@ -16,10 +63,128 @@ class MLensDataPreprocessor:
                 Defaults to 300.
             working_dir (str, optional): Directory containing the data files.
                 Defaults to "data".
+            algorithm (str, optional): Clustering backend, "full" for KMeans or
+                "minibatch" for MiniBatchKMeans. Defaults to "full".
+            batch_size (int, optional): Mini-batch size of the "minibatch" backend.
+                Defaults to 1024.
+            distant_clusters (int, optional): Length of the ranked list of most
+                distant clusters stored with the model for every cluster. Defaults to 10.
+            data_format (str, optional): "csv", or "parquet" to write the cleaned
+                movies as typed Parquet and read the MovieLens inputs from
+                ``movies.parquet`` and ``ratings.parquet`` when they exist. Parquet
+                needs pyarrow. Defaults to "csv".
         """
+        if algorithm not in ("full", "minibatch"):
+            raise ValueError(f"Unknown clustering algorithm: {algorithm}")
+        if data_format not in ("csv", "parquet"):
+            raise ValueError(f"Unknown data format: {data_format}")
+
         self.pca_components = pca_components
         self.kmeans_clusters = kmeans_clusters
         self.working_dir = working_dir
+        self.algorithm = algorithm
+        self.batch_size = batch_size
+        self.distant_clusters = distant_clusters
+        self.data_format = data_format
+        self.pca = None
+
+    @property
+    def cleaned_movies_path(self):
+        return f"{self.working_dir}/cleaned_movies.{self.data_format}"
+
+    def input_path(self, name):
+        """
+        Path of a MovieLens input file.
+
+        Args:
+            name (str): Input name without extension, "movies" or "ratings"
+
+        Returns:
+            str: The Parquet file if the data format is "parquet" and it exists, the CSV file otherwise
+        """
+        parquet_path = f"{self.working_dir}/{name}.parquet"
+        if self.data_format == "parquet" and os.path.exists(parquet_path):
+            return parquet_path
+        return f"{self.working_dir}/{name}.csv"
+
+    @staticmethod
+    def read_table(path, columns=None):
+        """
+        Read a CSV or Parquet file, depending on its extension.
+
+        Args:
+            path (str): File path
+            columns (list, optional): Only read these columns. Defaults to all.
+
+        Returns:
+            pd.DataFrame: File content
+        """
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path, columns=columns)
+        return pd.read_csv(path, usecols=columns)
+
+    @staticmethod
+    def _arrow_schema(schema):
+        import pyarrow as pa
+
+        return pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in schema.items()])
+
+    @classmethod
+    def write_parquet(cls, df, path, schema):
+        """
+        Write a DataFrame as Parquet with explicit column types.
+
+        Args:
+            df (pd.DataFrame): Data with at least the schema's columns
+            path (str): Output file path
+            schema (dict): Column name -> pyarrow type alias, in file column order
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df[list(schema)], schema=cls._arrow_schema(schema), preserve_index=False)
+        pq.write_table(table, path, compression="zstd")
+
+    def read_cleaned_movies(self, columns=None):
+        """
+        Read the cleaned movies written by the preprocessing in the configured data format.
+
+        Args:
+            columns (list, optional): Only read these columns. Defaults to all.
+
+        Returns:
+            pd.DataFrame: Cleaned movies
+        """
+        return self.read_table(self.cleaned_movies_path, columns)
+
+    def convert_inputs(self, chunk_size=1_000_000):
+        """
+        Convert ``movies.csv`` and ``ratings.csv`` into typed Parquet files.
+
+        Ratings are converted in chunks, so memory stays bounded.
+
+        Args:
+            chunk_size (int, optional): Number of ratings converted at once.
+                Defaults to 1,000,000.
+
+        Returns:
+            list: Paths of the written files
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        movies_path = f"{self.working_dir}/movies.parquet"
+        self.write_parquet(pd.read_csv(f"{self.working_dir}/movies.csv"), movies_path, self.MOVIES_SCHEMA)
+
+        ratings_path = f"{self.working_dir}/ratings.parquet"
+        schema = self._arrow_schema(self.RATINGS_SCHEMA)
+        chunks = pd.read_csv(f"{self.working_dir}/ratings.csv", usecols=list(self.RATINGS_SCHEMA),
+                             dtype=self.RATINGS_SCHEMA, chunksize=chunk_size)
+        with pq.ParquetWriter(ratings_path, schema, compression="zstd") as writer:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(chunk[list(self.RATINGS_SCHEMA)], schema=schema,
+                                                        preserve_index=False))
+        return [movies_path, ratings_path]
 
     def standardize_title_and_year(self, title):
         """
@@ -54,29 +219,183 @@ class MLensDataPreprocessor:
 
         return clean_title.strip(), year
 
-    def clean_movie_data(self, movies_df, ratings_df):
+    def standardize_titles(self, titles):
+        """
+        Standardize a whole column of movie titles and extract their years.
+
+        Produces the same titles and years as applying ``standardize_title_and_year``
+        to every title, but in a single pass over the column: one precompiled
+        regex finds the text before the first "(" and the year between the last
+        "(" and ")", and both output columns are built directly instead of being
+        unpacked from tuples.
+
+        Args:
+            titles (pd.Series): Movie titles in various formats
+
+        Returns:
+            tuple: A tuple containing:
+                - pd.Series: Standardized titles
+                - pd.Series: float64 years, NaN where the title has no year
+        """
+        standardized_titles = []
+        years = []
+        match_title = _TITLE_PATTERN.match
+        for title in titles.tolist():
+            year = np.nan
+            clean_title = title
+            if '(' in title and ')' in title:
+                match = match_title(title)
+                clean_title = match[1].strip()
+                if match[2] is not None and match[2].isdigit():
+                    year = int(match[2])
+
+            # ", an" also contains ", a", so such titles get "A " like in standardize_title_and_year
+            lower_title = clean_title.lower()
+            if ', the' in lower_title:
+                clean_title = 'The ' + clean_title.split(',', 1)[0]
+            elif ', a' in lower_title:
+                clean_title = 'A ' + clean_title.split(',', 1)[0]
+
+            standardized_titles.append(clean_title.strip())
+            years.append(year)
+
+        return (pd.Series(standardized_titles, index=titles.index),
+                pd.Series(years, index=titles.index, dtype=np.float64))
+
+    def average_ratings(self, ratings_df):
+        """
+        Calculate the average rating of every rated movie.
+
+        Args:
+            ratings_df (pd.DataFrame): DataFrame containing at least the movieId and rating columns
+
+        Returns:
+            pd.DataFrame: movieId and average rating, sorted by movieId
+        """
+        # Parquet ratings are float32, average them in double precision like the CSV ones
+        ratings_df = ratings_df[['movieId', 'rating']].astype({'rating': np.float64})
+        return ratings_df.groupby('movieId')['rating'].mean().reset_index()
+
+    def stream_average_ratings(self, ratings_path, chunk_size=1_000_000):
+        """
+        Calculate the average rating of every rated movie with bounded memory.
+
+        Reads only the movieId and rating columns in chunks with compact dtypes
+        and keeps running per-movie sums and counts, indexed by movieId.
+
+        Args:
+            ratings_path (str): Path to ratings.csv or ratings.parquet
+            chunk_size (int, optional): Number of ratings read at once.
+                Defaults to 1,000,000.
+
+        Returns:
+            pd.DataFrame: movieId and average rating, sorted by movieId, the same
+                as ``average_ratings`` on the whole file
+        """
+        rating_sums, rating_counts = self.accumulate_ratings(
+            self.read_ratings(ratings_path, chunk_size=chunk_size),
+            np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.int64))
+        return self.ratings_from_sums(rating_sums, rating_counts)
+
+    def read_ratings(self, ratings_path, offset=0, chunk_size=1_000_000):
+        """
+        Read the movieId and rating columns of a ratings file in chunks.
+
+        Args:
+            ratings_path (str): Path to ratings.csv or ratings.parquet
+            offset (int, optional): Byte offset of the first rating to read, must
+                be at the start of a line. 0 reads the whole file. Only supported
+                for CSV files. Defaults to 0.
+            chunk_size (int, optional): Number of ratings read at once.
+                Defaults to 1,000,000.
+
+        Yields:
+            pd.DataFrame: Chunks with int32 movieId and float32 rating columns
+        """
+        if ratings_path.endswith(".parquet"):
+            if offset:
+                raise ValueError("Reading ratings from an offset needs a CSV file")
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(ratings_path).iter_batches(batch_size=chunk_size, columns=['movieId', 'rating']):
+                yield batch.to_pandas()
+            return
+
+        with open(ratings_path, "rb") as f:
+            columns = f.readline().decode("utf-8").strip().split(",")
+            if offset > f.tell():
+                f.seek(offset)
+            if not f.peek(1):
+                return
+            yield from pd.read_csv(f, names=columns, header=None, usecols=['movieId', 'rating'],
+                                   dtype={'movieId': np.int32, 'rating': np.float32},
+                                   chunksize=chunk_size)
+
+    def accumulate_ratings(self, chunks, rating_sums, rating_counts):
+        """
+        Add ratings to running per-movie sums and counts, indexed by movieId.
+
+        Args:
+            chunks (iterable): DataFrames with movieId and rating columns
+            rating_sums (np.ndarray): float64 running sum of ratings per movieId
+            rating_counts (np.ndarray): int64 running number of ratings per movieId
+
+        Returns:
+            tuple: Updated rating sums and counts, grown to the largest movieId seen
+        """
+        for chunk in chunks:
+            movie_ids = chunk['movieId'].to_numpy()
+            chunk_sums = np.bincount(movie_ids, weights=chunk['rating'].to_numpy(dtype=np.float64),
+                                     minlength=len(rating_sums))
+            chunk_counts = np.bincount(movie_ids, minlength=len(rating_counts))
+            if len(chunk_sums) > len(rating_sums):
+                rating_sums = np.pad(rating_sums, (0, len(chunk_sums) - len(rating_sums)))
+                rating_counts = np.pad(rating_counts, (0, len(chunk_counts) - len(rating_counts)))
+            rating_sums += chunk_sums
+            rating_counts += chunk_counts
+        return rating_sums, rating_counts
+
+    def ratings_from_sums(self, rating_sums, rating_counts):
+        """
+        Turn per-movie rating sums and counts into average ratings.
+
+        Args:
+            rating_sums (np.ndarray): Sum of ratings per movieId
+            rating_counts (np.ndarray): Number of ratings per movieId
+
+        Returns:
+            pd.DataFrame: movieId and average rating of every rated movie, sorted by movieId
+        """
+        rated_movies = np.flatnonzero(rating_counts)
+        return pd.DataFrame({
+            'movieId': rated_movies.astype(np.int64),
+            'rating': rating_sums[rated_movies] / rating_counts[rated_movies]
+        })
+
+    def clean_movie_data(self, movies_df, ratings_df=None, avg_ratings=None):
         """
         Clean and preprocess movie and ratings data.
 
         Args:
             movies_df (pd.DataFrame): DataFrame containing movie information
-            ratings_df (pd.DataFrame): DataFrame containing rating information
+            ratings_df (pd.DataFrame, optional): DataFrame containing rating information.
+                Only used if ``avg_ratings`` is not given.
+            avg_ratings (pd.DataFrame, optional): Precomputed average rating per movie,
+                as returned by ``average_ratings`` or ``stream_average_ratings``
 
         Returns:
             pd.DataFrame: Cleaned and preprocessed movie data with standardized titles,
                 years, and average ratings
         """
         # Calculate average rating per movie and filter out movies with no ratings
-        ratings_df = ratings_df.drop(['timestamp', 'userId'], axis=1)
-        avg_ratings = ratings_df.groupby('movieId')['rating'].mean().reset_index()
+        if avg_ratings is None:
+            avg_ratings = self.average_ratings(ratings_df)
         movies_df = movies_df[movies_df["movieId"].isin(avg_ratings["movieId"])]
         movies_df.reset_index(drop=True, inplace=True)
-        movies_df["rating"] = avg_ratings["rating"]
+        movies_df["rating"] = movies_df["movieId"].map(avg_ratings.set_index("movieId")["rating"])
 
         # Apply title standardization
-        standardized_data = movies_df['title'].apply(self.standardize_title_and_year)
-        movies_df['standardized_title'] = standardized_data.apply(lambda x: x[0])
-        movies_df['year'] = standardized_data.apply(lambda x: x[1])
+        movies_df['standardized_title'], movies_df['year'] = self.standardize_titles(movies_df['title'])
 
         # Filter out movies with no genres or no year
         movies_df = movies_df[~movies_df["movieId"].isin(
@@ -103,8 +422,8 @@ class MLensDataPreprocessor:
             250664: "Blooper Bunny!"
         }
 
-        for movie_id, title in special_cases.items():
-            movies_df.loc[movies_df['movieId'] == movie_id, 'standardized_title'] = title
+        special = movies_df['movieId'].isin(special_cases.keys())
+        movies_df.loc[special, 'standardized_title'] = movies_df.loc[special, 'movieId'].map(special_cases)
 
         # Remove remaining entries with NaN standardized titles
         movies_df = movies_df[~movies_df["standardized_title"].isna()]
@@ -115,71 +434,656 @@ class MLensDataPreprocessor:
         """
         Create a one-hot encoding matrix for movie genres.
 
+        Genres are mapped to columns through a sorted vocabulary, so the column
+        order is the same on every run.
+
         Args:
             movies_df (pd.DataFrame): DataFrame containing movie information with genres
 
         Returns:
-            np.ndarray: Binary matrix where each row represents a movie and each column
-                represents a genre (1 if movie has the genre, 0 otherwise)
+            tuple: A tuple containing:
+                - scipy.sparse.csr_matrix: Binary uint8 matrix where each row represents
+                  a movie and each column represents a genre (1 if movie has the genre)
+                - list: Genre vocabulary, the genre of each matrix column
         """
-        genres_list = movies_df["genres"].str.split("|")
-        num_movies = movies_df.shape[0]
+        genres = movies_df["genres"].reset_index(drop=True).str.split("|").explode()
+        rows = genres.index.to_numpy()
+        vocabulary, columns = np.unique(genres.to_numpy(dtype=str), return_inverse=True)
 
-        unique_genres = set([genre for genres in genres_list for genre in genres])
-        genre_matrix = np.zeros((num_movies, len(unique_genres)))
+        genre_matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.uint8), (rows, columns.ravel())),
+            shape=(movies_df.shape[0], len(vocabulary)),
+        )
+        # a genre listed twice for the same movie is still a single 1
+        genre_matrix.data[:] = 1
 
-        for i, genres in enumerate(genres_list):
-            for genre in genres:
-                genre_matrix[i, list(unique_genres).index(genre)] = 1
+        return genre_matrix, vocabulary.tolist()
 
-        return genre_matrix
-
-    def preprocess_data(self):
+    def preprocess_data(self, chunk_size=None):
         """
         Main preprocessing pipeline for movie and ratings data.
 
+        Args:
+            chunk_size (int, optional): If given, ratings are aggregated in chunks
+                of this many rows instead of loading the whole ratings file.
+                Defaults to None.
+
+        Returns:
+            tuple: A tuple containing:
+                - pd.DataFrame: Cleaned and preprocessed movie data
+                - scipy.sparse.csr_matrix: Genre one-hot encoding matrix
+        """
+        # a full run makes the incremental state stale
+        if os.path.exists(f"{self.working_dir}/{self.MANIFEST_NAME}"):
+            os.remove(f"{self.working_dir}/{self.MANIFEST_NAME}")
+
+        cleaned_movies, genre_matrix, genre_vocabulary = self.clean_inputs(chunk_size)
+        self.save_preprocessed(cleaned_movies, genre_matrix, genre_vocabulary)
+
+        return cleaned_movies, genre_matrix
+
+    def clean_inputs(self, chunk_size=None):
+        """
+        Clean the MovieLens inputs of the working directory without writing anything.
+
+        Args:
+            chunk_size (int, optional): If given, ratings are aggregated in chunks
+                of this many rows instead of loading the whole ratings file.
+                Defaults to None.
+
         Returns:
             tuple: A tuple containing:
                 - pd.DataFrame: Cleaned and preprocessed movie data
-                - np.ndarray: Genre one-hot encoding matrix
+                - scipy.sparse.csr_matrix: Genre one-hot encoding matrix
+                - list: Genre vocabulary, the genre of each matrix column
         """
         # Load data
-        movies_df = pd.read_csv(f"{self.working_dir}/movies.csv")
-        ratings_df = pd.read_csv(f"{self.working_dir}/ratings.csv")
+        movies_df = self.read_table(self.input_path("movies"))
+        ratings_path = self.input_path("ratings")
+        if chunk_size:
+            avg_ratings = self.stream_average_ratings(ratings_path, chunk_size)
+        else:
+            avg_ratings = self.average_ratings(self.read_table(ratings_path, columns=['movieId', 'rating']))
 
         # Clean data
-        cleaned_movies = self.clean_movie_data(movies_df, ratings_df)
-        genre_matrix = self.create_genre_matrix(cleaned_movies)
+        cleaned_movies = self.clean_movie_data(movies_df, avg_ratings=avg_ratings)
+        genre_matrix, genre_vocabulary = self.create_genre_matrix(cleaned_movies)
+        return cleaned_movies, genre_matrix, genre_vocabulary
 
-        cleaned_movies.to_csv(f"{self.working_dir}/cleaned_movies.csv", index=False)
-        np.save(f"{self.working_dir}/genre_matrix.npy", genre_matrix)
+    def write_cleaned_movies(self, cleaned_movies, path=None):
+        """
+        Write cleaned movies in the configured data format.
 
-        return cleaned_movies, genre_matrix
+        Args:
+            cleaned_movies (pd.DataFrame): Cleaned movies
+            path (str, optional): Output file path. Defaults to ``cleaned_movies_path``.
+        """
+        path = path or self.cleaned_movies_path
+        if self.data_format == "parquet":
+            self.write_parquet(cleaned_movies, path, self.CLEANED_MOVIES_SCHEMA)
+        else:
+            cleaned_movies.to_csv(path, index=False)
 
-    def cluster_movies(self):
+    def save_preprocessed(self, cleaned_movies, genre_matrix, genre_vocabulary):
         """
-        Perform dimensionality reduction and clustering on movie data.
+        Write the cleaned movies, genre matrix and genre vocabulary to the working directory.
+        """
+        self.write_cleaned_movies(cleaned_movies)
+        sparse.save_npz(f"{self.working_dir}/genre_matrix.npz", genre_matrix)
+        with open(f"{self.working_dir}/genre_vocabulary.json", "w") as f:
+            json.dump(genre_vocabulary, f)
+
+    @staticmethod
+    def movie_hashes(movies_df):
+        """
+        Hash the movieId, title and genres of every movie.
+
+        Returns:
+            np.ndarray: uint64 content hash per row
+        """
+        return pd.util.hash_pandas_object(movies_df[["movieId", "title", "genres"]], index=False).to_numpy()
+
+    @classmethod
+    def ratings_fingerprint(cls, ratings_path, offset):
+        """
+        Fingerprint the first ``offset`` bytes of a ratings file.
+
+        Only the start of the file and the bytes right before ``offset`` are
+        hashed, which is enough to tell an append from a replaced file without
+        reading everything again.
+
+        Args:
+            ratings_path (str): Path to ratings.csv
+            offset (int): Number of bytes already aggregated
+
+        Returns:
+            dict: Offset and SHA-256 of the head and tail windows
+        """
+        window = cls.FINGERPRINT_WINDOW
+        with open(ratings_path, "rb") as f:
+            head = f.read(min(window, offset))
+            f.seek(max(offset - window, 0))
+            tail = f.read(min(window, offset))
+        return {"offset": offset,
+                "head_sha256": hashlib.sha256(head).hexdigest(),
+                "tail_sha256": hashlib.sha256(tail).hexdigest()}
+
+    def load_incremental_state(self):
+        """
+        Load the state saved by the last incremental run, if it can be reused.
+
+        The state is only reused if the manifest, the state file it points to
+        and all preprocessing outputs exist, the state file content matches the
+        manifest hash and ratings.csv still starts with the bytes aggregated last
+        time.
+
+        Returns:
+            tuple or None: The manifest and the state arrays, None if a full run is needed
+        """
+        manifest_path = f"{self.working_dir}/{self.MANIFEST_NAME}"
+        state_path = f"{self.working_dir}/{self.STATE_NAME}"
+        outputs = [os.path.basename(self.cleaned_movies_path), "genre_matrix.npz", "genre_vocabulary.json"]
+        if not all(os.path.exists(f"{self.working_dir}/{name}") for name in [self.MANIFEST_NAME, self.STATE_NAME] + outputs):
+            return None
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != self.MANIFEST_VERSION:
+            return None
+        with open(state_path, "rb") as f:
+            if hashlib.sha256(f.read()).hexdigest() != manifest["state_sha256"]:
+                return None
+
+        ratings_path = f"{self.working_dir}/ratings.csv"
+        offset = manifest["ratings"]["offset"]
+        if offset is None or os.path.getsize(ratings_path) < offset:
+            return None
+        if self.ratings_fingerprint(ratings_path, offset) != manifest["ratings"]:
+            return None
+
+        with np.load(state_path) as state:
+            return manifest, {name: state[name] for name in state.files}
+
+    def save_incremental_state(self, ratings_offset, rating_sums, rating_counts, movies_df):
+        """
+        Save the running rating sums, movie hashes and manifest for the next incremental run.
+
+        The state file is written before the manifest which holds its hash, so
+        an interrupted save leads to a full run instead of a wrong merge.
+
+        Args:
+            ratings_offset (int): Number of bytes of ratings.csv aggregated in the sums
+            rating_sums (np.ndarray): Sum of ratings per movieId
+            rating_counts (np.ndarray): Number of ratings per movieId
+            movies_df (pd.DataFrame): The movies.csv content the outputs were built from
+        """
+        ratings_path = f"{self.working_dir}/ratings.csv"
+        state_path = f"{self.working_dir}/{self.STATE_NAME}"
+        manifest_path = f"{self.working_dir}/{self.MANIFEST_NAME}"
+
+        with open(f"{state_path}.tmp", "wb") as f:
+            np.savez(f, rating_sums=rating_sums, rating_counts=rating_counts,
+                     movie_ids=movies_df["movieId"].to_numpy(dtype=np.int64),
+                     movie_hashes=self.movie_hashes(movies_df))
+        with open(f"{state_path}.tmp", "rb") as f:
+            state_sha256 = hashlib.sha256(f.read()).hexdigest()
+        os.replace(f"{state_path}.tmp", state_path)
+
+        # appended ratings would be glued to an unterminated last line
+        with open(ratings_path, "rb") as f:
+            f.seek(max(ratings_offset - 1, 0))
+            terminated = f.read(1) == b"\n"
+
+        manifest = {
+            "version": self.MANIFEST_VERSION,
+            "state_sha256": state_sha256,
+            "ratings": self.ratings_fingerprint(ratings_path, ratings_offset) if terminated else {"offset": None},
+        }
+        with open(f"{manifest_path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    def preprocess_incremental(self, chunk_size=1_000_000):
+        """
+        Preprocessing pipeline which only processes what changed since the last run.
+
+        A manifest in the working directory records how much of ratings.csv has
+        been aggregated into running per-movie rating sums and a content hash
+        of every movie in movies.csv. A rerun only reads ratings appended since
+        then, only standardizes new or changed movies and movies rated for the
+        first time, updates the ratings of the other movies from the running
+        sums and merges everything into the cleaned movies and the genre
+        matrix. The outputs are the same as those of a full ``preprocess_data``
+        run on the same files. Without a usable manifest, e.g. on the first run
+        or if ratings.csv was replaced rather than appended to, everything is
+        processed. The MovieLens inputs are always read from the CSV files,
+        whose appended ratings can be found by byte offset.
+
+        Args:
+            chunk_size (int, optional): Number of ratings read at once.
+                Defaults to 1,000,000.
 
         Returns:
             tuple: A tuple containing:
-                - KMeans: Fitted KMeans clustering model
+                - pd.DataFrame: Cleaned and preprocessed movie data
+                - scipy.sparse.csr_matrix: Genre one-hot encoding matrix
                 - dict: Statistics including:
-                    - PCA_cumulative_variance_ratio: Explained variance ratio
-                    - movies_per_cluster: Number of movies in each cluster
+                    - full: Whether everything was processed
+                    - new_ratings: Number of ratings aggregated by this run
+                    - processed_movies: Number of movies standardized by this run
+                    - removed_movies: Number of movies no longer in movies.csv
+        """
+        ratings_path = f"{self.working_dir}/ratings.csv"
+        movies_df = pd.read_csv(f"{self.working_dir}/movies.csv")
+        ratings_offset = os.path.getsize(ratings_path)
+
+        saved = self.load_incremental_state()
+        if saved is None:
+            previous_sums = np.zeros(0, dtype=np.float64)
+            previous_counts = np.zeros(0, dtype=np.int64)
+            previous_ids = np.zeros(0, dtype=np.int64)
+            previous_hashes = np.zeros(0, dtype=np.uint64)
+            start = 0
+        else:
+            manifest, state = saved
+            previous_sums, previous_counts = state["rating_sums"], state["rating_counts"]
+            previous_ids, previous_hashes = state["movie_ids"], state["movie_hashes"]
+            start = manifest["ratings"]["offset"]
+
+        rating_sums, rating_counts = self.accumulate_ratings(
+            self.read_ratings(ratings_path, start, chunk_size), previous_sums.copy(), previous_counts.copy())
+        previous_counts = np.pad(previous_counts, (0, len(rating_counts) - len(previous_counts)))
+
+        # movies which are new, were edited or got their first ratings go through cleaning again
+        movie_ids = movies_df["movieId"].to_numpy()
+        rated = movie_ids < len(rating_counts)
+        first_rated = np.zeros(len(movie_ids), dtype=bool)
+        first_rated[rated] = (rating_counts[movie_ids[rated]] > 0) & (previous_counts[movie_ids[rated]] == 0)
+        if saved is None:
+            changed = np.ones(len(movie_ids), dtype=bool)
+        else:
+            previous_rows = pd.Index(previous_ids).get_indexer(movie_ids)
+            changed = (previous_rows < 0) | (previous_hashes[previous_rows] != self.movie_hashes(movies_df))
+        process = changed | first_rated
+
+        avg_ratings = self.ratings_from_sums(rating_sums, rating_counts)
+        processed_movies = self.clean_movie_data(movies_df[process], avg_ratings=avg_ratings)
+
+        if saved is None:
+            cleaned_movies = processed_movies
+        else:
+            kept_movies = self.read_cleaned_movies()
+            kept_movies = kept_movies[kept_movies["movieId"].isin(movie_ids[~process])]
+            kept_ids = kept_movies["movieId"].to_numpy()
+            kept_movies["rating"] = rating_sums[kept_ids] / rating_counts[kept_ids]
+
+            # keep the movies.csv order of a full run
+            cleaned_movies = pd.concat([kept_movies, processed_movies])
+            order = pd.Index(movie_ids).get_indexer(cleaned_movies["movieId"])
+            cleaned_movies = cleaned_movies.iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+
+        genre_matrix, genre_vocabulary = self.create_genre_matrix(cleaned_movies)
+        self.save_preprocessed(cleaned_movies, genre_matrix, genre_vocabulary)
+        self.save_incremental_state(ratings_offset, rating_sums, rating_counts, movies_df)
+
+        stats = {"full": saved is None,
+                 "new_ratings": int(rating_counts.sum() - previous_counts.sum()),
+                 "processed_movies": int(process.sum()),
+                 "removed_movies": int((~np.isin(previous_ids, movie_ids)).sum())}
+        return cleaned_movies, genre_matrix, stats
+
+    def load_genre_matrix(self):
+        """
+        Load the genre matrix saved by ``preprocess_data``.
+
+        Falls back to the dense ``genre_matrix.npy`` written by older versions.
+
+        Returns:
+            scipy.sparse.csr_matrix or np.ndarray: Genre one-hot encoding matrix
         """
+        sparse_path = f"{self.working_dir}/genre_matrix.npz"
+        if os.path.exists(sparse_path):
+            return sparse.load_npz(sparse_path)
+        return np.load(f"{self.working_dir}/genre_matrix.npy")
 
-        data = np.load(f"{self.working_dir}/genre_matrix.npy")
+    def load_genre_vocabulary(self):
+        """
+        Load the genre vocabulary saved by ``preprocess_data``.
+
+        Returns:
+            list: Genre of each column of the saved genre matrix
+        """
+        with open(f"{self.working_dir}/genre_vocabulary.json") as f:
+            return json.load(f)
+
+    def save_clustering_state(self, pca, genre_vocabulary, movie_ids):
+        """
+        Write what ``update_clusters`` needs to fold in movies added later.
+
+        Args:
+            pca (PCA): PCA fitted together with the clustering model
+            genre_vocabulary (list): Genre of each column of the clustered genre matrix
+            movie_ids (array-like): movieId of every clustered row
+        """
+        joblib.dump(pca, f"{self.working_dir}/pca.pkl")
+        with open(f"{self.working_dir}/clustered_genre_vocabulary.json", "w") as f:
+            json.dump(list(genre_vocabulary), f)
+        np.save(f"{self.working_dir}/clustered_movie_ids.npy", np.asarray(movie_ids))
+
+    def load_clustering_state(self):
+        """
+        Load the files written by ``save_clustering_state``.
+
+        Returns:
+            tuple: A tuple containing:
+                - PCA: PCA fitted together with the clustering model
+                - list: Genre of each column of the clustered genre matrix
+                - np.ndarray: movieId of every clustered row
+
+        Raises:
+            FileNotFoundError: If the clustering was saved without its genre
+                vocabulary, by a version which did not keep it
+        """
+        vocabulary_path = f"{self.working_dir}/clustered_genre_vocabulary.json"
+        if not os.path.exists(vocabulary_path):
+            raise FileNotFoundError(f"{vocabulary_path} not found, the genres of the clustered movies are unknown. "
+                                    f"Run the cluster command again before updating the clusters")
+        with open(vocabulary_path) as f:
+            clustered_vocabulary = json.load(f)
+        pca = joblib.load(f"{self.working_dir}/pca.pkl")
+        return pca, clustered_vocabulary, np.load(f"{self.working_dir}/clustered_movie_ids.npy")
+
+    def align_genre_matrix(self, genre_matrix, genre_vocabulary, clustered_vocabulary):
+        """
+        Reorder the columns of a genre matrix to the vocabulary of an earlier clustering.
+
+        The vocabulary is rebuilt on every preprocessing run, so a genre seen
+        for the first time shifts the columns of all genres sorted after it.
+        Genres the clustering has never seen have no PCA component and are
+        dropped, genres which disappeared since become zero columns.
+
+        Args:
+            genre_matrix (scipy.sparse.csr_matrix or np.ndarray): Genre one-hot encoding matrix
+            genre_vocabulary (list): Genre of each column of ``genre_matrix``
+            clustered_vocabulary (list): Genre of each column the clustering was fitted on
+
+        Returns:
+            scipy.sparse.csr_matrix: Matrix with one column per genre of ``clustered_vocabulary``
+
+        Raises:
+            ValueError: If the vocabulary doesn't describe the matrix columns
+        """
+        if len(genre_vocabulary) != genre_matrix.shape[1]:
+            raise ValueError(f"Genre matrix has {genre_matrix.shape[1]} columns but its vocabulary "
+                             f"{len(genre_vocabulary)} genres")
+
+        clustered_columns = {genre: column for column, genre in enumerate(clustered_vocabulary)}
+        columns = np.array([clustered_columns.get(genre, -1) for genre in genre_vocabulary], dtype=np.int64)
+        unseen = [genre for genre, column in zip(genre_vocabulary, columns.tolist()) if column < 0]
+        if unseen:
+            logger.warning(f"Genres {unseen} are not known to the clustering and are ignored, "
+                           f"run the cluster command again to take them into account")
+
+        kept = np.flatnonzero(columns >= 0)
+        selection = sparse.csr_matrix((np.ones(len(kept), dtype=np.uint8), (kept, columns[kept])),
+                                      shape=(len(genre_vocabulary), len(clustered_vocabulary)))
+        return sparse.csr_matrix(genre_matrix) @ selection
+
+    def project_genre_matrix(self, genre_matrix=None):
+        """
+        Reduce the genre matrix with PCA.
+
+        Args:
+            genre_matrix (scipy.sparse.csr_matrix or np.ndarray, optional): Genre
+                one-hot encoding matrix. Loaded from the working directory if not given.
+
+        Returns:
+            tuple: A tuple containing:
+                - np.ndarray: Movies projected on the PCA components
+                - np.ndarray: Cumulative explained variance ratio of the components
+        """
+        data = genre_matrix if genre_matrix is not None else self.load_genre_matrix()
 
         pca = PCA(n_components=self.pca_components)
         data = pca.fit_transform(data)
+        self.pca = pca
 
         explained_variance_ratio = pca.explained_variance_ratio_
         cumulative_variance_ratio = np.cumsum(explained_variance_ratio)
 
-        kmeans = KMeans(n_clusters=self.kmeans_clusters, random_state=42)
-        cluster_labels = kmeans.fit_predict(data)
+        return data, cumulative_variance_ratio
+
+    def scan_clusters(self, cluster_counts, n_jobs=None, silhouette_sample_size=10000,
+                      metrics_name="metrics_clustering.csv", genre_matrix=None):
+        """
+        Fit KMeans for many cluster counts in parallel and record their quality.
+
+        The PCA projection is computed once and shared by all fits. Each result
+        is appended to the metrics file as soon as it is ready, and cluster
+        counts already present in the file are skipped, so an interrupted scan
+        resumes where it stopped.
+
+        Args:
+            cluster_counts (iterable): Numbers of clusters to try
+            n_jobs (int, optional): Number of worker processes. Defaults to the
+                number of CPUs.
+            silhouette_sample_size (int, optional): Number of movies sampled to
+                estimate the silhouette score, None uses all movies. Defaults to 10000.
+            metrics_name (str, optional): Metrics file name inside the working
+                directory, with n_clusters, inertia and silhouette_score columns.
+                Defaults to "metrics_clustering.csv".
+            genre_matrix (scipy.sparse.csr_matrix or np.ndarray, optional): Genre
+                one-hot encoding matrix. Loaded from the working directory if not given.
+
+        Returns:
+            pd.DataFrame: All metrics in the file, sorted by n_clusters
+        """
+        metrics_path = f"{self.working_dir}/{metrics_name}"
+        columns = ["n_clusters", "inertia", "silhouette_score"]
+
+        # a scan interrupted before writing the header leaves an empty file
+        has_metrics = os.path.exists(metrics_path) and os.path.getsize(metrics_path) > 0
+        done = set()
+        if has_metrics:
+            done = set(pd.read_csv(metrics_path)["n_clusters"].astype(int))
+        remaining = sorted(set(int(k) for k in cluster_counts) - done)
+
+        if remaining:
+            data, _ = self.project_genre_matrix(genre_matrix)
+            write_header = not has_metrics
+            with open(metrics_path, "a") as metrics_file, \
+                    ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_scan_worker,
+                                        initargs=(data,)) as executor:
+                if write_header:
+                    metrics_file.write(",".join(columns) + "\n")
+                    metrics_file.flush()
+                futures = [executor.submit(_fit_and_score, k, silhouette_sample_size) for k in remaining]
+                for future in as_completed(futures):
+                    n_clusters, inertia, silhouette = future.result()
+                    metrics_file.write(f"{n_clusters},{inertia!r},{silhouette!r}\n")
+                    metrics_file.flush()
+        elif not has_metrics:
+            return pd.DataFrame(columns=columns)
+
+        metrics = pd.read_csv(metrics_path)
+        return metrics.sort_values("n_clusters").reset_index(drop=True)
+
+    def create_clusterer(self):
+        """
+        Create an unfitted clustering model for the configured backend.
+
+        Returns:
+            KMeans or MiniBatchKMeans: Clustering model with ``kmeans_clusters`` clusters
+        """
+        if self.algorithm == "minibatch":
+            return MiniBatchKMeans(n_clusters=self.kmeans_clusters, batch_size=self.batch_size,
+                                   n_init="auto", random_state=42)
+        return KMeans(n_clusters=self.kmeans_clusters, random_state=42)
+
+    def update_clusters(self, kmeans, pca, clustered_vocabulary, new_rows, genre_matrix=None, genre_vocabulary=None):
+        """
+        Fold new movies into an existing clustering without reclustering.
+
+        The genre matrix is first aligned to the genre vocabulary the clustering
+        was fitted on, see ``align_genre_matrix``, and new movies are projected
+        with the original PCA. A MiniBatchKMeans model moves its centers with
+        ``partial_fit`` on them, a full KMeans model keeps its centers. All
+        movies are then assigned to the nearest center, so ``labels_`` matches
+        the rows of the current genre matrix again.
+
+        Args:
+            kmeans (KMeans or MiniBatchKMeans): Fitted clustering model
+            pca (PCA): PCA fitted together with the clustering model
+            clustered_vocabulary (list): Genre of each column the clustering was fitted on
+            new_rows (array-like): Rows of the genre matrix which are not clustered yet
+            genre_matrix (scipy.sparse.csr_matrix or np.ndarray, optional): Genre
+                one-hot encoding matrix of all movies. Loaded from the working
+                directory if not given.
+            genre_vocabulary (list, optional): Genre of each column of
+                ``genre_matrix``. Loaded from the working directory if not given.
+
+        Returns:
+            KMeans or MiniBatchKMeans: The updated clustering model
+
+        Raises:
+            ValueError: If the vocabulary doesn't match the PCA input
+        """
+        if len(clustered_vocabulary) != pca.n_features_in_:
+            raise ValueError(f"The clustering was fitted on {pca.n_features_in_} genres but its vocabulary has "
+                             f"{len(clustered_vocabulary)}, run the cluster command again")
+
+        data = genre_matrix if genre_matrix is not None else self.load_genre_matrix()
+        if genre_vocabulary is None:
+            genre_vocabulary = self.load_genre_vocabulary()
+        data = self.align_genre_matrix(data, genre_vocabulary, clustered_vocabulary)
+        data = pca.transform(data)
+
+        new_rows = np.asarray(new_rows, dtype=np.int64)
+        if len(new_rows) > 0 and hasattr(kmeans, "partial_fit"):
+            kmeans.partial_fit(data[new_rows])
+
+        kmeans.labels_ = kmeans.predict(data)
+        # centers may have moved, so the ranking has to follow, as long as before
+        ranking = getattr(kmeans, "distant_clusters_", None)
+        self.rank_distant_clusters(kmeans, ranking.shape[1] if ranking is not None else None)
+        return kmeans
+
+    def rank_distant_clusters(self, kmeans, k=None):
+        """
+        Rank the most distant clusters of every cluster and store the ranking
+        in the model as ``distant_clusters_``.
+
+        The recommender samples anti-recommendations from these clusters, so
+        keeping the ranking in the model artifact spares it the pairwise
+        distance computation at load time.
+
+        Args:
+            kmeans: Fitted clustering model exposing ``cluster_centers_``
+            k (int, optional): Length of the ranking. Defaults to ``distant_clusters``.
+
+        Returns:
+            np.ndarray: int32 array of shape (n_clusters, k), cluster ids ordered
+                from the farthest, ``k`` is capped at n_clusters - 1
+        """
+        centers = np.asarray(kmeans.cluster_centers_, dtype=np.float64)
+        k = max(1, min(k or self.distant_clusters, centers.shape[0] - 1))
+        distances = np.linalg.norm(centers[:, None, :] - centers[None, :, :], axis=2)
+        # stable order keeps the first of equally distant clusters first, like argmax
+        ranked = np.argsort(-distances, axis=1, kind="stable")[:, :k]
+        kmeans.distant_clusters_ = np.ascontiguousarray(ranked, dtype=np.int32)
+        return kmeans.distant_clusters_
+
+    def fit_clusters(self, data):
+        """
+        Fit the clustering model on projected movies and rank its distant clusters.
+
+        Args:
+            data (np.ndarray): Movies projected on the PCA components
+
+        Returns:
+            KMeans or MiniBatchKMeans: Fitted clustering model, depending on ``algorithm``
+        """
+        kmeans = self.create_clusterer()
+        kmeans.fit(data)
+        self.rank_distant_clusters(kmeans)
+        return kmeans
+
+    def cluster_movies(self, genre_matrix=None):
+        """
+        Perform dimensionality reduction and clustering on movie data.
+
+        Args:
+            genre_matrix (scipy.sparse.csr_matrix or np.ndarray, optional): Genre
+                one-hot encoding matrix. Loaded from the working directory if not given.
+
+        The fitted PCA is kept in ``self.pca`` so that movies added later can be
+        projected the same way by ``update_clusters``.
+
+        Returns:
+            tuple: A tuple containing:
+                - KMeans or MiniBatchKMeans: Fitted clustering model, depending on ``algorithm``
+                - dict: Statistics including:
+                    - PCA_cumulative_variance_ratio: Explained variance ratio
+                    - movies_per_cluster: Number of movies in each cluster
+        """
+
+        data, cumulative_variance_ratio = self.project_genre_matrix(genre_matrix)
+
+        kmeans = self.fit_clusters(data)
+        cluster_labels = kmeans.labels_
 
         stats = {"PCA_cumulative_variance_ratio": cumulative_variance_ratio[-1],
                  "movies_per_cluster": [np.sum(cluster_labels == i) for i in range(self.kmeans_clusters)]}
 
         return kmeans, stats
+
+    def export_serving_bundle(self, kmeans, bundle_name="catalog.bundle", movies_df=None):
+        """
+        Export the cleaned movies and fitted clusters as a serving bundle.
+
+        The bundle holds the catalog columns, cluster labels, cluster centers and
+        the ranking of distant clusters in a binary file which the recommender memory-maps at startup instead of
+        parsing the CSV and unpickling the model.
+
+        Args:
+            kmeans: Fitted clustering model exposing ``labels_`` and ``cluster_centers_``.
+                Its ``distant_clusters_`` ranking is exported too, or computed
+                if the model predates it.
+            bundle_name (str, optional): Output file name inside the working
+                directory. Defaults to "catalog.bundle".
+            movies_df (pd.DataFrame, optional): Cleaned movies. Read from the
+                working directory if not given.
+
+        Returns:
+            str: Path of the written bundle
+
+        Raises:
+            AssertionError: If the number of movies doesn't match the number of labels
+        """
+        if movies_df is None:
+            movies_df = self.read_cleaned_movies()
+        assert movies_df.shape[0] == kmeans.labels_.shape[0], "Dataset \
+                                and model labels have different number of rows"
+
+        arrays = {
+            "movie_ids": movies_df["movieId"].to_numpy(dtype=np.int32),
+            "ratings": movies_df["rating"].to_numpy(dtype=np.float64),
+            "years": movies_df["year"].to_numpy().astype(np.int32),
+            "labels": np.asarray(kmeans.labels_, dtype=np.int32),
+            "cluster_centers": np.asarray(kmeans.cluster_centers_),
+            "distant_clusters": getattr(kmeans, "distant_clusters_", None),
+        }
+        if arrays["distant_clusters"] is None:
+            arrays["distant_clusters"] = self.rank_distant_clusters(kmeans)
+        for column, source_column in [("titles", "title"),
+                                      ("genres", "genres"),
+                                      ("standardized_titles", "standardized_title")]:
+            data, offsets, codes = ServingBundle.encode_strings(movies_df[source_column])
+            arrays[f"{column}_data"] = data
+            arrays[f"{column}_offsets"] = offsets
+            arrays[f"{column}_codes"] = codes
+
+        bundle_path = f"{self.working_dir}/{bundle_name}"
+        ServingBundle.write(bundle_path, arrays, {"n_movies": int(movies_df.shape[0]),
+                                                  "n_clusters": int(kmeans.cluster_centers_.shape[0])})
+        return bundle_path
@@ -0,0 +1,121 @@
+import json
+import struct
+
+import numpy as np
+
+
+class ServingBundle:
+    """
+    Versioned single-file binary container for the serving arrays.
+
+    Layout: 8 byte magic, uint32 format version, uint32 header length, a JSON
+    header describing every array (dtype, shape, offset) plus free-form
+    metadata, followed by the raw array data aligned to 64 bytes. Opening a
+    bundle memory-maps the file, so worker processes reading the same bundle
+    share its pages through the OS cache.
+    """
+
+    MAGIC = b"ANTIREC\0"
+    FORMAT_VERSION = 1
+    ALIGNMENT = 64
+
+    def __init__(self, arrays, metadata):
+        """
+        Args:
+            arrays (dict): Array name -> np.ndarray
+            metadata (dict): JSON serializable bundle metadata
+        """
+        self.arrays = arrays
+        self.metadata = metadata
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    @staticmethod
+    def encode_strings(values):
+        """
+        Intern a string column into the byte buffer, offsets and codes layout
+        the serving side reads back as a StringTable.
+
+        Args:
+            values (iterable): Strings, one per row
+
+        Returns:
+            tuple: uint8 UTF-8 data, int64 offsets and int32 codes
+        """
+        interned = {}
+        codes = np.array([interned.setdefault(str(value), len(interned)) for value in values], dtype=np.int32)
+
+        encoded = [value.encode("utf-8") for value in interned]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return data, offsets, codes
+
+    @classmethod
+    def _aligned(cls, position):
+        return -(-position // cls.ALIGNMENT) * cls.ALIGNMENT
+
+    @classmethod
+    def write(cls, path, arrays, metadata=None):
+        """
+        Write arrays and metadata to a bundle file.
+
+        Args:
+            path (str): Output file path
+            arrays (dict): Array name -> np.ndarray
+            metadata (dict, optional): JSON serializable bundle metadata
+        """
+        arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+        # offsets are relative to the start of the data section
+        entries = {}
+        position = 0
+        for name, array in arrays.items():
+            position = cls._aligned(position)
+            entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": position}
+            position += array.nbytes
+
+        header = json.dumps({"arrays": entries, "metadata": metadata or {}}).encode("utf-8")
+        preamble = cls.MAGIC + struct.pack("<II", cls.FORMAT_VERSION, len(header)) + header
+        data_start = cls._aligned(len(preamble))
+
+        with open(path, "wb") as f:
+            f.write(preamble)
+            f.write(b"\0" * (data_start - len(preamble)))
+            for name, array in arrays.items():
+                f.write(b"\0" * (data_start + entries[name]["offset"] - f.tell()))
+                f.write(array.tobytes())
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-map a bundle file.
+
+        Args:
+            path (str): Bundle file path
+
+        Returns:
+            ServingBundle: Bundle whose arrays are read-only views into the file
+
+        Raises:
+            ValueError: If the file is not a bundle or has an unsupported version
+        """
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        preamble_size = len(cls.MAGIC) + 8
+        if buffer[:len(cls.MAGIC)].tobytes() != cls.MAGIC:
+            raise ValueError(f"{path} is not a serving bundle")
+        version, header_length = struct.unpack("<II", buffer[len(cls.MAGIC):preamble_size].tobytes())
+        if version != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported serving bundle version {version}, expected {cls.FORMAT_VERSION}")
+
+        header = json.loads(buffer[preamble_size:preamble_size + header_length].tobytes().decode("utf-8"))
+        data_start = cls._aligned(preamble_size + header_length)
+
+        arrays = {}
+        for name, entry in header["arrays"].items():
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"], dtype=np.int64))
+            start = data_start + entry["offset"]
+            arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(entry["shape"])
+        return cls(arrays, header["metadata"])
@@ -0,0 +1,76 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from src.BuildPipeline import BuildPipeline
+from src.MLensDataPreprocessor import MLensDataPreprocessor
+
+GENRES = ["Action", "Comedy", "Drama", "Horror", "Romance", "Sci-Fi", "Thriller", "Animation"]
+
+
+@pytest.fixture
+def working_dir(tmp_path):
+    rng = np.random.default_rng(42)
+    n_movies = 60
+    movies = pd.DataFrame({
+        "movieId": np.arange(1, n_movies + 1),
+        "title": [f"Movie {i} ({1950 + i})" for i in range(n_movies)],
+        "genres": ["|".join(rng.choice(GENRES, size=rng.integers(1, 4), replace=False)) for _ in range(n_movies)],
+    })
+    ratings = pd.DataFrame({
+        "userId": rng.integers(1, 20, size=600),
+        "movieId": rng.integers(1, n_movies + 1, size=600),
+        "rating": rng.integers(1, 11, size=600) / 2,
+        "timestamp": np.arange(600),
+    })
+    movies.to_csv(tmp_path / "movies.csv", index=False)
+    ratings.to_csv(tmp_path / "ratings.csv", index=False)
+    return str(tmp_path)
+
+
+def build(working_dir, kmeans_clusters=5):
+    preprocessor = MLensDataPreprocessor(pca_components=3, kmeans_clusters=kmeans_clusters,
+                                         working_dir=working_dir, distant_clusters=2)
+    return BuildPipeline(preprocessor).run()
+
+
+def test_rebuild_reuses_cached_stages(working_dir):
+    first = build(working_dir)
+    assert [first[stage]["cached"] for stage in ("preprocess", "pca", "cluster")] == [False, False, False]
+    for path in first["outputs"]:
+        assert os.path.exists(path)
+    assert first["outputs"][0] == os.path.join(working_dir, "clustered_dataset.csv")
+    model = joblib.load(os.path.join(working_dir, "movies_kmeans.pkl"))
+    with open(first["outputs"][0], "rb") as f:
+        dataset = f.read()
+    assert len(model.labels_) == len(pd.read_csv(first["outputs"][0]))
+
+    second = build(working_dir)
+    assert [second[stage]["cached"] for stage in ("preprocess", "pca", "cluster")] == [True, True, True]
+    assert [second[stage]["key"] for stage in ("preprocess", "pca", "cluster")] == \
+        [first[stage]["key"] for stage in ("preprocess", "pca", "cluster")]
+    # cached stages give the same bytes as a fresh build
+    with open(second["outputs"][0], "rb") as f:
+        assert f.read() == dataset
+
+
+def test_changed_parameter_reruns_downstream_stages_only(working_dir):
+    build(working_dir)
+    rebuilt = build(working_dir, kmeans_clusters=4)
+
+    assert [rebuilt[stage]["cached"] for stage in ("preprocess", "pca", "cluster")] == [True, True, False]
+    assert joblib.load(os.path.join(working_dir, "movies_kmeans.pkl")).n_clusters == 4
+
+
+def test_changed_input_invalidates_cache(working_dir):
+    first = build(working_dir)
+    ratings_path = os.path.join(working_dir, "ratings.csv")
+    ratings = pd.read_csv(ratings_path)
+    ratings.loc[0, "rating"] = 5.0 if ratings.loc[0, "rating"] != 5.0 else 0.5
+    ratings.to_csv(ratings_path, index=False)
+
+    rebuilt = build(working_dir)
+    assert rebuilt["preprocess"]["key"] != first["preprocess"]["key"]
+    assert [rebuilt[stage]["cached"] for stage in ("preprocess", "pca", "cluster")] == [False, False, False]
@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from src.MLensDataPreprocessor import MLensDataPreprocessor
+
+TITLES = [
+    "Toy Story (1995)",
+    "Matrix, The (1999)",
+    "American President, The (1995)",
+    "Goofy Movie, A (1995)",
+    "American Tail, An (1986)",
+    "City of Lost Children, The (Cité des enfants perdus, La) (1995)",
+    "Shanghai Triad (Yao a yao yao dao waipo qiao) (1995)",
+    "Babe: Pig in the City (1998)",
+    "Hellboy II: The Golden Army (a.k.a. Hellboy 2) (2008)",
+    "Cosmos",
+    "Les Misérables, Les (2012)",
+    "Big Bang Theory, The",
+    "Broken (year",
+    "Closing) parenthesis only",
+    "Reversed ) order (",
+    "Nested (1999) (extended) cut",
+    "Trailing (19a9)",
+    "( )",
+    "(2003)",
+    "Spaces  ,  the  (2001)  ",
+    "THE END, THE (2010)",
+    "Multi, Part, A Title (1977)",
+    "",
+]
+
+
+@pytest.fixture
+def preprocessor(tmp_path):
+    return MLensDataPreprocessor(working_dir=str(tmp_path))
+
+
+def test_standardize_titles_matches_per_title_function(preprocessor):
+    titles = pd.Series(TITLES, index=np.arange(len(TITLES)) * 3)
+    standardized_titles, years = preprocessor.standardize_titles(titles)
+
+    expected = [preprocessor.standardize_title_and_year(title) for title in TITLES]
+    assert standardized_titles.tolist() == [title for title, _ in expected]
+    assert years.tolist() == pytest.approx([np.nan if year is None else year for _, year in expected], nan_ok=True)
+    assert years.dtype == np.float64
+    assert standardized_titles.index.equals(titles.index)
+
+
+def test_standardize_titles_matches_on_random_titles(preprocessor):
+    rng = np.random.default_rng(42)
+    pieces = np.array(["Movie", " ", ",", ", The", ", A", ", An", "(", ")", "(1999)", "(a)", "2001", "the", "An"])
+    titles = ["".join(rng.choice(pieces, size=rng.integers(0, 8))) for _ in range(2000)]
+
+    standardized_titles, years = preprocessor.standardize_titles(pd.Series(titles))
+
+    expected = [preprocessor.standardize_title_and_year(title) for title in titles]
+    assert standardized_titles.tolist() == [title for title, _ in expected]
+    assert years.tolist() == pytest.approx([np.nan if year is None else year for _, year in expected], nan_ok=True)
+
+
+def test_clean_movie_data_applies_special_cases(preprocessor):
+    movies_df = pd.DataFrame({
+        "movieId": [1, 69757, 80729, 4],
+        "title": ["Matrix, The (1999)", "(500) Days of Summer (2009)", "(2010)", "No Year"],
+        "genres": ["Action", "Comedy|Romance", "Drama", "Drama"],
+    })
+    avg_ratings = pd.DataFrame({"movieId": [1, 4, 69757, 80729], "rating": [4.0, 3.0, 3.5, 2.0]})
+
+    cleaned = preprocessor.clean_movie_data(movies_df, avg_ratings=avg_ratings)
+
+    assert cleaned["movieId"].tolist() == [1, 69757, 80729]
+    assert cleaned["standardized_title"].tolist() == ["The Matrix", "500 Days of Summer", "Untitled"]
+    assert cleaned["year"].tolist() == [1999, 2009, 2010]
+    assert cleaned["rating"].tolist() == [4.0, 3.5, 2.0]
+
+
+def test_rank_distant_clusters(preprocessor):
+    kmeans = type("Model", (), {})()
+    kmeans.cluster_centers_ = np.array([[0.0, 0.0], [1.0, 0.0], [5.0, 0.0], [0.0, 3.0]])
+
+    ranked = preprocessor.rank_distant_clusters(kmeans, k=2)
+
+    assert ranked.dtype == np.int32
+    assert ranked.tolist() == [[2, 3], [2, 3], [3, 0], [2, 1]]
+    assert kmeans.distant_clusters_ is ranked
+    # a ranking can't be longer than the number of other clusters
+    assert preprocessor.rank_distant_clusters(kmeans, k=10).shape == (4, 3)
+
+
+def test_parquet_outputs_match_csv(tmp_path):
+    pytest.importorskip("pyarrow")
+    movies = pd.DataFrame({"movieId": [1, 2, 3, 4],
+                           "title": ["Toy Story (1995)", "Matrix, The (1999)", "Cosmos", "Heat (1995)"],
+                           "genres": ["Animation|Comedy", "Action|Sci-Fi", "Documentary", "(no genres listed)"]})
+    ratings = pd.DataFrame({"userId": [1, 1, 2, 2, 3], "movieId": [1, 2, 1, 3, 4],
+                            "rating": [4.0, 5.0, 3.5, 2.0, 1.0], "timestamp": [10, 11, 12, 13, 14]})
+    movies.to_csv(tmp_path / "movies.csv", index=False)
+    ratings.to_csv(tmp_path / "ratings.csv", index=False)
+
+    csv_movies, _ = MLensDataPreprocessor(working_dir=str(tmp_path)).preprocess_data()
+    parquet_preprocessor = MLensDataPreprocessor(working_dir=str(tmp_path), data_format="parquet")
+    parquet_preprocessor.convert_inputs()
+    parquet_preprocessor.preprocess_data(chunk_size=2)
+    parquet_movies = parquet_preprocessor.read_cleaned_movies()
+
+    assert parquet_preprocessor.input_path("ratings").endswith("ratings.parquet")
+    assert parquet_movies["year"].dtype == np.int32
+    assert parquet_movies["movieId"].tolist() == csv_movies["movieId"].tolist() == [1, 2]
+    assert parquet_movies["rating"].tolist() == csv_movies["rating"].tolist()
+    assert parquet_movies["standardized_title"].tolist() == csv_movies["standardized_title"].tolist()
+    assert parquet_movies["year"].tolist() == csv_movies["year"].astype(int).tolist()
+
+
+CLUSTERED_GENRES = ["Comedy", "Drama", "Horror", "Romance", "Sci-Fi", "Thriller"]
+
+
+def genre_movies(n_movies, genres, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"genres": ["|".join(rng.choice(genres, size=rng.integers(1, 3), replace=False))
+                                    for _ in range(n_movies)]})
+
+
+def clustered(working_dir, algorithm):
+    preprocessor = MLensDataPreprocessor(pca_components=3, kmeans_clusters=4, working_dir=working_dir,
+                                         algorithm=algorithm, distant_clusters=2)
+    movies = genre_movies(40, CLUSTERED_GENRES)
+    genre_matrix, vocabulary = preprocessor.create_genre_matrix(movies)
+    kmeans, _ = preprocessor.cluster_movies(genre_matrix)
+    return preprocessor, movies, vocabulary, kmeans
+
+
+def test_minibatch_backend_clusters_movies(tmp_path):
+    preprocessor, movies, _, kmeans = clustered(str(tmp_path), "minibatch")
+
+    assert isinstance(kmeans, MiniBatchKMeans)
+    assert kmeans.labels_.shape == (len(movies),)
+    assert kmeans.distant_clusters_.shape == (4, 2)
+
+
+def test_update_clusters_aligns_new_genres(tmp_path):
+    # Test a genre sorting before all clustered ones doesn't shift the columns the PCA was fitted on
+    preprocessor, movies, vocabulary, kmeans = clustered(str(tmp_path), "full")
+    assert isinstance(kmeans, KMeans)
+    labels = kmeans.labels_.copy()
+    preprocessor.save_clustering_state(preprocessor.pca, vocabulary, np.arange(len(movies)))
+
+    new_movies = pd.DataFrame({"genres": ["Action|" + movies["genres"][0], movies["genres"][1], "Action"]})
+    genre_matrix, new_vocabulary = preprocessor.create_genre_matrix(pd.concat([movies, new_movies]))
+    assert new_vocabulary[0] == "Action"
+
+    pca, clustered_vocabulary, clustered_ids = preprocessor.load_clustering_state()
+    assert clustered_vocabulary == vocabulary
+    kmeans = preprocessor.update_clusters(kmeans, pca, clustered_vocabulary, [40, 41, 42],
+                                          genre_matrix, new_vocabulary)
+
+    assert kmeans.labels_[:40].tolist() == labels.tolist()
+    # the unknown genre is dropped, so these movies are projected like the movies they copy
+    assert kmeans.labels_[40:42].tolist() == labels[:2].tolist()
+    assert kmeans.labels_[42] == kmeans.predict(pca.transform(np.zeros((1, len(vocabulary)))))[0]
+
+
+def test_update_clusters_minibatch_assigns_new_movies(tmp_path):
+    preprocessor, movies, vocabulary, kmeans = clustered(str(tmp_path), "minibatch")
+    centers = kmeans.cluster_centers_.copy()
+
+    all_movies = pd.concat([movies, genre_movies(10, CLUSTERED_GENRES, seed=1)])
+    genre_matrix, _ = preprocessor.create_genre_matrix(all_movies)
+    kmeans = preprocessor.update_clusters(kmeans, preprocessor.pca, vocabulary, np.arange(40, 50),
+                                          genre_matrix, vocabulary)
+
+    assert kmeans.labels_.shape == (50,)
+    assert not np.array_equal(kmeans.cluster_centers_, centers)
+    assert kmeans.labels_.tolist() == kmeans.predict(preprocessor.pca.transform(genre_matrix)).tolist()
+
+
+def test_update_clusters_rejects_vocabulary_mismatch(tmp_path):
+    preprocessor, movies, vocabulary, kmeans = clustered(str(tmp_path), "full")
+    genre_matrix, _ = preprocessor.create_genre_matrix(movies)
+
+    with pytest.raises(ValueError):
+        preprocessor.update_clusters(kmeans, preprocessor.pca, vocabulary[:-1], [], genre_matrix, vocabulary)
+    with pytest.raises(ValueError):
+        preprocessor.update_clusters(kmeans, preprocessor.pca, vocabulary, [], genre_matrix, vocabulary[:-1])
+    # a clustering saved without its vocabulary can't be updated
+    with pytest.raises(FileNotFoundError):
+        preprocessor.load_clustering_state()
+
+
+def write_movielens(working_dir, movies, ratings):
+    movies.to_csv(f"{working_dir}/movies.csv", index=False)
+    ratings.to_csv(f"{working_dir}/ratings.csv", index=False)
+
+
+def test_incremental_run_matches_full_run(tmp_path):
+    # Test appended ratings, edited, new, removed and first rated movies give the bytes of a full run
+    incremental_dir, full_dir = tmp_path / "incremental", tmp_path / "full"
+    incremental_dir.mkdir()
+    full_dir.mkdir()
+    rng = np.random.default_rng(42)
+    movies = pd.DataFrame({"movieId": [1, 2, 3, 5, 8, 13],
+                           "title": ["Toy Story (1995)", "Matrix, The (1999)", "Heat (1995)", "Cosmos",
+                                     "(500) Days of Summer (2009)", "Babe (1995)"],
+                           "genres": ["Animation|Comedy", "Action|Sci-Fi", "Crime", "Documentary",
+                                      "Comedy|Romance", "Drama"]})
+    ratings = pd.DataFrame({"userId": rng.integers(1, 10, size=40), "movieId": rng.choice([1, 2, 3, 5, 8], size=40),
+                            "rating": rng.integers(1, 11, size=40) / 2, "timestamp": np.arange(40)})
+    write_movielens(incremental_dir, movies, ratings)
+    preprocessor = MLensDataPreprocessor(working_dir=str(incremental_dir))
+    assert preprocessor.preprocess_incremental(chunk_size=7)[2]["full"]
+
+    movies.loc[1, "title"] = "Matrix Reloaded, The (2003)"
+    movies = pd.concat([movies[movies["movieId"] != 3],
+                        pd.DataFrame({"movieId": [21], "title": ["Get Shorty (1995)"], "genres": ["Western"]})])
+    new_ratings = pd.DataFrame({"userId": [1, 2, 3, 4], "movieId": [13, 21, 1, 2], "rating": [1.5, 4.0, 3.0, 0.5],
+                                "timestamp": [50, 51, 52, 53]})
+    movies.to_csv(incremental_dir / "movies.csv", index=False)
+    new_ratings.to_csv(incremental_dir / "ratings.csv", mode="a", header=False, index=False)
+    stats = preprocessor.preprocess_incremental(chunk_size=3)[2]
+    assert not stats["full"]
+    assert (stats["new_ratings"], stats["removed_movies"]) == (4, 1)
+
+    write_movielens(full_dir, movies, pd.read_csv(incremental_dir / "ratings.csv"))
+    MLensDataPreprocessor(working_dir=str(full_dir)).preprocess_data()
+
+    for name in ["cleaned_movies.csv", "genre_vocabulary.json"]:
+        assert (incremental_dir / name).read_bytes() == (full_dir / name).read_bytes()
+    incremental_matrix = MLensDataPreprocessor(working_dir=str(incremental_dir)).load_genre_matrix()
+    full_matrix = MLensDataPreprocessor(working_dir=str(full_dir)).load_genre_matrix()
+    assert (incremental_matrix != full_matrix).nnz == 0
+
+
+def test_create_genre_matrix_is_sparse_with_sorted_vocabulary(preprocessor):
+    movies = pd.DataFrame({"genres": ["Drama|Action", "Comedy|Action|Action", "(no genres listed)", "Action"]},
+                          index=[10, 3, 7, 1])
+
+    genre_matrix, vocabulary = preprocessor.create_genre_matrix(movies)
+
+    assert sparse.issparse(genre_matrix)
+    assert genre_matrix.dtype == np.uint8
+    assert vocabulary == ["(no genres listed)", "Action", "Comedy", "Drama"]
+    assert genre_matrix.toarray().tolist() == [[0, 1, 0, 1], [0, 1, 1, 0], [1, 0, 0, 0], [0, 1, 0, 0]]
+    # the column order doesn't depend on the order of the movies
+    reversed_matrix, reversed_vocabulary = preprocessor.create_genre_matrix(movies.iloc[::-1])
+    assert reversed_vocabulary == vocabulary
+    assert reversed_matrix.toarray().tolist() == genre_matrix.toarray()[::-1].tolist()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1000])
+def test_stream_average_ratings_matches_groupby(tmp_path, chunk_size):
+    rng = np.random.default_rng(chunk_size)
+    ratings = pd.DataFrame({"userId": rng.integers(1, 50, size=300), "movieId": rng.integers(1, 40, size=300) * 3,
+                            "rating": rng.integers(1, 11, size=300) / 2, "timestamp": np.arange(300)})
+    ratings.to_csv(tmp_path / "ratings.csv", index=False)
+    preprocessor = MLensDataPreprocessor(working_dir=str(tmp_path))
+
+    streamed = preprocessor.stream_average_ratings(str(tmp_path / "ratings.csv"), chunk_size=chunk_size)
+
+    expected = ratings.groupby("movieId")["rating"].mean().reset_index()
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_scan_clusters_resumes_from_metrics_file(tmp_path):
+    preprocessor = MLensDataPreprocessor(pca_components=2, working_dir=str(tmp_path))
+    genre_matrix, _ = preprocessor.create_genre_matrix(genre_movies(30, CLUSTERED_GENRES))
+    metrics_path = tmp_path / "metrics_clustering.csv"
+
+    # an empty file left by an interrupted scan counts as nothing done
+    metrics_path.write_text("")
+    metrics = preprocessor.scan_clusters([2], n_jobs=1, genre_matrix=genre_matrix)
+    assert metrics["n_clusters"].tolist() == [2]
+
+    # k already in the file is not fitted again
+    metrics_path.write_text("n_clusters,inertia,silhouette_score\n3,-1.0,-1.0\n")
+    metrics = preprocessor.scan_clusters([2, 3, 4], n_jobs=1, genre_matrix=genre_matrix)
+    assert metrics["n_clusters"].tolist() == [2, 3, 4]
+    assert metrics.loc[1, "inertia"] == -1.0
+    assert (metrics.loc[[0, 2], "inertia"] >= 0).all()